@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TestAttempt
+
+
+FLUSH_BATCH_SIZE = 500
+ACTIVITY_FIELDS = ('id', 'student_id', 'status', 'time_spent_seconds', 'last_resumed_at', 'last_activity_at')
+
+
+def _activity_cache_key(attempt_id):
+    return f'test-attempt:activity:{attempt_id}'
+
+
+def activity_cache_is_shared():
+    """Whether every web and management process reads the same cache, so heartbeats can wait there for a flush."""
+    return bool(getattr(settings, 'TEST_ATTEMPT_ACTIVITY_CACHE_SHARED', False))
+
+
+def _activity_timeout():
+    return max(60, int(getattr(settings, 'TEST_ATTEMPT_ACTIVITY_TTL_SECONDS', 6 * 60 * 60)))
+
+
+def _to_timestamp(value):
+    return value.timestamp() if value else None
+
+
+def _from_timestamp(value):
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def _state_from_attempt(attempt):
+    return {
+        'student_id': attempt.student_id,
+        'status': attempt.status,
+        'time_spent_seconds': attempt.time_spent_seconds or 0,
+        'last_resumed_at': _to_timestamp(attempt.last_resumed_at),
+        'last_activity_at': _to_timestamp(attempt.last_activity_at),
+    }
+
+
+def remember_attempt_activity(attempt):
+    state = _state_from_attempt(attempt)
+    cache.set(_activity_cache_key(attempt.id), state, _activity_timeout())
+    return state
+
+
+def forget_attempt_activity(attempt_id):
+    cache.delete(_activity_cache_key(attempt_id))
+
+
+def record_attempt_activity(attempt_id, student_id, now=None):
+    """
+    Record student activity on an attempt in the shared cache only. The
+    database row is brought up to date by flush_attempt_activity(). Without a
+    shared cache the flush would never see the heartbeat, so last_activity_at
+    is written to the row straight away.
+    """
+    now = now or timezone.now()
+    if not activity_cache_is_shared():
+        return _write_attempt_activity(attempt_id, student_id, now)
+    key = _activity_cache_key(attempt_id)
+    state = cache.get(key)
+    if state is None:
+        attempt = TestAttempt.objects.filter(pk=attempt_id).only(*ACTIVITY_FIELDS).first()
+        if attempt is None:
+            return None
+        state = _state_from_attempt(attempt)
+    if state['student_id'] != student_id:
+        return None
+    if state['status'] == 'in_progress':
+        state['last_activity_at'] = max(state['last_activity_at'] or 0, now.timestamp())
+        cache.set(key, state, _activity_timeout())
+    return state
+
+
+def _write_attempt_activity(attempt_id, student_id, now):
+    attempt = TestAttempt.objects.filter(pk=attempt_id).only(*ACTIVITY_FIELDS).first()
+    if attempt is None or attempt.student_id != student_id:
+        return None
+    if attempt.status == 'in_progress':
+        TestAttempt.objects.filter(pk=attempt_id, status='in_progress').update(last_activity_at=now, updated_at=now)
+        attempt.last_activity_at = now
+    return _state_from_attempt(attempt)
+
+
+def estimated_time_spent_seconds(state, now=None):
+    now = now or timezone.now()
+    time_spent = state['time_spent_seconds'] or 0
+    if state['status'] == 'in_progress' and state['last_resumed_at']:
+        time_spent += max(0, int(now.timestamp() - state['last_resumed_at']))
+    return time_spent
+
+
+def flush_attempt_activity(now=None, batch_size=FLUSH_BATCH_SIZE):
+    """
+    Move cached activity into TestAttempt rows in bulk. Time between the stored
+    last_resumed_at and the latest heartbeat is added to time_spent_seconds and
+    the timer is advanced to that heartbeat, which is what a capture on lock or
+    submit would have recorded.
+    """
+    now = now or timezone.now()
+    attempt_ids = list(
+        TestAttempt.objects.filter(status='in_progress', last_resumed_at__isnull=False)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    flushed_count = 0
+    for offset in range(0, len(attempt_ids), batch_size):
+        chunk = attempt_ids[offset:offset + batch_size]
+        cached_states = cache.get_many([_activity_cache_key(attempt_id) for attempt_id in chunk])
+        heartbeats = {}
+        for attempt_id in chunk:
+            state = cached_states.get(_activity_cache_key(attempt_id))
+            if state and state['last_activity_at'] and state['last_activity_at'] > (state['last_resumed_at'] or 0):
+                heartbeats[attempt_id] = _from_timestamp(state['last_activity_at'])
+        if not heartbeats:
+            continue
+
+        with transaction.atomic():
+            attempts = list(
+                TestAttempt.objects.select_for_update()
+                .filter(id__in=heartbeats, status='in_progress', last_resumed_at__isnull=False)
+                .only(*ACTIVITY_FIELDS)
+            )
+            updated_attempts = []
+            for attempt in attempts:
+                heartbeat_at = min(heartbeats[attempt.id], now)
+                elapsed_seconds = int((heartbeat_at - attempt.last_resumed_at).total_seconds())
+                if elapsed_seconds <= 0:
+                    continue
+                attempt.time_spent_seconds = (attempt.time_spent_seconds or 0) + elapsed_seconds
+                attempt.last_resumed_at = attempt.last_resumed_at + timedelta(seconds=elapsed_seconds)
+                attempt.last_activity_at = heartbeat_at
+                attempt.updated_at = now
+                updated_attempts.append(attempt)
+            TestAttempt.objects.bulk_update(
+                updated_attempts,
+                ['time_spent_seconds', 'last_resumed_at', 'last_activity_at', 'updated_at'],
+            )
+
+        cache.set_many(
+            {_activity_cache_key(attempt.id): _state_from_attempt(attempt) for attempt in updated_attempts},
+            _activity_timeout(),
+        )
+        flushed_count += len(updated_attempts)
+    return flushed_count
@@ -0,0 +1,263 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+CLAIM_CANDIDATES = 5
+RETRY_BACKOFF_BASE_SECONDS = 30
+RETRY_BACKOFF_MAX_SECONDS = 30 * 60
+
+_tasks = {}
+_tasks_loaded = False
+
+
+class UnknownTaskError(Exception):
+    pass
+
+
+def register_task(name, cleanup=None, every=None):
+    """
+    Decorator registering `func(payload)` as task `name`. Its return value is
+    stored as the job result. cleanup(job), if given, runs before a finished
+    job is pruned. With `every` (seconds) long-running workers also queue the
+    task on their own that often.
+    """
+    def decorator(func):
+        _tasks[name] = {'func': func, 'cleanup': cleanup, 'every': every}
+        return func
+    return decorator
+
+
+def _load_tasks():
+    # Task modules import views and services, so they are loaded on first use
+    # rather than when this module is imported.
+    global _tasks_loaded
+    if not _tasks_loaded:
+        import_module('lms.tasks')
+        _tasks_loaded = True
+
+
+def get_task(name):
+    _load_tasks()
+    return _tasks.get(name)
+
+
+def _lease_seconds():
+    return int(getattr(settings, 'BACKGROUND_JOBS_LEASE_SECONDS', 60))
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(task, payload=None, *, priority=PRIORITY_NORMAL, max_attempts=3, run_after=None, created_by=None):
+    job = BackgroundJob.objects.create(
+        task=task,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=run_after or timezone.now(),
+        created_by=created_by,
+    )
+    if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+        claimed = claim_job(job.pk, 'eager')
+        if claimed is not None:
+            run_job(claimed, heartbeat=False)
+        job.refresh_from_db()
+    return job
+
+
+def claim_job(job_id, worker_id):
+    """Lease one queued job. The conditional UPDATE makes the claim atomic across worker processes."""
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(pk=job_id, status='queued').update(
+        status='running',
+        attempts=F('attempts') + 1,
+        locked_by=worker_id,
+        lease_expires_at=now + timedelta(seconds=_lease_seconds()),
+        heartbeat_at=now,
+        started_at=now,
+        updated_at=now,
+    )
+    return BackgroundJob.objects.get(pk=job_id) if claimed else None
+
+
+def claim_next_job(worker_id, tasks=None):
+    """Highest priority first, then oldest. Returns None when nothing is due."""
+    candidates = BackgroundJob.objects.filter(status='queued', run_after__lte=timezone.now())
+    if tasks:
+        candidates = candidates.filter(task__in=tasks)
+    for job_id in candidates.order_by('-priority', 'id').values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+        job = claim_job(job_id, worker_id)
+        if job is not None:
+            return job
+    return None
+
+
+def _retry_delay(attempts):
+    return min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1)) * random.uniform(0.5, 1)
+
+
+def _heartbeat_loop(job_id, worker_id, stop_event):
+    interval = max(1, _lease_seconds() // 3)
+    while not stop_event.wait(interval):
+        now = timezone.now()
+        try:
+            BackgroundJob.objects.filter(pk=job_id, status='running', locked_by=worker_id).update(
+                heartbeat_at=now,
+                lease_expires_at=now + timedelta(seconds=_lease_seconds()),
+            )
+        except Exception:
+            logger.exception('Heartbeat failed for background job %s', job_id)
+        finally:
+            close_old_connections()
+
+
+def _finish(job, **updates):
+    now = timezone.now()
+    BackgroundJob.objects.filter(pk=job.pk, locked_by=job.locked_by, status='running').update(
+        lease_expires_at=None,
+        updated_at=now,
+        **updates,
+    )
+
+
+def run_job(job, heartbeat=True):
+    """Run a claimed job, renewing its lease from a side thread until it returns."""
+    task = get_task(job.task)
+    stop_event = threading.Event()
+    heartbeat_thread = None
+    if heartbeat:
+        heartbeat_thread = threading.Thread(
+            target=_heartbeat_loop,
+            args=(job.pk, job.locked_by, stop_event),
+            name=f'background-job-heartbeat-{job.pk}',
+            daemon=True,
+        )
+        heartbeat_thread.start()
+    try:
+        if task is None:
+            raise UnknownTaskError(f'No task registered as {job.task!r}.')
+        result = task['func'](job.payload)
+    except Exception as exc:
+        logger.exception('Background job %s (%s) failed', job.pk, job.task)
+        if job.attempts < job.max_attempts and not isinstance(exc, UnknownTaskError):
+            _finish(
+                job,
+                status='queued',
+                locked_by='',
+                error=str(exc),
+                run_after=timezone.now() + timedelta(seconds=_retry_delay(job.attempts)),
+            )
+        else:
+            _finish(job, status='failed', error=str(exc), finished_at=timezone.now())
+    else:
+        _finish(job, status='completed', result=result, error='', finished_at=timezone.now())
+    finally:
+        stop_event.set()
+        if heartbeat_thread is not None:
+            heartbeat_thread.join()
+
+
+def recover_stale_jobs(now=None):
+    """
+    Jobs whose worker stopped heartbeating (killed, deploy, OOM) are queued
+    again, or failed once they have used up their attempts.
+    """
+    now = now or timezone.now()
+    stale = BackgroundJob.objects.filter(status='running', lease_expires_at__lt=now)
+    failed_count = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed',
+        error='Worker stopped responding.',
+        lease_expires_at=None,
+        finished_at=now,
+        updated_at=now,
+    )
+    requeued_count = stale.update(
+        status='queued',
+        locked_by='',
+        lease_expires_at=None,
+        error='Worker stopped responding; retrying.',
+        run_after=now,
+        updated_at=now,
+    )
+    if failed_count or requeued_count:
+        logger.warning('Recovered stale background jobs: %s requeued, %s failed', requeued_count, failed_count)
+    return requeued_count, failed_count
+
+
+def prune_finished_jobs(now=None):
+    retention_days = int(getattr(settings, 'BACKGROUND_JOBS_RETENTION_DAYS', 14))
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    old_jobs = BackgroundJob.objects.filter(status__in=['completed', 'failed'], finished_at__lt=cutoff)
+    for job in old_jobs.iterator():
+        cleanup = (get_task(job.task) or {}).get('cleanup')
+        if cleanup:
+            cleanup(job)
+    return old_jobs.delete()[0]
+
+
+def enqueue_periodic_jobs(now=None):
+    """
+    Queue every task registered with `every` that has no queued or running job
+    and was not queued in the last `every` seconds. Returns the queued task names.
+    """
+    _load_tasks()
+    now = now or timezone.now()
+    queued = []
+    for name, task in list(_tasks.items()):
+        if not task['every']:
+            continue
+        recent = BackgroundJob.objects.filter(task=name).filter(
+            Q(status__in=['queued', 'running']) | Q(created_at__gt=now - timedelta(seconds=task['every']))
+        )
+        if not recent.exists():
+            enqueue(name, priority=PRIORITY_LOW)
+            queued.append(name)
+    return queued
+
+
+def run_worker(worker_id=None, *, tasks=None, once=False, poll_interval=None, stop_event=None):
+    worker_id = worker_id or default_worker_id()
+    poll_interval = poll_interval or float(getattr(settings, 'BACKGROUND_JOBS_POLL_SECONDS', 2))
+    stop_event = stop_event or threading.Event()
+    maintenance_due_at = 0
+    processed = 0
+
+    while not stop_event.is_set():
+        close_old_connections()
+        if time.monotonic() >= maintenance_due_at:
+            recover_stale_jobs()
+            prune_finished_jobs()
+            if not once:
+                enqueue_periodic_jobs()
+            maintenance_due_at = time.monotonic() + _lease_seconds()
+
+        job = claim_next_job(worker_id, tasks=tasks)
+        if job is None:
+            if once:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+
+    close_old_connections()
+    return processed
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChunkedUpload, ChunkedUploadPart
+
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(ValueError):
+    pass
+
+
+class AssembledUploadFile(File):
+    """
+    The assembled file on local disk. Exposing temporary_file_path() lets
+    FileSystemStorage move it into place instead of copying it again.
+    """
+
+    def __init__(self, file, name=None, sha256=''):
+        super().__init__(file, name=name)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _staging_root():
+    return str(settings.CHUNKED_UPLOAD_DIR)
+
+
+def _upload_dir(upload):
+    return os.path.join(_staging_root(), str(upload.id))
+
+
+def _chunk_path(upload, index):
+    return os.path.join(_upload_dir(upload), f'{index:06d}.part')
+
+
+def create_upload(user, purpose, target, filename, total_size, content_type='', sha256=''):
+    max_bytes = int(settings.CHUNKED_UPLOAD_MAX_BYTES)
+    if total_size <= 0:
+        raise ChunkedUploadError('total_size must be a positive number of bytes.')
+    if total_size > max_bytes:
+        raise ChunkedUploadError(f'Files larger than {max_bytes // (1024 * 1024)} MB cannot be uploaded.')
+    if sha256 and (len(sha256) != 64 or any(char not in '0123456789abcdef' for char in sha256.lower())):
+        raise ChunkedUploadError('sha256 must be a hex encoded SHA-256 digest.')
+
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        purpose=purpose,
+        target=target,
+        filename=os.path.basename(filename)[:255] or 'upload',
+        content_type=content_type[:255],
+        total_size=total_size,
+        chunk_size=int(settings.CHUNKED_UPLOAD_CHUNK_SIZE),
+        sha256=sha256.lower(),
+        expires_at=timezone.now() + timedelta(seconds=int(settings.CHUNKED_UPLOAD_EXPIRY_SECONDS)),
+    )
+    os.makedirs(_upload_dir(upload), exist_ok=True)
+    return upload
+
+
+def received_chunks(upload):
+    return list(upload.parts.order_by('index').values_list('index', flat=True))
+
+
+def write_chunk(upload, index, stream, expected_sha256):
+    """
+    Stream one chunk from the request body to the staging directory while
+    hashing it. The chunk only replaces an earlier copy once its size and
+    SHA-256 both check out, so retrying a chunk is always safe.
+    """
+    if upload.status != 'uploading':
+        raise ChunkedUploadError(f'Upload is {upload.status}.')
+    if index >= upload.total_chunks:
+        raise ChunkedUploadError(f'Chunk index must be below {upload.total_chunks}.')
+    expected_sha256 = (expected_sha256 or '').strip().lower()
+    if len(expected_sha256) != 64:
+        raise ChunkedUploadError('The X-Chunk-SHA256 header with the chunk digest is required.')
+
+    expected_size = upload.expected_chunk_size(index)
+    os.makedirs(_upload_dir(upload), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=_upload_dir(upload), suffix='.tmp', delete=False) as temp_file:
+        try:
+            while True:
+                block = stream.read(min(STREAM_BLOCK_SIZE, expected_size + 1 - size)) if stream else b''
+                if not block:
+                    break
+                size += len(block)
+                if size > expected_size:
+                    raise ChunkedUploadError(f'Chunk {index} must be exactly {expected_size} bytes.')
+                digest.update(block)
+                temp_file.write(block)
+            if size != expected_size:
+                raise ChunkedUploadError(f'Chunk {index} must be exactly {expected_size} bytes.')
+            if digest.hexdigest() != expected_sha256:
+                raise ChunkedUploadError(f'Chunk {index} failed checksum verification.')
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+
+    os.replace(temp_file.name, _chunk_path(upload, index))
+    ChunkedUploadPart.objects.update_or_create(
+        upload=upload,
+        index=index,
+        defaults={'size': size, 'sha256': expected_sha256},
+    )
+    ChunkedUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now())
+    return size
+
+
+def assemble_upload(upload):
+    """
+    Concatenate the staged chunks into one file next to them, verifying the
+    whole-file SHA-256 when the client supplied one. Returns an open
+    AssembledUploadFile carrying that digest; the caller hands it to a FileField.
+    """
+    missing = sorted(set(range(upload.total_chunks)) - set(received_chunks(upload)))
+    if missing:
+        raise ChunkedUploadError(f'Missing chunks: {missing[:20]}')
+
+    digest = hashlib.sha256()
+    assembled_path = os.path.join(_upload_dir(upload), 'assembled')
+    with open(assembled_path, 'wb') as assembled_file:
+        for index in range(upload.total_chunks):
+            with open(_chunk_path(upload, index), 'rb') as chunk_file:
+                while True:
+                    block = chunk_file.read(STREAM_BLOCK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    assembled_file.write(block)
+            os.unlink(_chunk_path(upload, index))
+
+    if upload.sha256 and digest.hexdigest() != upload.sha256:
+        os.unlink(assembled_path)
+        upload.parts.all().delete()
+        raise ChunkedUploadError('The assembled file failed checksum verification. Upload the chunks again.')
+    return AssembledUploadFile(open(assembled_path, 'rb'), name=upload.filename, sha256=digest.hexdigest())
+
+
+def finish_upload(upload, status='completed'):
+    with transaction.atomic():
+        upload.status = status
+        upload.completed_at = timezone.now() if status == 'completed' else None
+        upload.save(update_fields=['status', 'completed_at', 'updated_at'])
+        upload.parts.all().delete()
+    shutil.rmtree(_upload_dir(upload), ignore_errors=True)
+
+
+def purge_expired_uploads(now=None):
+    now = now or timezone.now()
+    expired_uploads = list(ChunkedUpload.objects.filter(status='uploading', expires_at__lte=now))
+    for upload in expired_uploads:
+        finish_upload(upload, status='aborted')
+    return len(expired_uploads)
@@ -0,0 +1,186 @@
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from .code_runner import CodeRunnerValidationError
+
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_COMPLETED = 'completed'
+JOB_STATUS_FAILED = 'failed'
+
+
+class ExecutionQueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Code runner is busy. Try again shortly.')
+        self.retry_after = retry_after
+
+
+def _job_cache_key(job_id):
+    return f'code-execution:job:{job_id}'
+
+
+def _job_ttl():
+    return int(getattr(settings, 'CODE_EXECUTION_JOB_TTL_SECONDS', 600))
+
+
+def get_job_state(job_id):
+    return cache.get(_job_cache_key(job_id))
+
+
+class ExecutionJob:
+    def __init__(self, user_id, func, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.time()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def store_state(self, status, **extra):
+        cache.set(_job_cache_key(self.id), {
+            'job_id': self.id,
+            'user_id': self.user_id,
+            'status': status,
+            'submitted_at': self.submitted_at,
+            **extra,
+        }, _job_ttl())
+
+
+class CodeExecutionService:
+    """
+    Fixed number of worker threads, each driving one compiler/program process
+    at a time, fed from a bounded queue. Jobs are taken round-robin across users
+    so one student pressing Run repeatedly cannot delay the rest of the class.
+    Job state is mirrored in the shared cache so any API worker can answer polls.
+    With max_workers=0 jobs run inline in the submitting thread.
+    """
+
+    def __init__(self, max_workers, max_queue_size, max_jobs_per_user):
+        self.max_workers = max(0, max_workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.max_jobs_per_user = max(1, max_jobs_per_user)
+        self._condition = threading.Condition()
+        self._queues = OrderedDict()
+        self._queued_count = 0
+        self._active_per_user = {}
+        self._workers = []
+        self._average_job_seconds = 1.0
+
+    def _ensure_workers(self):
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name='code-execution-worker', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _retry_after_seconds(self):
+        backlog_rounds = math.ceil((self._queued_count + 1) / max(1, self.max_workers))
+        return max(1, math.ceil(backlog_rounds * self._average_job_seconds))
+
+    def submit(self, user_id, func, *args, **kwargs):
+        if not self.max_workers:
+            job = ExecutionJob(user_id, func, args, kwargs)
+            self._run(job)
+            job.done.set()
+            return job
+
+        with self._condition:
+            if self._queued_count >= self.max_queue_size:
+                raise ExecutionQueueFull(self._retry_after_seconds())
+            if self._active_per_user.get(user_id, 0) >= self.max_jobs_per_user:
+                raise ExecutionQueueFull(self._retry_after_seconds())
+
+            job = ExecutionJob(user_id, func, args, kwargs)
+            job.store_state(JOB_STATUS_QUEUED)
+            self._queues.setdefault(user_id, deque()).append(job)
+            self._queued_count += 1
+            self._active_per_user[user_id] = self._active_per_user.get(user_id, 0) + 1
+            self._ensure_workers()
+            self._condition.notify()
+            return job
+
+    def _next_job(self):
+        with self._condition:
+            while not self._queued_count:
+                self._condition.wait()
+            user_id, user_queue = next(iter(self._queues.items()))
+            job = user_queue.popleft()
+            if user_queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            self._queued_count -= 1
+            return job
+
+    def _finish(self, job, elapsed_seconds):
+        with self._condition:
+            remaining = self._active_per_user.get(job.user_id, 1) - 1
+            if remaining > 0:
+                self._active_per_user[job.user_id] = remaining
+            else:
+                self._active_per_user.pop(job.user_id, None)
+            self._average_job_seconds = (self._average_job_seconds * 0.8) + (elapsed_seconds * 0.2)
+        job.done.set()
+
+    def _run(self, job):
+        job.store_state(JOB_STATUS_RUNNING)
+        try:
+            job.result = job.func(*job.args, **job.kwargs)
+            job.store_state(JOB_STATUS_COMPLETED, result=job.result)
+        except CodeRunnerValidationError as exc:
+            job.error = str(exc)
+            job.store_state(JOB_STATUS_FAILED, detail=job.error)
+        except Exception as exc:
+            job.error = 'Code execution failed.'
+            job.store_state(JOB_STATUS_FAILED, detail=f'{job.error} {exc}')
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            started_at = time.monotonic()
+            close_old_connections()
+            try:
+                self._run(job)
+            finally:
+                close_old_connections()
+                self._finish(job, time.monotonic() - started_at)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_execution_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CodeExecutionService(
+                max_workers=int(getattr(settings, 'CODE_EXECUTION_WORKERS', 2)),
+                max_queue_size=int(getattr(settings, 'CODE_EXECUTION_QUEUE_SIZE', 32)),
+                max_jobs_per_user=int(getattr(settings, 'CODE_EXECUTION_MAX_JOBS_PER_USER', 2)),
+            )
+        return _service
+
+
+@receiver(setting_changed)
+def _reset_execution_service(setting, **kwargs):
+    global _service
+    if setting.startswith('CODE_EXECUTION_'):
+        with _service_lock:
+            _service = None
@@ -1,16 +1,60 @@
+import hashlib
 import os
+import selectors
 import shutil
 import signal
 import subprocess
 import sys
 import tempfile
 import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import warm_runtimes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 
 MAX_CODE_SIZE = 100_000
 MAX_INPUT_SIZE = 20_000
 MAX_OUTPUT_SIZE = 20_000
+# Bytes read per stream before the program is killed; enough for MAX_OUTPUT_SIZE
+# characters of any UTF-8 text.
+MAX_CAPTURE_BYTES = MAX_OUTPUT_SIZE * 4
+READ_CHUNK_BYTES = 32 * 1024
+MEMORY_SAMPLE_SECONDS = 0.01
+MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024
 DEFAULT_TIMEOUT_SECONDS = 5
+MAX_JUDGE_TEST_CASES = 50
+
+VERDICT_ACCEPTED = 'AC'
+VERDICT_WRONG_ANSWER = 'WA'
+VERDICT_TIME_LIMIT_EXCEEDED = 'TLE'
+VERDICT_RUNTIME_ERROR = 'RE'
+VERDICT_OUTPUT_LIMIT_EXCEEDED = 'OLE'
+
+
+COMPILE_FLAGS = {
+    'c': ('-O2', '-std=c11'),
+    'cpp': ('-O2', '-std=c++17'),
+    'java': ('-J-XX:+UseSerialGC', '-J-XX:TieredStopAtLevel=1'),
+}
+# Short-lived student programs gain nothing from the JIT tiers or parallel GC.
+JAVA_RUN_FLAGS = ('-XX:+UseSerialGC', '-XX:TieredStopAtLevel=1', '-Xshare:auto')
+# The JVM and V8 reserve far more address space than they use, so they are
+# capped with heap flags instead of RLIMIT_AS.
+ADDRESS_SPACE_LIMITED_LANGUAGES = ('python', 'c', 'cpp')
+COMPILERS = {
+    'c': 'gcc',
+    'cpp': 'g++',
+    'java': 'javac',
+}
+COMPILE_CACHE_STATS_KEY = 'code-runner:compile-cache:{}'
 
 
 LANGUAGE_ALIASES = {
@@ -66,37 +110,257 @@ def _kill_process_tree(process):
         pass
 
 
-def _run_process(command, temp_dir, program_input='', timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
-    start = time.monotonic()
-    process = subprocess.Popen(
-        command,
-        cwd=temp_dir,
-        env=_base_env(temp_dir),
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        start_new_session=os.name != 'nt',
-    )
+def _memory_limit_mb():
+    return int(getattr(settings, 'CODE_RUNNER_MEMORY_LIMIT_MB', 256))
+
+
+def _max_processes():
+    return int(getattr(settings, 'CODE_RUNNER_MAX_PROCESSES', 0))
+
+
+# Fallback exec wrapper for hosts without util-linux prlimit. Arguments are
+# "resource:soft:hard" specs, then "--" and the command to exec.
+PYTHON_LIMIT_LAUNCHER = (
+    "import os, resource, sys\n"
+    "split = sys.argv.index('--')\n"
+    "for spec in sys.argv[1:split]:\n"
+    "    limit, soft, hard = map(int, spec.split(':'))\n"
+    "    resource.setrlimit(limit, (soft, hard))\n"
+    "os.execvp(sys.argv[split + 1], sys.argv[split + 1:])\n"
+)
+
+
+def _limit_prefix(language=None, timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Command prefix that applies the sandbox rlimits and then execs the program.
+    Limits are only ever lowered, never raised above what the server itself runs
+    with. They are not set from a preexec_fn, which can deadlock in the forked
+    child while other threads of the execution pool hold locks.
+    """
+    if resource is None or os.name == 'nt':
+        return []
+
+    limits = [
+        ('cpu', resource.RLIMIT_CPU, int(timeout_seconds) + 1),
+        ('fsize', resource.RLIMIT_FSIZE, MAX_FILE_SIZE_BYTES),
+        ('core', resource.RLIMIT_CORE, 0),
+    ]
+    if language in ADDRESS_SPACE_LIMITED_LANGUAGES:
+        limits.append(('as', resource.RLIMIT_AS, _memory_limit_mb() * 1024 * 1024))
+    if _max_processes() > 0 and hasattr(resource, 'RLIMIT_NPROC'):
+        # RLIMIT_NPROC counts every process and thread of the OS user, not just this tree.
+        limits.append(('nproc', resource.RLIMIT_NPROC, _max_processes()))
+
+    clamped = []
+    for name, limit, value in limits:
+        _, hard = resource.getrlimit(limit)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        clamped.append((name, limit, value, hard))
+
+    prlimit = shutil.which('prlimit')
+    if prlimit:
+        return [
+            prlimit,
+            *(
+                f"--{name}={soft}:{'unlimited' if hard == resource.RLIM_INFINITY else hard}"
+                for name, _, soft, hard in clamped
+            ),
+            '--',
+        ]
+    return [
+        sys.executable, '-S', '-c', PYTHON_LIMIT_LAUNCHER,
+        *(f'{limit}:{soft}:{hard}' for _, limit, soft, hard in clamped),
+        '--',
+    ]
+
+
+def _popen_kwargs(temp_dir):
+    return {
+        'env': _base_env(temp_dir),
+        'stdin': subprocess.PIPE,
+        'stdout': subprocess.PIPE,
+        'stderr': subprocess.PIPE,
+        'start_new_session': os.name != 'nt',
+    }
+
 
+def _sample_peak_memory_kb(pid):
+    """
+    Peak RSS of the running program from /proc. rusage from wait4 is not used
+    for memory on Linux because ru_maxrss keeps the forking server's RSS
+    across exec.
+    """
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def _sample_cpu_time_ms(pid):
+    try:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as stat_file:
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) * 1000 // os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _reap(process, deadline, memory_samples):
+    """Wait for the child until deadline and return its rusage, or None on timeout."""
+    while True:
+        pid, wait_status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(wait_status)
+            return usage
+        if time.monotonic() >= deadline:
+            return None
+        memory_samples.append(_sample_peak_memory_kb(process.pid))
+        time.sleep(MEMORY_SAMPLE_SECONDS)
+
+
+def _resource_metrics(usage, memory_samples, startup_cpu_time_ms):
+    memory_samples = [sample for sample in memory_samples if sample is not None]
+    if memory_samples:
+        peak_memory_kb = max(memory_samples)
+    elif os.path.isdir('/proc'):
+        peak_memory_kb = None
+    else:
+        peak_memory_kb = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return {
+        'cpu_time_ms': max(0, int((usage.ru_utime + usage.ru_stime) * 1000) - startup_cpu_time_ms),
+        'peak_memory_kb': peak_memory_kb,
+    }
+
+
+def _capture_process(process, input_bytes, timeout_seconds):
+    """
+    Feed stdin and read stdout/stderr incrementally, killing the process tree
+    as soon as the timeout passes or either stream exceeds MAX_CAPTURE_BYTES so
+    a runaway print loop cannot grow the worker's memory.
+    """
+    deadline = time.monotonic() + timeout_seconds
+    # Warm interpreters have already spent CPU booting before they got this job.
+    startup_cpu_time_ms = _sample_cpu_time_ms(process.pid)
+    memory_samples = [_sample_peak_memory_kb(process.pid)]
+    output = {process.stdout: bytearray(), process.stderr: bytearray()}
+    timed_out = False
+    output_limit_exceeded = False
+
+    with selectors.DefaultSelector() as selector:
+        if input_bytes:
+            os.set_blocking(process.stdin.fileno(), False)
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        else:
+            process.stdin.close()
+        for stream in output:
+            selector.register(stream, selectors.EVENT_READ)
+
+        input_view = memoryview(input_bytes)
+        while selector.get_map() and not output_limit_exceeded:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            events = selector.select(min(remaining, MEMORY_SAMPLE_SECONDS))
+            memory_samples.append(_sample_peak_memory_kb(process.pid))
+            for key, _ in events:
+                if key.fileobj is process.stdin:
+                    try:
+                        input_view = input_view[os.write(key.fd, input_view[:READ_CHUNK_BYTES]):]
+                    except BrokenPipeError:
+                        input_view = input_view[:0]
+                    if not input_view:
+                        selector.unregister(process.stdin)
+                        process.stdin.close()
+                    continue
+
+                chunk = os.read(key.fd, READ_CHUNK_BYTES)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                output[key.fileobj] += chunk
+                if len(output[key.fileobj]) > MAX_CAPTURE_BYTES:
+                    output_limit_exceeded = True
+
+    usage = None if timed_out or output_limit_exceeded else _reap(process, deadline, memory_samples)
+    if usage is None:
+        timed_out = timed_out or not output_limit_exceeded
+        _kill_process_tree(process)
+        usage = _reap(process, float('inf'), memory_samples)
+    for stream in (process.stdin, process.stdout, process.stderr):
+        stream.close()
+
+    return {
+        'stdout': _clip_output(bytes(output[process.stdout][:MAX_CAPTURE_BYTES])),
+        'stderr': _clip_output(bytes(output[process.stderr][:MAX_CAPTURE_BYTES])),
+        'exit_code': process.returncode,
+        'timed_out': timed_out,
+        'output_limit_exceeded': output_limit_exceeded,
+        **_resource_metrics(usage, memory_samples, startup_cpu_time_ms),
+    }
+
+
+def _communicate_process(process, input_bytes, timeout_seconds):
     timed_out = False
     try:
-        stdout, stderr = process.communicate(program_input or '', timeout=timeout_seconds)
+        stdout, stderr = process.communicate(input_bytes, timeout=timeout_seconds)
     except subprocess.TimeoutExpired:
         timed_out = True
         _kill_process_tree(process)
         stdout, stderr = process.communicate()
-
-    duration_ms = int((time.monotonic() - start) * 1000)
     return {
         'stdout': _clip_output(stdout),
         'stderr': _clip_output(stderr),
         'exit_code': process.returncode,
         'timed_out': timed_out,
-        'duration_ms': duration_ms,
+        'output_limit_exceeded': False,
+        'cpu_time_ms': None,
+        'peak_memory_kb': None,
     }
 
 
+def _run_process(command, temp_dir, program_input='', timeout_seconds=DEFAULT_TIMEOUT_SECONDS, language=None, warm=False):
+    """
+    Run command in temp_dir under the sandbox rlimits. With warm=True, Python
+    and JavaScript programs are handed to an already started interpreter from
+    the warm pool when one is configured; command[-1] is then the source path
+    the bootstrap should execute.
+    """
+    start = time.monotonic()
+    warm_pool = None
+    if warm:
+        warm_pool = warm_runtimes.get_warm_pool(
+            language,
+            _popen_kwargs(tempfile.gettempdir()),
+            [*_limit_prefix(language), *command[:-1]],
+        )
+    if warm_pool:
+        process = warm_pool.acquire()
+        program_input = warm_runtimes.job_header(command[-1], temp_dir, _base_env(temp_dir)) + (program_input or '')
+    else:
+        process = subprocess.Popen(
+            [*_limit_prefix(language, timeout_seconds), *command],
+            cwd=temp_dir,
+            **_popen_kwargs(temp_dir),
+        )
+
+    input_bytes = (program_input or '').encode('utf-8')
+    if os.name == 'nt':
+        result = _communicate_process(process, input_bytes, timeout_seconds)
+    else:
+        result = _capture_process(process, input_bytes, timeout_seconds)
+
+    result['duration_ms'] = int((time.monotonic() - start) * 1000)
+    if warm_pool:
+        warm_pool.refill()
+    return result
+
+
 def _missing_binaries(binary_names):
     return [binary for binary in binary_names if not shutil.which(binary)]
 
@@ -111,7 +375,10 @@ def _setup_failure(language, missing_binaries):
         'stderr': f'Missing runtime/compiler: {runtime_names}',
         'exit_code': None,
         'timed_out': False,
+        'output_limit_exceeded': False,
         'duration_ms': 0,
+        'cpu_time_ms': 0,
+        'peak_memory_kb': 0,
     }
 
 
@@ -122,41 +389,183 @@ def _write_source(temp_dir, filename, source_code):
     return source_path
 
 
-def _language_commands(language, temp_dir, source_code):
+def _java_source_launch_enabled():
+    return bool(getattr(settings, 'CODE_RUNNER_JAVA_SOURCE_LAUNCH', False))
+
+
+def _language_commands(language, temp_dir, source_code, single_run=False):
     if language == 'python':
         source_path = _write_source(temp_dir, 'main.py', source_code)
         return (), None, [sys.executable, '-I', source_path]
 
     if language == 'javascript':
         source_path = _write_source(temp_dir, 'main.js', source_code)
-        return ('node',), None, ['node', source_path]
+        return ('node',), None, ['node', f'--max-old-space-size={_memory_limit_mb()}', source_path]
 
     if language == 'c':
         source_path = _write_source(temp_dir, 'main.c', source_code)
         output_path = os.path.join(temp_dir, 'main')
-        return ('gcc',), ['gcc', source_path, '-O2', '-std=c11', '-o', output_path], [output_path]
+        return ('gcc',), ['gcc', source_path, *COMPILE_FLAGS['c'], '-o', output_path], [output_path]
 
     if language == 'cpp':
         source_path = _write_source(temp_dir, 'main.cpp', source_code)
         output_path = os.path.join(temp_dir, 'main')
-        return ('g++',), ['g++', source_path, '-O2', '-std=c++17', '-o', output_path], [output_path]
+        return ('g++',), ['g++', source_path, *COMPILE_FLAGS['cpp'], '-o', output_path], [output_path]
 
     if language == 'java':
         source_path = _write_source(temp_dir, 'Main.java', source_code)
-        return ('javac', 'java'), ['javac', source_path], ['java', '-cp', temp_dir, 'Main']
+        if single_run and _java_source_launch_enabled():
+            # Single-file source launch compiles in memory inside the run JVM,
+            # saving the separate javac JVM when the program runs only once.
+            return ('java',), None, ['java', *JAVA_RUN_FLAGS, f'-Xmx{_memory_limit_mb()}m', source_path]
+        return (
+            ('javac', 'java'),
+            ['javac', *COMPILE_FLAGS['java'], source_path],
+            ['java', *JAVA_RUN_FLAGS, f'-Xmx{_memory_limit_mb()}m', '-cp', temp_dir, 'Main'],
+        )
 
     raise CodeRunnerValidationError('Unsupported language.')
 
 
-def run_code(language, source_code, program_input='', timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+def _compile_cache_dir():
+    return getattr(settings, 'CODE_RUNNER_COMPILE_CACHE_DIR', '')
+
+
+def _compile_cache_max_bytes():
+    return int(getattr(settings, 'CODE_RUNNER_COMPILE_CACHE_MAX_BYTES', 0))
+
+
+def _compile_cache_enabled():
+    return bool(_compile_cache_dir()) and _compile_cache_max_bytes() > 0
+
+
+def _compiler_fingerprint(language):
+    compiler_path = shutil.which(COMPILERS[language]) or COMPILERS[language]
+    try:
+        compiler_mtime = os.stat(os.path.realpath(compiler_path)).st_mtime_ns
+    except OSError:
+        compiler_mtime = 0
+    return f'{os.path.realpath(compiler_path)}:{compiler_mtime}'
+
+
+def _compile_cache_key(language, source_code):
+    digest = hashlib.sha256()
+    for part in (language, _compiler_fingerprint(language), ' '.join(COMPILE_FLAGS[language]), source_code):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _count_compile_cache(outcome):
+    key = COMPILE_CACHE_STATS_KEY.format(outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _restore_compiled_artifacts(cache_key, temp_dir):
+    entry_dir = os.path.join(_compile_cache_dir(), cache_key)
+    try:
+        artifact_names = os.listdir(entry_dir)
+        for artifact_name in artifact_names:
+            shutil.copy2(os.path.join(entry_dir, artifact_name), os.path.join(temp_dir, artifact_name))
+        os.utime(entry_dir)
+    except OSError:
+        return False
+    return bool(artifact_names)
+
+
+def _compile_cache_entries(cache_dir):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.is_dir() or entry.name.startswith('.'):
+            continue
+        try:
+            size = sum(artifact.stat().st_size for artifact in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+        except OSError:
+            continue
+    return entries
+
+
+def _evict_compile_cache(cache_dir, max_bytes):
+    entries = sorted(_compile_cache_entries(cache_dir))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry_path in entries:
+        if total_size <= max_bytes:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
+
+
+def _store_compiled_artifacts(cache_key, temp_dir, artifact_names):
+    if not artifact_names:
+        return
+    cache_dir = _compile_cache_dir()
+    staging_dir = os.path.join(cache_dir, f'.staging-{uuid.uuid4().hex}')
+    try:
+        os.makedirs(staging_dir)
+        for artifact_name in artifact_names:
+            shutil.copy2(os.path.join(temp_dir, artifact_name), os.path.join(staging_dir, artifact_name))
+        os.rename(staging_dir, os.path.join(cache_dir, cache_key))
+    except OSError:
+        # Another worker stored the same key first, or the cache volume is unavailable.
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return
+    _evict_compile_cache(cache_dir, _compile_cache_max_bytes())
+
+
+def _compile(language, compile_command, temp_dir, source_code, timeout_seconds):
+    """
+    Compile into temp_dir, reusing artifacts from the on-disk LRU cache keyed by
+    language, compiler, flags and the SHA-256 of the source. Returns the compile
+    result (None on a cache hit) and the cache outcome.
+    """
+    if not _compile_cache_enabled():
+        return _run_process(compile_command, temp_dir, timeout_seconds=timeout_seconds), 'disabled'
+
+    cache_key = _compile_cache_key(language, source_code)
+    if _restore_compiled_artifacts(cache_key, temp_dir):
+        _count_compile_cache('hits')
+        return None, 'hit'
+
+    _count_compile_cache('misses')
+    existing_files = set(os.listdir(temp_dir))
+    compile_result = _run_process(compile_command, temp_dir, timeout_seconds=timeout_seconds)
+    if not compile_result['timed_out'] and compile_result['exit_code'] == 0:
+        _store_compiled_artifacts(cache_key, temp_dir, sorted(set(os.listdir(temp_dir)) - existing_files))
+    return compile_result, 'miss'
+
+
+def compile_cache_stats():
+    cache_dir = _compile_cache_dir()
+    entries = _compile_cache_entries(cache_dir) if cache_dir and os.path.isdir(cache_dir) else []
+    return {
+        'enabled': _compile_cache_enabled(),
+        'hits': cache.get(COMPILE_CACHE_STATS_KEY.format('hits'), 0),
+        'misses': cache.get(COMPILE_CACHE_STATS_KEY.format('misses'), 0),
+        'entries': len(entries),
+        'size_bytes': sum(size for _, size, _ in entries),
+        'max_bytes': _compile_cache_max_bytes(),
+    }
+
+
+def _validate_source(language, source_code):
     normalized_language = normalize_language(language)
     if not normalized_language:
         raise CodeRunnerValidationError('Unsupported language.')
+    if len(source_code or '') > MAX_CODE_SIZE:
+        raise CodeRunnerValidationError('Code is too large to run.')
+    return normalized_language
+
+
+def run_code(language, source_code, program_input='', timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+    normalized_language = _validate_source(language, source_code)
 
     source_code = source_code or ''
     program_input = program_input or ''
-    if len(source_code) > MAX_CODE_SIZE:
-        raise CodeRunnerValidationError('Code is too large to run.')
     if len(program_input) > MAX_INPUT_SIZE:
         raise CodeRunnerValidationError('Input is too large to run.')
 
@@ -165,19 +574,28 @@ def run_code(language, source_code, program_input='', timeout_seconds=DEFAULT_TI
             normalized_language,
             temp_dir,
             source_code,
+            single_run=True,
         )
         missing_binaries = _missing_binaries(required_binaries)
         if missing_binaries:
             return _setup_failure(normalized_language, missing_binaries)
 
+        compile_cache = None
         if compile_command:
-            compile_result = _run_process(compile_command, temp_dir, timeout_seconds=timeout_seconds)
-            if compile_result['timed_out'] or compile_result['exit_code'] != 0:
+            compile_result, compile_cache = _compile(
+                normalized_language,
+                compile_command,
+                temp_dir,
+                source_code,
+                timeout_seconds,
+            )
+            if compile_result and (compile_result['timed_out'] or compile_result['exit_code'] != 0):
                 return {
                     **compile_result,
                     'language': normalized_language,
                     'success': False,
                     'stage': 'compile',
+                    'compile_cache': compile_cache,
                 }
 
         run_result = _run_process(
@@ -185,10 +603,118 @@ def run_code(language, source_code, program_input='', timeout_seconds=DEFAULT_TI
             temp_dir,
             program_input=program_input,
             timeout_seconds=timeout_seconds,
+            language=normalized_language,
+            warm=True,
         )
         return {
             **run_result,
             'language': normalized_language,
             'success': not run_result['timed_out'] and run_result['exit_code'] == 0,
             'stage': 'run',
+            'compile_cache': compile_cache,
         }
+
+
+def _normalize_judge_output(value):
+    lines = [line.rstrip() for line in str(value or '').replace('\r\n', '\n').split('\n')]
+    while lines and not lines[-1]:
+        lines.pop()
+    return '\n'.join(lines)
+
+
+def _judge_verdict(run_result, expected_output):
+    if run_result['timed_out']:
+        return VERDICT_TIME_LIMIT_EXCEEDED
+    if run_result['output_limit_exceeded']:
+        return VERDICT_OUTPUT_LIMIT_EXCEEDED
+    if run_result['exit_code'] != 0:
+        return VERDICT_RUNTIME_ERROR
+    if _normalize_judge_output(run_result['stdout']) != _normalize_judge_output(expected_output):
+        return VERDICT_WRONG_ANSWER
+    return VERDICT_ACCEPTED
+
+
+def judge_code(language, source_code, test_cases, timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Compile the source once and run the compiled program against every test
+    case. Each case is {'input': str, 'expected_output': str}; the result
+    lists an AC/WA/TLE/RE/OLE verdict, timing and resource usage per case.
+    """
+    normalized_language = _validate_source(language, source_code)
+    test_cases = list(test_cases or [])
+    if not test_cases:
+        raise CodeRunnerValidationError('At least one test case is required.')
+    if len(test_cases) > MAX_JUDGE_TEST_CASES:
+        raise CodeRunnerValidationError(f'At most {MAX_JUDGE_TEST_CASES} test cases can be judged at once.')
+    for case in test_cases:
+        if len(case.get('input') or '') > MAX_INPUT_SIZE:
+            raise CodeRunnerValidationError('Test case input is too large to run.')
+
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix='tutorlix-judge-') as temp_dir:
+        required_binaries, compile_command, run_command = _language_commands(
+            normalized_language,
+            temp_dir,
+            source_code or '',
+        )
+        missing_binaries = _missing_binaries(required_binaries)
+        if missing_binaries:
+            return {
+                **_setup_failure(normalized_language, missing_binaries),
+                'cases': [],
+                'passed_count': 0,
+                'total_count': len(test_cases),
+            }
+
+        compile_duration_ms = 0
+        compile_cache = None
+        if compile_command:
+            compile_result, compile_cache = _compile(
+                normalized_language,
+                compile_command,
+                temp_dir,
+                source_code or '',
+                timeout_seconds,
+            )
+            compile_duration_ms = compile_result['duration_ms'] if compile_result else 0
+            if compile_result and (compile_result['timed_out'] or compile_result['exit_code'] != 0):
+                return {
+                    **compile_result,
+                    'language': normalized_language,
+                    'success': False,
+                    'stage': 'compile',
+                    'compile_duration_ms': compile_duration_ms,
+                    'compile_cache': compile_cache,
+                    'cases': [],
+                    'passed_count': 0,
+                    'total_count': len(test_cases),
+                }
+
+        cases = []
+        for index, case in enumerate(test_cases):
+            run_result = _run_process(
+                run_command,
+                temp_dir,
+                program_input=case.get('input') or '',
+                timeout_seconds=timeout_seconds,
+                language=normalized_language,
+                warm=True,
+            )
+            cases.append({
+                **run_result,
+                'index': index,
+                'verdict': _judge_verdict(run_result, case.get('expected_output')),
+            })
+
+    passed_count = sum(1 for case in cases if case['verdict'] == VERDICT_ACCEPTED)
+    return {
+        'language': normalized_language,
+        'success': passed_count == len(cases),
+        'stage': 'judge',
+        'compile_duration_ms': compile_duration_ms,
+        'compile_cache': compile_cache,
+        'cases': cases,
+        'passed_count': passed_count,
+        'total_count': len(cases),
+        'duration_ms': int((time.monotonic() - start) * 1000),
+    }
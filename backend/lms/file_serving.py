@@ -0,0 +1,203 @@
+"""
+Serving private files after Django has checked access.
+
+FILE_SERVING_BACKEND picks who streams the bytes:
+  - 'django': Django itself, honouring single byte-range Range requests.
+  - 'x-accel-redirect': nginx, through internal locations. A file under
+    MEDIA_ROOT goes to FILE_SERVING_ACCEL_PREFIX + 'media/' and a protected
+    resource to FILE_SERVING_ACCEL_PREFIX + 'protected/', followed by its path
+    inside that root. Files anywhere else are streamed by Django.
+  - 'x-sendfile': Apache mod_xsendfile / lighttpd, given the absolute path.
+
+Files opened outside an authenticated API call (attachments in <img>, <a>
+or a PDF viewer) get short-lived signed URLs from signed_file_url(). The
+signature is checked by SignedFileView, which then serves through the same
+backend.
+"""
+import mimetypes
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+
+SIGNED_URL_SALT = 'lms.file-serving'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _backend():
+    return getattr(settings, 'FILE_SERVING_BACKEND', 'django')
+
+
+def parse_range(header, size):
+    """
+    (start, end) of the single byte range requested, end inclusive. Returns
+    None when the whole file should be sent: no header, a malformed one, or
+    several ranges, which servers may answer with the full file.
+    """
+    match = RANGE_PATTERN.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix_length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _iter_range(file_handle, start, length):
+    try:
+        file_handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = file_handle.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        file_handle.close()
+
+
+def _validators(field_file, size):
+    try:
+        modified = field_file.storage.get_modified_time(field_file.name)
+    except (NotImplementedError, OSError):
+        return None, None
+    timestamp = int(modified.timestamp())
+    return quote_etag(f'{size:x}-{timestamp:x}'), http_date(timestamp)
+
+
+def _accel_redirect_path(path):
+    """Internal nginx URI for path, or None when it is outside the roots nginx may read."""
+    from .models import protected_resource_storage
+
+    prefix = getattr(settings, 'FILE_SERVING_ACCEL_PREFIX', '/protected-files/').rstrip('/')
+    real_path = os.path.realpath(path)
+    for location, root in (('media', settings.MEDIA_ROOT), ('protected', protected_resource_storage.location)):
+        root = os.path.realpath(root)
+        if real_path.startswith(root + os.sep):
+            relative_path = os.path.relpath(real_path, root).replace(os.sep, '/')
+            return f'{prefix}/{location}/{relative_path}'
+    return None
+
+
+def _offload_response(field_file, content_type, disposition):
+    path = field_file.path
+    if _backend() == 'x-sendfile':
+        header, value = 'X-Sendfile', path
+    else:
+        header, value = 'X-Accel-Redirect', _accel_redirect_path(path)
+        if value is None:
+            return None
+    response = HttpResponse(content_type=content_type)
+    response['Content-Disposition'] = disposition
+    response[header] = value
+    return response
+
+
+def serve_file(request, field_file, *, filename=None, as_attachment=False):
+    """Response streaming `field_file`. The caller has already checked access."""
+    if not field_file:
+        raise Http404('File not found.')
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(as_attachment, filename)
+    if _backend() in ('x-accel-redirect', 'x-sendfile'):
+        response = _offload_response(field_file, content_type, disposition)
+        if response is not None:
+            return response
+
+    try:
+        file_handle = field_file.open('rb')
+        size = field_file.size
+    except FileNotFoundError as exc:
+        raise Http404('File not found.') from exc
+    etag, last_modified = _validators(field_file, size)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range in (etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            file_handle.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file_handle, content_type=content_type, as_attachment=as_attachment, filename=filename)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(file_handle, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = disposition
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+    return response
+
+
+def signed_file_url(request, instance, field_name, *, filename=None):
+    """
+    Absolute URL serving instance.<field_name> for FILE_SERVING_SIGNED_URL_MAX_AGE
+    seconds without further authentication. Only hand it to users who may read the file.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    token = signing.dumps(
+        {
+            'model': instance._meta.label_lower,
+            'pk': instance.pk,
+            'field': field_name,
+            'name': field_file.name,
+            'filename': os.path.basename(filename or field_file.name),
+        },
+        salt=SIGNED_URL_SALT,
+        compress=True,
+    )
+    url = reverse('signed-file', kwargs={'token': token})
+    return request.build_absolute_uri(url) if request else url
+
+
+def resolve_signed_file(token):
+    """(field file, download filename) for a token from signed_file_url(). Raises Http404 when invalid or expired."""
+    max_age = int(getattr(settings, 'FILE_SERVING_SIGNED_URL_MAX_AGE', 3600))
+    try:
+        payload = signing.loads(token, salt=SIGNED_URL_SALT, max_age=max_age)
+        model = apps.get_model(payload['model'])
+    except (signing.BadSignature, KeyError, LookupError, ValueError) as exc:
+        raise Http404('This link is invalid or has expired.') from exc
+
+    instance = model._default_manager.filter(pk=payload['pk']).first()
+    field_file = getattr(instance, payload['field'], None) if instance is not None else None
+    # A replaced file invalidates links issued for the old one.
+    if not field_file or field_file.name != payload['name']:
+        raise Http404('File not found.')
+    return field_file, payload['filename']
@@ -0,0 +1,249 @@
+import csv
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .item_analysis import invalidate_item_analysis
+from .models import TestAnswer, TestAttempt, TestGradebookEntry
+
+
+GRADEBOOK_ITERATOR_CHUNK_SIZE = 500
+
+ENTRY_COLUMNS = (
+    'student_id',
+    'student__first_name',
+    'student__last_name',
+    'student__email',
+    'status',
+    'total_awarded_marks',
+    'answered_count',
+    'reviewed_count',
+    'is_fully_reviewed',
+    'time_spent_seconds',
+    'submitted_at',
+)
+
+
+def refresh_gradebook_entry(attempt):
+    totals = attempt.answers.aggregate(
+        answered_count=Count('id'),
+        reviewed_count=Count('id', filter=Q(reviewed_at__isnull=False)),
+        total_awarded_marks=Sum('awarded_marks'),
+    )
+    answered_count = totals['answered_count'] or 0
+    reviewed_count = totals['reviewed_count'] or 0
+    entry, _ = TestGradebookEntry.objects.update_or_create(
+        attempt=attempt,
+        defaults={
+            'test_id': attempt.test_id,
+            'student_id': attempt.student_id,
+            'status': attempt.status,
+            'total_awarded_marks': totals['total_awarded_marks'] or Decimal('0'),
+            'answered_count': answered_count,
+            'reviewed_count': reviewed_count,
+            'is_fully_reviewed': answered_count > 0 and reviewed_count >= answered_count,
+            'reviewed_at': attempt.reviewed_at,
+            'time_spent_seconds': attempt.time_spent_seconds or 0,
+            'submitted_at': attempt.submitted_at,
+        },
+    )
+    invalidate_item_analysis(attempt.test_id)
+    return entry
+
+
+def refresh_gradebook_entries(attempt_ids):
+    """
+    Bulk refresh_gradebook_entry(): one aggregate over the answers of all the
+    attempts, then a bulk update of existing rows and bulk create of missing ones.
+    """
+    attempt_ids = list(attempt_ids)
+    now = timezone.now()
+    totals_by_attempt = {
+        row['attempt_id']: row
+        for row in TestAnswer.objects.filter(attempt_id__in=attempt_ids).values('attempt_id').annotate(
+            answered_count=Count('id'),
+            reviewed_count=Count('id', filter=Q(reviewed_at__isnull=False)),
+            total_awarded_marks=Sum('awarded_marks'),
+        )
+    }
+    existing_entries = {
+        entry.attempt_id: entry
+        for entry in TestGradebookEntry.objects.filter(attempt_id__in=attempt_ids)
+    }
+    entries_to_create = []
+    entries_to_update = []
+    test_ids = set()
+    for attempt in TestAttempt.objects.filter(id__in=attempt_ids).only(
+        'id', 'test_id', 'student_id', 'status', 'reviewed_at', 'time_spent_seconds', 'submitted_at',
+    ):
+        totals = totals_by_attempt.get(attempt.id, {})
+        answered_count = totals.get('answered_count') or 0
+        reviewed_count = totals.get('reviewed_count') or 0
+        entry = existing_entries.get(attempt.id)
+        if entry is None:
+            entry = TestGradebookEntry(attempt_id=attempt.id)
+            entries_to_create.append(entry)
+        else:
+            entries_to_update.append(entry)
+        entry.test_id = attempt.test_id
+        entry.student_id = attempt.student_id
+        entry.status = attempt.status
+        entry.total_awarded_marks = totals.get('total_awarded_marks') or Decimal('0')
+        entry.answered_count = answered_count
+        entry.reviewed_count = reviewed_count
+        entry.is_fully_reviewed = answered_count > 0 and reviewed_count >= answered_count
+        entry.reviewed_at = attempt.reviewed_at
+        entry.time_spent_seconds = attempt.time_spent_seconds or 0
+        entry.submitted_at = attempt.submitted_at
+        entry.updated_at = now
+        test_ids.add(attempt.test_id)
+
+    if entries_to_create:
+        TestGradebookEntry.objects.bulk_create(entries_to_create)
+    if entries_to_update:
+        TestGradebookEntry.objects.bulk_update(entries_to_update, [
+            'status',
+            'total_awarded_marks',
+            'answered_count',
+            'reviewed_count',
+            'is_fully_reviewed',
+            'reviewed_at',
+            'time_spent_seconds',
+            'submitted_at',
+            'updated_at',
+        ])
+    for test_id in test_ids:
+        invalidate_item_analysis(test_id)
+
+
+def _gradebook_questions(test):
+    return list(test.questions.order_by('order', 'id').values('id', 'order', 'title', 'marks'))
+
+
+def _student_name(first_name, last_name, email):
+    full_name = f'{first_name or ""} {last_name or ""}'.strip()
+    return full_name or email or ''
+
+
+def build_score_matrix(test):
+    questions = _gradebook_questions(test)
+    scores_by_student = {}
+    answer_rows = TestAnswer.objects.filter(attempt__test=test).values_list(
+        'attempt__student_id',
+        'question_id',
+        'awarded_marks',
+    )
+    for student_id, question_id, awarded_marks in answer_rows:
+        scores_by_student.setdefault(student_id, {})[question_id] = awarded_marks
+
+    rows = []
+    entries = TestGradebookEntry.objects.filter(test=test).order_by('student_id').values_list(*ENTRY_COLUMNS)
+    for entry in entries:
+        entry_data = dict(zip(ENTRY_COLUMNS, entry))
+        student_scores = scores_by_student.get(entry_data['student_id'], {})
+        rows.append({
+            'student': entry_data['student_id'],
+            'student_name': _student_name(
+                entry_data['student__first_name'],
+                entry_data['student__last_name'],
+                entry_data['student__email'],
+            ),
+            'student_email': entry_data['student__email'],
+            'status': entry_data['status'],
+            'total_awarded_marks': str(entry_data['total_awarded_marks'] or 0),
+            'answered_count': entry_data['answered_count'],
+            'reviewed_count': entry_data['reviewed_count'],
+            'is_fully_reviewed': entry_data['is_fully_reviewed'],
+            'time_spent_seconds': entry_data['time_spent_seconds'],
+            'submitted_at': entry_data['submitted_at'],
+            'scores': [
+                str(student_scores[question['id']]) if question['id'] in student_scores else None
+                for question in questions
+            ],
+        })
+
+    return {
+        'test': test.id,
+        'title': test.title,
+        'total_marks': str(sum((question['marks'] for question in questions), Decimal('0'))),
+        'questions': [
+            {**question, 'marks': str(question['marks'])}
+            for question in questions
+        ],
+        'rows': rows,
+    }
+
+
+class _EchoBuffer:
+    def write(self, value):
+        return value
+
+
+def iter_gradebook_csv(test):
+    """
+    Yield CSV lines for the gradebook, merging entries and answers from two
+    student-ordered iterators so memory use does not grow with class size.
+    """
+    questions = _gradebook_questions(test)
+    writer = csv.writer(_EchoBuffer())
+    yield writer.writerow([
+        'Student ID',
+        'Student Name',
+        'Email',
+        'Status',
+        *[f"Q{question['order']} ({question['marks']})" for question in questions],
+        'Total Marks',
+        'Answered',
+        'Reviewed',
+        'Fully Reviewed',
+        'Time Spent (s)',
+        'Submitted At',
+    ])
+
+    entries = (
+        TestGradebookEntry.objects.filter(test=test)
+        .order_by('student_id')
+        .values_list(*ENTRY_COLUMNS)
+        .iterator(chunk_size=GRADEBOOK_ITERATOR_CHUNK_SIZE)
+    )
+    answers = (
+        TestAnswer.objects.filter(attempt__test=test)
+        .order_by('attempt__student_id', 'question_id')
+        .values_list('attempt__student_id', 'question_id', 'awarded_marks')
+        .iterator(chunk_size=GRADEBOOK_ITERATOR_CHUNK_SIZE)
+    )
+    answer_groups = groupby(answers, key=itemgetter(0))
+    pending_group = next(answer_groups, None)
+
+    for entry in entries:
+        entry_data = dict(zip(ENTRY_COLUMNS, entry))
+        student_id = entry_data['student_id']
+        while pending_group is not None and pending_group[0] < student_id:
+            pending_group = next(answer_groups, None)
+
+        student_scores = {}
+        if pending_group is not None and pending_group[0] == student_id:
+            student_scores = {question_id: awarded_marks for _, question_id, awarded_marks in pending_group[1]}
+            pending_group = next(answer_groups, None)
+
+        submitted_at = entry_data['submitted_at']
+        yield writer.writerow([
+            student_id,
+            _student_name(
+                entry_data['student__first_name'],
+                entry_data['student__last_name'],
+                entry_data['student__email'],
+            ),
+            entry_data['student__email'] or '',
+            entry_data['status'],
+            *[student_scores.get(question['id'], '') for question in questions],
+            entry_data['total_awarded_marks'],
+            entry_data['answered_count'],
+            entry_data['reviewed_count'],
+            'yes' if entry_data['is_fully_reviewed'] else 'no',
+            entry_data['time_spent_seconds'],
+            submitted_at.isoformat() if submitted_at else '',
+        ])
@@ -0,0 +1,198 @@
+import numpy as np
+from django.core.cache import cache
+
+from .models import TestAnswer, TestAttempt
+
+
+ITEM_ANALYSIS_CACHE_TIMEOUT = 24 * 60 * 60
+SCORE_DISTRIBUTION_BINS = 10
+
+
+def _item_analysis_cache_key(test_id):
+    return f'test-item-analysis:{test_id}'
+
+
+def invalidate_item_analysis(test_id):
+    cache.delete(_item_analysis_cache_key(test_id))
+
+
+def _rounded(value, digits=4):
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def _column_correlations(items, rest_scores):
+    """Pearson correlation of every column of items with the matching column of rest_scores."""
+    item_deviation = items - items.mean(axis=0)
+    rest_deviation = rest_scores - rest_scores.mean(axis=0)
+    covariance = (item_deviation * rest_deviation).sum(axis=0)
+    scale = np.sqrt((item_deviation ** 2).sum(axis=0) * (rest_deviation ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(scale > 0, covariance / scale, np.nan)
+
+
+def _row_indexes(sorted_ids, ids):
+    """Positions of ids in sorted_ids, and a mask of the ids that are present."""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == ids
+
+
+def _load_score_matrix(test, question_ids):
+    attempt_ids = np.fromiter(
+        TestAttempt.objects.filter(test=test, status='submitted').order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    scores = np.zeros((len(attempt_ids), len(question_ids)), dtype=np.float64)
+    if not len(attempt_ids) or not len(question_ids):
+        return attempt_ids, scores
+
+    rows = TestAnswer.objects.filter(attempt__test=test, attempt__status='submitted').values_list(
+        'attempt_id',
+        'question_id',
+        'awarded_marks',
+    )
+    answer_data = np.array([(attempt_id, question_id, float(marks or 0)) for attempt_id, question_id, marks in rows], dtype=np.float64)
+    if len(answer_data):
+        question_order = np.argsort(question_ids)
+        sorted_question_ids = np.array(question_ids, dtype=np.int64)[question_order]
+        row_index, row_found = _row_indexes(attempt_ids, answer_data[:, 0].astype(np.int64))
+        column_position, column_found = _row_indexes(sorted_question_ids, answer_data[:, 1].astype(np.int64))
+        found = row_found & column_found
+        scores[row_index[found], question_order[column_position[found]]] = answer_data[found, 2]
+    return attempt_ids, scores
+
+
+def _load_selections(test, questions):
+    question_ids = [question['id'] for question in questions if question['question_type'] == 'multiple_choice']
+    selections = {question_id: [] for question_id in question_ids}
+    if question_ids:
+        rows = TestAnswer.objects.filter(
+            attempt__test=test,
+            attempt__status='submitted',
+            question_id__in=question_ids,
+        ).values_list('question_id', 'attempt_id', 'selected_options')
+        for question_id, attempt_id, selected_options in rows:
+            selections[question_id].append((attempt_id, selected_options or []))
+    return selections
+
+
+def _option_statistics(question, selections, attempt_ids, totals):
+    options = list(question['options'] or [])
+    option_index = {option: index for index, option in enumerate(options)}
+    correct_options = set(question['correct_options'] or [])
+    chosen_attempts = []
+    chosen_options = []
+    for attempt_id, selected_options in selections:
+        for option in selected_options:
+            if option in option_index:
+                chosen_attempts.append(attempt_id)
+                chosen_options.append(option_index[option])
+
+    rows, found = _row_indexes(attempt_ids, np.array(chosen_attempts, dtype=np.int64))
+    option_codes = np.array(chosen_options, dtype=np.int64)[found]
+    counts = np.bincount(option_codes, minlength=len(options))
+    total_score_sums = np.bincount(option_codes, weights=totals[rows[found]], minlength=len(options))
+    attempt_count = len(attempt_ids)
+    return [
+        {
+            'option': option,
+            'is_correct': option in correct_options,
+            'count': int(counts[index]),
+            'ratio': _rounded(counts[index] / attempt_count) if attempt_count else None,
+            'mean_total_score': _rounded(total_score_sums[index] / counts[index], 2) if counts[index] else None,
+        }
+        for index, option in enumerate(options)
+    ]
+
+
+def _score_distribution(totals, max_total):
+    if not len(totals):
+        return {'mean': None, 'median': None, 'std': None, 'min': None, 'max': None, 'percentiles': {}, 'histogram': []}
+    percent_scores = totals / max_total * 100 if max_total > 0 else np.zeros_like(totals)
+    counts, edges = np.histogram(percent_scores, bins=SCORE_DISTRIBUTION_BINS, range=(0, 100))
+    percentiles = np.percentile(totals, [25, 50, 75, 90])
+    return {
+        'mean': _rounded(totals.mean(), 2),
+        'median': _rounded(percentiles[1], 2),
+        'std': _rounded(totals.std(), 2),
+        'min': _rounded(totals.min(), 2),
+        'max': _rounded(totals.max(), 2),
+        'percentiles': {str(rank): _rounded(value, 2) for rank, value in zip([25, 50, 75, 90], percentiles)},
+        'histogram': [
+            {'from_percent': int(edges[index]), 'to_percent': int(edges[index + 1]), 'count': int(count)}
+            for index, count in enumerate(counts)
+        ],
+    }
+
+
+def build_item_analysis(test):
+    """
+    Classical test theory statistics over submitted attempts: per-question
+    difficulty (mean fraction of marks, the p-value), item-rest point-biserial
+    discrimination, option frequencies for multiple choice, the score
+    distribution and Cronbach's alpha. The attempt x question marks matrix is
+    loaded once and every statistic is computed on it column-wise.
+    """
+    questions = list(
+        test.questions.order_by('order', 'id').values(
+            'id', 'order', 'title', 'question_type', 'marks', 'options', 'correct_options',
+        )
+    )
+    question_ids = [question['id'] for question in questions]
+    attempt_ids, scores = _load_score_matrix(test, question_ids)
+    selections = _load_selections(test, questions)
+    max_marks = np.array([float(question['marks']) for question in questions], dtype=np.float64)
+    totals = scores.sum(axis=1)
+    attempt_count = len(attempt_ids)
+
+    if attempt_count:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            difficulty = np.where(max_marks > 0, scores.mean(axis=0) / max_marks, np.nan)
+        discrimination = _column_correlations(scores, totals[:, None] - scores)
+        item_std = scores.std(axis=0)
+    else:
+        difficulty = discrimination = item_std = np.full(len(questions), np.nan)
+
+    reliability = None
+    if attempt_count > 1 and len(questions) > 1 and totals.var(ddof=1) > 0:
+        reliability = _rounded(
+            len(questions) / (len(questions) - 1) * (1 - scores.var(axis=0, ddof=1).sum() / totals.var(ddof=1))
+        )
+
+    items = []
+    for index, question in enumerate(questions):
+        item = {
+            'question': question['id'],
+            'order': question['order'],
+            'title': question['title'],
+            'question_type': question['question_type'],
+            'marks': str(question['marks']),
+            'mean_score': _rounded(scores[:, index].mean(), 2) if attempt_count else None,
+            'score_std': _rounded(item_std[index], 2),
+            'difficulty': _rounded(difficulty[index]),
+            'discrimination': _rounded(discrimination[index]),
+        }
+        if question['question_type'] == 'multiple_choice':
+            item['options'] = _option_statistics(question, selections[question['id']], attempt_ids, totals)
+        items.append(item)
+
+    return {
+        'test': test.id,
+        'attempt_count': attempt_count,
+        'max_total_marks': _rounded(max_marks.sum(), 2),
+        'reliability': reliability,
+        'score_distribution': _score_distribution(totals, max_marks.sum()),
+        'items': items,
+    }
+
+
+def get_item_analysis(test):
+    cache_key = _item_analysis_cache_key(test.id)
+    analysis = cache.get(cache_key)
+    if analysis is None:
+        analysis = build_item_analysis(test)
+        cache.set(cache_key, analysis, ITEM_ANALYSIS_CACHE_TIMEOUT)
+    return analysis
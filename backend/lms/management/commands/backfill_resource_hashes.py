@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from lms.models import Resource
+from lms.resource_files import find_stored_duplicate, hash_file
+
+
+class Command(BaseCommand):
+    help = 'Compute content hashes for resource files stored before deduplication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--link-duplicates',
+            action='store_true',
+            help='Point resources whose bytes are already stored elsewhere at that file.',
+        )
+
+    def handle(self, *args, **options):
+        resources = Resource.objects.filter(content_hash='').exclude(file='').exclude(file__isnull=True)
+        hashed_count = linked_count = 0
+        for resource in resources.order_by('id').iterator():
+            try:
+                with resource.file.open('rb') as content:
+                    content_hash = hash_file(content)
+            except FileNotFoundError:
+                self.stderr.write(f'Resource {resource.id}: file {resource.file.name} is missing.')
+                continue
+
+            update_fields = {'content_hash': content_hash}
+            if options['link_duplicates']:
+                existing_name = find_stored_duplicate(content_hash, exclude_pk=resource.pk)
+                if existing_name and existing_name != resource.file.name:
+                    update_fields['file'] = existing_name
+                    linked_count += 1
+            Resource.objects.filter(pk=resource.pk).update(**update_fields)
+            hashed_count += 1
+
+        self.stdout.write(f'Hashed {hashed_count} resource file(s), linked {linked_count} duplicate(s).')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from lms.code_runner import compile_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show compile cache hit/miss counts and disk usage for the code runner.'
+
+    def handle(self, *args, **options):
+        stats = compile_cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = (stats['hits'] / lookups * 100) if lookups else 0
+        self.stdout.write(f"Enabled: {'yes' if stats['enabled'] else 'no'}")
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.1f}%")
+        self.stdout.write(f"Entries: {stats['entries']}  Size: {stats['size_bytes']} / {stats['max_bytes']} bytes")
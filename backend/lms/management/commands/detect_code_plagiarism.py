@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from lms.models import Test
+from lms.plagiarism import queue_due_plagiarism_checks, queue_plagiarism_check
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue code plagiarism checks for closed tests whose coding questions have not been checked yet. '
+        'Workers started by run_background_jobs also do this every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test',
+            type=int,
+            action='append',
+            dest='test_ids',
+            help='Queue a check of this test now, even if it is still open or already has a report. Repeatable.',
+        )
+
+    def handle(self, *args, **options):
+        if options['test_ids']:
+            test_ids = []
+            for test in Test.objects.filter(id__in=options['test_ids']):
+                queue_plagiarism_check(test)
+                test_ids.append(test.id)
+        else:
+            test_ids = queue_due_plagiarism_checks()
+        for test_id in test_ids:
+            self.stdout.write(f'Queued a code plagiarism check of test {test_id}.')
+        if not test_ids:
+            self.stdout.write('No tests are due for a plagiarism check.')
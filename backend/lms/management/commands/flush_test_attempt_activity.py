@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.attempt_activity import activity_cache_is_shared, flush_attempt_activity
+
+
+class Command(BaseCommand):
+    help = 'Write cached test attempt heartbeats (time spent and last activity) back to the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every --interval seconds instead of exiting after one pass.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.TEST_ATTEMPT_ACTIVITY_FLUSH_SECONDS,
+            help='Seconds between flushes when --loop is set.',
+        )
+
+    def handle(self, *args, **options):
+        if not activity_cache_is_shared():
+            raise CommandError(
+                'The cache is not shared between processes, so this command cannot see the heartbeats '
+                'recorded by the web workers. Set REDIS_URL (heartbeats are written to the database until then).'
+            )
+        interval = max(1, options['interval'])
+        while True:
+            flushed_count = flush_attempt_activity()
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(f'Flushed activity for {flushed_count} attempt(s).')
+            if not options['loop']:
+                return
+            time.sleep(interval)
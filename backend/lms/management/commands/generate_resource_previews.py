@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from lms.models import Resource, ResourcePreview
+from lms.resource_previews import generate_previews, queue_resource_previews
+
+
+class Command(BaseCommand):
+    help = 'Create preview images for resource files that do not have one yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry files whose previous preview attempt failed.',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the work for the background job worker instead of running it here.',
+        )
+
+    def handle(self, *args, **options):
+        previews = ResourcePreview.objects.filter(content_hash=OuterRef('content_hash'))
+        if options['retry_failed']:
+            previews = previews.exclude(status='failed')
+        resource_ids = list(
+            Resource.objects.exclude(content_hash='')
+            .filter(~Exists(previews))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        if options['queue']:
+            queue_resource_previews(resource_ids)
+            self.stdout.write(f'Queued previews for {len(resource_ids)} resource(s).')
+            return
+        statuses = generate_previews(resource_ids)
+        summary = ', '.join(f'{status}={count}' for status, count in sorted(statuses.items())) or 'nothing to do'
+        self.stdout.write(f'Generated previews: {summary}.')
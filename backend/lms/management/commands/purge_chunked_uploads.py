@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lms.chunked_uploads import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Abort expired resumable uploads and delete their staged chunks.'
+
+    def handle(self, *args, **options):
+        purged_count = purge_expired_uploads()
+        self.stdout.write(f'Purged {purged_count} expired upload(s).')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from lms.models import Resource
+from lms.resource_search import index_resources, queue_resource_indexing
+
+
+class Command(BaseCommand):
+    help = 'Add resources to the full-text search index, extracting PDF text where needed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-index every resource, not only those missing from the index.',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the work for the background job worker instead of running it here.',
+        )
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        resources = Resource.objects.all()
+        if not options['all']:
+            resources = resources.filter(text_index__isnull=True)
+        resource_ids = list(resources.order_by('id').values_list('id', flat=True))
+        batch_size = max(1, options['batch_size'])
+
+        statuses = {}
+        for start in range(0, len(resource_ids), batch_size):
+            batch = resource_ids[start:start + batch_size]
+            if options['queue']:
+                queue_resource_indexing(batch)
+                continue
+            for status, count in index_resources(batch).items():
+                statuses[status] = statuses.get(status, 0) + count
+
+        if options['queue']:
+            self.stdout.write(f'Queued {len(resource_ids)} resource(s) for indexing.')
+        else:
+            summary = ', '.join(f'{status}={count}' for status, count in sorted(statuses.items())) or 'nothing to do'
+            self.stdout.write(f'Indexed {len(resource_ids)} resource(s): {summary}.')
@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from lms.background_jobs import default_worker_id, recover_stale_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (resource imports, video renders, plagiarism checks). '
+        'Start one process per job that should run in parallel; jobs are leased atomically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due instead of polling.')
+        parser.add_argument('--task', action='append', dest='tasks', help='Only run this task (repeatable).')
+        parser.add_argument('--recover-only', action='store_true', help='Requeue jobs with expired leases and exit.')
+
+    def handle(self, *args, **options):
+        if options['recover_only']:
+            requeued_count, failed_count = recover_stale_jobs()
+            self.stdout.write(f'Requeued {requeued_count} and failed {failed_count} stale job(s).')
+            return
+
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            # Finish the current job, then exit.
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        worker_id = default_worker_id()
+        self.stdout.write(f'Background job worker {worker_id} started.')
+        processed = run_worker(worker_id, tasks=options['tasks'], once=options['once'], stop_event=stop_event)
+        self.stdout.write(f'Worker {worker_id} stopped after {processed} job(s).')
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:52
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_gradebook_entries(apps, schema_editor):
+    TestAttempt = apps.get_model('lms', 'TestAttempt')
+    TestGradebookEntry = apps.get_model('lms', 'TestGradebookEntry')
+
+    attempts = TestAttempt.objects.filter(
+        Q(status='submitted') | Q(reviewed_at__isnull=False)
+    ).annotate(
+        answer_count=Count('answers'),
+        answer_reviewed_count=Count('answers', filter=Q(answers__reviewed_at__isnull=False)),
+        answer_marks=Sum('answers__awarded_marks'),
+    )
+    entries = []
+    for attempt in attempts.iterator():
+        entries.append(TestGradebookEntry(
+            test_id=attempt.test_id,
+            student_id=attempt.student_id,
+            attempt_id=attempt.id,
+            status=attempt.status,
+            total_awarded_marks=attempt.answer_marks or 0,
+            answered_count=attempt.answer_count,
+            reviewed_count=attempt.answer_reviewed_count,
+            is_fully_reviewed=attempt.answer_count > 0 and attempt.answer_reviewed_count >= attempt.answer_count,
+            reviewed_at=attempt.reviewed_at,
+            time_spent_seconds=attempt.time_spent_seconds or 0,
+            submitted_at=attempt.submitted_at,
+        ))
+    TestGradebookEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0048_livekit_meetings_recordings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestGradebookEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('not_started', 'Not Started'), ('in_progress', 'In Progress'), ('locked', 'Locked'), ('submitted', 'Submitted')], default='not_started', max_length=20)),
+                ('total_awarded_marks', models.DecimalField(decimal_places=2, default=0, max_digits=8, validators=[django.core.validators.MinValueValidator(0)])),
+                ('answered_count', models.PositiveIntegerField(default=0)),
+                ('reviewed_count', models.PositiveIntegerField(default=0)),
+                ('is_fully_reviewed', models.BooleanField(default=False)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('time_spent_seconds', models.PositiveIntegerField(default=0)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entry', to='lms.testattempt')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='test_gradebook_entries', to=settings.AUTH_USER_MODEL)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to='lms.test')),
+            ],
+            options={
+                'verbose_name': 'Test Gradebook Entry',
+                'verbose_name_plural': 'Test Gradebook Entries',
+                'ordering': ['test', 'student'],
+                'unique_together': {('test', 'student')},
+            },
+        ),
+        migrations.RunPython(backfill_gradebook_entries, migrations.RunPython.noop),
+    ]
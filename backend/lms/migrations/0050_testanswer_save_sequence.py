@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0049_test_gradebook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testanswer',
+            name='save_sequence',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
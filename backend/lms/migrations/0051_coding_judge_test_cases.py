@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0050_testanswer_save_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testanswer',
+            name='judge_result',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='testquestion',
+            name='test_cases',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0051_coding_judge_test_cases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodePlagiarismReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('clusters', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='plagiarism_report', to='lms.testquestion')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plagiarism_reports', to='lms.test')),
+            ],
+            options={
+                'ordering': ['test', 'question__order', 'question_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:26
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LOG_LINE_PATTERN = re.compile(r'^\[(\d{2}):(\d{2}):(\d{2})\] (.*)$', re.DOTALL)
+
+
+def copy_log_lines(apps, schema_editor):
+    ResourceImportJob = apps.get_model('lms', 'ResourceImportJob')
+    ResourceImportLogLine = apps.get_model('lms', 'ResourceImportLogLine')
+    for job in ResourceImportJob.objects.only('id', 'created_at', 'log_lines').iterator():
+        messages = []
+        timestamps = []
+        for line in job.log_lines or []:
+            message = str(line)
+            created_at = job.created_at
+            match = LOG_LINE_PATTERN.match(message)
+            if match:
+                hour, minute, second, message = match.groups()
+                created_at = job.created_at.replace(hour=int(hour), minute=int(minute), second=int(second), microsecond=0)
+            messages.append(message)
+            timestamps.append(created_at)
+        if not messages:
+            continue
+        # auto_now_add stamps created_at on insert, so restore the logged times afterwards.
+        entries = ResourceImportLogLine.objects.bulk_create(
+            [ResourceImportLogLine(job_id=job.id, message=message) for message in messages]
+        )
+        for entry, created_at in zip(entries, timestamps):
+            entry.created_at = created_at
+        ResourceImportLogLine.objects.bulk_update(entries, ['created_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0053_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceImportLogLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='lms.resourceimportjob')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(copy_log_lines, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='resourceimportjob',
+            name='log_lines',
+        ),
+    ]
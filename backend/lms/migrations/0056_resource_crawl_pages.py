@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0055_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceCrawlPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000, unique=True)),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+                ('pdf_links', models.JSONField(blank=True, default=list)),
+                ('folder_links', models.JSONField(blank=True, default=list)),
+                ('fetched_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0056_resource_crawl_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# SQLite FTS5 keeps the searchable text; rowid is the resource id. detail=column
+# drops token positions, which keeps the index small since only term and
+# prefix queries are issued against it.
+CREATE_SEARCH_TABLE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS lms_resource_search USING fts5('
+    "title, description, tags, body, tokenize='porter unicode61 remove_diacritics 2', detail=column)"
+)
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SEARCH_TABLE)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS lms_resource_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0057_resource_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceText',
+            fields=[
+                ('resource', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text_index', serialize=False, to='lms.resource')),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('status', models.CharField(choices=[('indexed', 'Indexed'), ('no_text', 'No Text'), ('failed', 'Failed')], default='indexed', max_length=20)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
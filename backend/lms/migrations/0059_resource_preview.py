@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:47
+
+import lms.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0058_resource_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourcePreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('ready', 'Ready'), ('unavailable', 'Unavailable'), ('failed', 'Failed')], default='ready', max_length=20)),
+                ('image', models.FileField(blank=True, null=True, storage=lms.models.get_protected_resource_storage, upload_to='previews/')),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
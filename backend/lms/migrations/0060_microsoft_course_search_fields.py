@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:50
+
+from django.db import migrations, models
+
+
+def _strings(values):
+    return [str(value).strip() for value in values or [] if str(value).strip()]
+
+
+def fill_search_fields(apps, schema_editor):
+    MicrosoftCourse = apps.get_model('lms', 'MicrosoftCourse')
+    fields = ['title', 'summary', 'subtitle', 'uid', 'url', 'type_label', 'levels', 'roles', 'products', 'subjects']
+    courses = []
+    for course in MicrosoftCourse.objects.only('id', *fields).iterator():
+        course.search_text = ' '.join([
+            course.title or '',
+            course.summary or '',
+            course.subtitle or '',
+            course.uid or '',
+            course.url or '',
+            course.type_label or '',
+            *_strings(course.levels),
+            *_strings(course.roles),
+            *_strings(course.products),
+            *_strings(course.subjects),
+        ]).lower()
+        levels = [level.lower() for level in _strings(course.levels)]
+        course.level_keys = f"|{'|'.join(levels)}|"[:255] if levels else ''
+        courses.append(course)
+    MicrosoftCourse.objects.bulk_update(courses, ['search_text', 'level_keys'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0059_resource_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microsoftcourse',
+            name='level_keys',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='microsoftcourse',
+            name='search_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+    ]
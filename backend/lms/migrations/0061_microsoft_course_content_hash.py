@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0060_microsoft_course_search_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microsoftcourse',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0061_microsoft_course_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='purpose',
+            field=models.CharField(choices=[('test_answer', 'Test Answer'), ('test_question_attachment', 'Test Question Attachment'), ('resource', 'Resource'), ('note_attachment', 'Note Attachment')], max_length=40),
+        ),
+    ]
@@ -17,6 +17,11 @@ from lms.currency import PAYMENT_CURRENCY_CHOICES, INR, payment_pricing
 protected_resource_storage = FileSystemStorage(location=settings.BASE_DIR / 'protected_resources')
 
 
+def get_protected_resource_storage():
+    # Referenced by callable so migrations do not record the machine-specific path.
+    return protected_resource_storage
+
+
 def test_answer_upload_path(instance, filename):
     stem, dot, extension = filename.rpartition('.')
     base_name = slugify(stem or filename)[:80] or 'answer'
@@ -789,6 +794,8 @@ class TestQuestion(models.Model):
     allowed_file_types = models.CharField(max_length=255, blank=True, null=True)
     starter_code = models.TextField(blank=True, null=True)
     coding_language = models.CharField(max_length=50, blank=True, null=True)
+    # Judge cases for coding questions: [{"input": "...", "expected_output": "...", "is_hidden": true}]
+    test_cases = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -865,6 +872,8 @@ class TestAnswer(models.Model):
     code_answer = models.TextField(blank=True, null=True)
     code_language = models.CharField(max_length=50, blank=True, null=True)
     uploaded_file = models.FileField(upload_to=test_answer_upload_path, blank=True, null=True)
+    save_sequence = models.PositiveBigIntegerField(default=0)
+    judge_result = models.JSONField(default=dict, blank=True)
     awarded_marks = models.DecimalField(max_digits=6, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     review_comment = models.TextField(blank=True, null=True)
     reviewed_at = models.DateTimeField(blank=True, null=True)
@@ -886,6 +895,159 @@ class TestAnswer(models.Model):
         unique_together = ['attempt', 'question']
 
 
+class TestGradebookEntry(models.Model):
+    """
+    Materialized per-student score sheet row, refreshed whenever an attempt is submitted or graded.
+    """
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name='gradebook_entries'
+    )
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='test_gradebook_entries',
+        limit_choices_to={'role': 'student'}
+    )
+    attempt = models.OneToOneField(
+        TestAttempt,
+        on_delete=models.CASCADE,
+        related_name='gradebook_entry'
+    )
+    status = models.CharField(max_length=20, choices=TestAttempt.STATUS_CHOICES, default='not_started')
+    total_awarded_marks = models.DecimalField(max_digits=8, decimal_places=2, default=0, validators=[MinValueValidator(0)])
+    answered_count = models.PositiveIntegerField(default=0)
+    reviewed_count = models.PositiveIntegerField(default=0)
+    is_fully_reviewed = models.BooleanField(default=False)
+    reviewed_at = models.DateTimeField(blank=True, null=True)
+    time_spent_seconds = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Gradebook {self.test_id} - {self.student_id}"
+
+    class Meta:
+        verbose_name = 'Test Gradebook Entry'
+        verbose_name_plural = 'Test Gradebook Entries'
+        ordering = ['test', 'student']
+        unique_together = ['test', 'student']
+
+
+class ChunkedUpload(models.Model):
+    """
+    Resumable upload assembled from numbered chunks staged on disk by
+    lms.chunked_uploads. On completion the file is saved into the target
+    model field recorded in `target`.
+    """
+    PURPOSE_CHOICES = (
+        ('test_answer', 'Test Answer'),
+        ('test_question_attachment', 'Test Question Attachment'),
+        ('resource', 'Resource'),
+        ('note_attachment', 'Note Attachment'),
+    )
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads'
+    )
+    purpose = models.CharField(max_length=40, choices=PURPOSE_CHOICES)
+    # {"attempt": 1, "question": 2} | {"question": 2} | {"resource": 3} | {"note": 4}
+    target = models.JSONField(default=dict, blank=True)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, blank=True, default='')
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    expires_at = models.DateTimeField()
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} - {self.filename}"
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_chunk_size(self, index):
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ChunkedUploadPart(models.Model):
+    upload = models.ForeignKey(
+        ChunkedUpload,
+        on_delete=models.CASCADE,
+        related_name='parts'
+    )
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.upload_id} #{self.index}"
+
+    class Meta:
+        ordering = ['upload', 'index']
+        unique_together = ['upload', 'index']
+
+
+class CodePlagiarismReport(models.Model):
+    """
+    Similarity clusters for the code answers to one coding question, rebuilt by
+    lms.plagiarism once the test has closed.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name='plagiarism_reports'
+    )
+    question = models.OneToOneField(
+        TestQuestion,
+        on_delete=models.CASCADE,
+        related_name='plagiarism_report'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    submission_count = models.PositiveIntegerField(default=0)
+    # [{"max_similarity": 0.93, "members": [{"answer": 1, "attempt": 1, "student": 1, "student_name": "..."}],
+    #   "pairs": [{"answers": [1, 2], "similarity": 0.93}]}]
+    clusters = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, null=True)
+    generated_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Plagiarism report {self.test_id} - Q{self.question_id}"
+
+    class Meta:
+        ordering = ['test', 'question__order', 'question_id']
+
+
 class Expense(models.Model):
     """
     Expenses tracking
@@ -1092,6 +1254,12 @@ class MicrosoftCourse(models.Model):
     scraped = models.BooleanField(default=False)
     scraped_duration_label = models.CharField(max_length=120, blank=True)
     raw_payload = models.JSONField(default=dict, blank=True)
+    # SHA-256 of the normalized catalog item, so a snapshot sync can skip unchanged rows.
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Lowercased copies of the searchable fields, kept in step by save(), so the
+    # catalog can be filtered in the database. level_keys looks like "|beginner|advanced|".
+    search_text = models.TextField(blank=True, default='')
+    level_keys = models.CharField(max_length=255, blank=True, default='')
     is_active = models.BooleanField(default=True)
     synced_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1100,6 +1268,32 @@ class MicrosoftCourse(models.Model):
     def __str__(self):
         return self.title
 
+    def refresh_search_fields(self):
+        def strings(values):
+            return [str(value).strip() for value in values or [] if str(value).strip()]
+
+        self.search_text = ' '.join([
+            self.title or '',
+            self.summary or '',
+            self.subtitle or '',
+            self.uid or '',
+            self.url or '',
+            self.type_label or '',
+            *strings(self.levels),
+            *strings(self.roles),
+            *strings(self.products),
+            *strings(self.subjects),
+        ]).lower()
+        levels = [level.lower() for level in strings(self.levels)]
+        self.level_keys = f"|{'|'.join(levels)}|"[:255] if levels else ''
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_text', 'level_keys'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Microsoft Course'
         verbose_name_plural = 'Microsoft Courses'
@@ -1144,6 +1338,8 @@ class Resource(models.Model):
         blank=True,
         null=True,
     )
+    # SHA-256 of the file. Resources with identical bytes share one stored file.
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     visibility = models.CharField(max_length=20, choices=VISIBILITY_CHOICES, default='teacher')
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -1199,7 +1395,6 @@ class ResourceImportJob(models.Model):
     progress_current = models.PositiveIntegerField(default=0)
     progress_total = models.PositiveIntegerField(default=0)
     created_resources_count = models.PositiveIntegerField(default=0)
-    log_lines = models.JSONField(default=list, blank=True)
     error_message = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -1222,6 +1417,102 @@ class ResourceImportJob(models.Model):
         ordering = ['-created_at']
 
 
+class ResourceCrawlPage(models.Model):
+    """
+    Validators and links of a folder page seen by the resource import crawler,
+    so the next import of the same source can send conditional requests.
+    """
+    url = models.URLField(max_length=1000, unique=True)
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    pdf_links = models.JSONField(default=list, blank=True)
+    folder_links = models.JSONField(default=list, blank=True)
+    fetched_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url
+
+
+class ResourceImportLogLine(models.Model):
+    """One line of an import job's log. Lines are only ever inserted, never rewritten."""
+    job = models.ForeignKey(
+        ResourceImportJob,
+        on_delete=models.CASCADE,
+        related_name='log_entries',
+    )
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.job_id}: {self.message[:50]}'
+
+    @property
+    def line(self):
+        return f"[{self.created_at.strftime('%H:%M:%S')}] {self.message}"
+
+    class Meta:
+        ordering = ['id']
+
+
+class ResourceText(models.Model):
+    """
+    Extraction state of a resource in the full-text search index. The text
+    itself lives only in the index; content_hash records which file it came
+    from so unchanged files are not extracted again.
+    """
+    STATUS_CHOICES = [
+        ('indexed', 'Indexed'),
+        ('no_text', 'No Text'),
+        ('failed', 'Failed'),
+    ]
+
+    resource = models.OneToOneField(
+        Resource,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='text_index',
+    )
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='indexed')
+    page_count = models.PositiveIntegerField(default=0)
+    char_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.resource_id}: {self.status}'
+
+
+class ResourcePreview(models.Model):
+    """
+    First-page preview of a PDF, or thumbnail of an image, keyed by the
+    content hash of the file so resources sharing bytes share one preview.
+    """
+    STATUS_CHOICES = [
+        ('ready', 'Ready'),
+        ('unavailable', 'Unavailable'),
+        ('failed', 'Failed'),
+    ]
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ready')
+    image = models.FileField(
+        upload_to='previews/',
+        storage=get_protected_resource_storage,
+        blank=True,
+        null=True,
+    )
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.content_hash[:12]}: {self.status}'
+
+
 class QuestionBankCourse(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(unique=True, max_length=255)
@@ -1498,3 +1789,51 @@ class ForumNotification(models.Model):
             models.Index(fields=['recipient', 'created_at']),
             models.Index(fields=['notification_type', 'created_at']),
         ]
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work for the `run_background_jobs` worker command (see
+    lms.background_jobs). Workers lease a job, keep the lease alive with
+    heartbeats while it runs, and jobs whose lease expired are retried.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} - {self.status}'
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
@@ -0,0 +1,252 @@
+import hashlib
+import re
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .background_jobs import PRIORITY_LOW, enqueue
+from .gradebook import _student_name
+from .models import BackgroundJob, CodePlagiarismReport, Test, TestAnswer, TestQuestion
+
+
+PLAGIARISM_CHECK_TASK = 'plagiarism_check'
+KGRAM_SIZE = 5
+WINNOW_WINDOW = 4
+SIMILARITY_THRESHOLD = 0.6
+MIN_FINGERPRINTS = 5
+# Fingerprints shared by more submissions than this are boilerplate (the
+# problem's natural solution shape) and are ignored. The constant bound also
+# caps the pairs each fingerprint can generate, keeping the run close to linear.
+COMMON_FINGERPRINT_MAX_SUBMISSIONS = 20
+MAX_PAIRS_PER_CLUSTER = 20
+
+TOKEN_PATTERN = re.compile(
+    r'''
+    (?P<comment>//[^\n]*|/\*.*?\*/|\#[^\n]*)
+    | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<name>[A-Za-z_]\w*)
+    | (?P<symbol>\S)
+    ''',
+    re.DOTALL | re.VERBOSE,
+)
+
+# Keywords and common library names across the supported languages are kept
+# verbatim; every other identifier is normalized so renaming variables does
+# not hide copying.
+PRESERVED_NAMES = frozenset('''
+    and as assert async await break case catch class const continue def default del delete do elif else
+    enum except export extends false final finally for from function global if import in instanceof
+    interface is lambda let new nonlocal not null or pass private protected public raise return self
+    static struct super switch this throw throws true try typeof var void while with yield None True False
+    bool boolean char double float int long short signed unsigned string String auto vector map set list dict
+    tuple print input range len sorted sum min max abs open printf scanf puts gets malloc free sizeof cout cin
+    endl std include System out println Scanner Math console log require process stdin stdout readline split
+    strip map filter reduce push pop append extend sort reverse
+'''.split())
+
+
+def tokenize(source_code):
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(source_code or ''):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        if kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        elif kind == 'name':
+            value = match.group()
+            tokens.append(value if value in PRESERVED_NAMES else 'V')
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def _kgram_hash(kgram):
+    return int.from_bytes(hashlib.blake2b('\x1f'.join(kgram).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def fingerprint(source_code, kgram_size=KGRAM_SIZE, window=WINNOW_WINDOW):
+    """
+    Winnowing (Schleimer et al., the MOSS algorithm): hash every k-gram of
+    normalized tokens and keep the minimum hash of each window of `window`
+    consecutive hashes. Any shared run of at least kgram_size + window - 1
+    tokens is guaranteed to produce a shared fingerprint.
+    """
+    tokens = tokenize(source_code)
+    hashes = [_kgram_hash(tokens[index:index + kgram_size]) for index in range(len(tokens) - kgram_size + 1)]
+    if len(hashes) <= window:
+        return set(hashes)
+
+    fingerprints = set()
+    for start in range(len(hashes) - window + 1):
+        fingerprints.add(min(hashes[start:start + window]))
+    return fingerprints
+
+
+def _find_root(parents, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+
+def find_similar_submissions(fingerprints_by_id, excluded_fingerprints=frozenset(), threshold=SIMILARITY_THRESHOLD):
+    """
+    Group submission ids whose fingerprint overlap, relative to the smaller
+    submission, reaches threshold. Candidate pairs come from an inverted index
+    so only submissions that actually share fingerprints are compared.
+    Returns clusters as (member ids, [(id_a, id_b, similarity), ...]).
+    """
+    index = defaultdict(list)
+    for submission_id, fingerprints in fingerprints_by_id.items():
+        for value in fingerprints - excluded_fingerprints:
+            index[value].append(submission_id)
+
+    # Similarity is measured on distinctive fingerprints only, so two students
+    # sharing the same boilerplate are not flagged and copies are not diluted by it.
+    distinctive_counts = Counter()
+    shared_counts = Counter()
+    for submission_ids in index.values():
+        if len(submission_ids) > COMMON_FINGERPRINT_MAX_SUBMISSIONS:
+            continue
+        distinctive_counts.update(submission_ids)
+        if len(submission_ids) > 1:
+            shared_counts.update(combinations(sorted(submission_ids), 2))
+
+    parents = {}
+    pairs = []
+    for (first_id, second_id), shared_count in shared_counts.items():
+        smaller_count = min(distinctive_counts[first_id], distinctive_counts[second_id])
+        if smaller_count < MIN_FINGERPRINTS:
+            continue
+        similarity = shared_count / smaller_count
+        if similarity < threshold:
+            continue
+        pairs.append((first_id, second_id, similarity))
+        for submission_id in (first_id, second_id):
+            parents.setdefault(submission_id, submission_id)
+        parents[_find_root(parents, first_id)] = _find_root(parents, second_id)
+
+    clusters = defaultdict(lambda: ([], []))
+    for submission_id in sorted(parents):
+        clusters[_find_root(parents, submission_id)][0].append(submission_id)
+    for pair in pairs:
+        clusters[_find_root(parents, pair[0])][1].append(pair)
+
+    return sorted(
+        (
+            (members, sorted(cluster_pairs, key=lambda pair: pair[2], reverse=True))
+            for members, cluster_pairs in clusters.values()
+        ),
+        key=lambda cluster: cluster[1][0][2],
+        reverse=True,
+    )
+
+
+def build_question_report(question):
+    submissions = {}
+    fingerprints_by_answer = {}
+    answer_rows = (
+        TestAnswer.objects.filter(question=question)
+        .exclude(Q(code_answer__isnull=True) | Q(code_answer=''))
+        .values_list(
+            'id',
+            'attempt_id',
+            'attempt__student_id',
+            'attempt__student__first_name',
+            'attempt__student__last_name',
+            'attempt__student__email',
+            'code_answer',
+        )
+        .iterator(chunk_size=200)
+    )
+    for answer_id, attempt_id, student_id, first_name, last_name, email, code_answer in answer_rows:
+        submissions[answer_id] = {
+            'answer': answer_id,
+            'attempt': attempt_id,
+            'student': student_id,
+            'student_name': _student_name(first_name, last_name, email),
+        }
+        fingerprints_by_answer[answer_id] = fingerprint(code_answer)
+
+    clusters = find_similar_submissions(fingerprints_by_answer, excluded_fingerprints=fingerprint(question.starter_code))
+    return {
+        'submission_count': len(submissions),
+        'clusters': [
+            {
+                'max_similarity': round(pairs[0][2], 3),
+                'members': [submissions[answer_id] for answer_id in members],
+                'pairs': [
+                    {'answers': [first_id, second_id], 'similarity': round(similarity, 3)}
+                    for first_id, second_id, similarity in pairs[:MAX_PAIRS_PER_CLUSTER]
+                ],
+            }
+            for members, pairs in clusters
+        ],
+    }
+
+
+def run_plagiarism_check(test_id):
+    """Rebuild the plagiarism report of every coding question in the test."""
+    questions = TestQuestion.objects.filter(test_id=test_id, question_type='coding').order_by('order', 'id')
+    for question in questions:
+        report, _ = CodePlagiarismReport.objects.update_or_create(
+            question=question,
+            defaults={'test_id': test_id, 'status': 'running', 'error': None},
+        )
+        try:
+            result = build_question_report(question)
+        except Exception as exc:
+            report.status = 'failed'
+            report.error = str(exc)
+            report.save(update_fields=['status', 'error', 'updated_at'])
+            raise
+        report.status = 'completed'
+        report.submission_count = result['submission_count']
+        report.clusters = result['clusters']
+        report.generated_at = timezone.now()
+        report.save(update_fields=['status', 'submission_count', 'clusters', 'generated_at', 'updated_at'])
+
+
+def mark_plagiarism_check_pending(test):
+    for question in test.questions.filter(question_type='coding'):
+        CodePlagiarismReport.objects.update_or_create(
+            question=question,
+            defaults={'test': test, 'status': 'pending', 'error': None},
+        )
+
+
+def tests_due_for_plagiarism_check(now=None):
+    """Closed tests with a coding question that has no report, or only a pending one."""
+    now = now or timezone.now()
+    return (
+        Test.objects.filter(Q(available_until__lte=now) | Q(status='archived'))
+        .filter(
+            Q(questions__question_type='coding')
+            & (Q(questions__plagiarism_report__isnull=True) | Q(questions__plagiarism_report__status='pending'))
+        )
+        .distinct()
+    )
+
+
+def queue_plagiarism_check(test, user=None):
+    mark_plagiarism_check_pending(test)
+    enqueue(PLAGIARISM_CHECK_TASK, {'test': test.id}, priority=PRIORITY_LOW, created_by=user)
+
+
+def queue_due_plagiarism_checks(now=None):
+    """Queue a check for each due test that has none queued or running yet. Returns the test ids."""
+    in_flight = BackgroundJob.objects.filter(
+        task=PLAGIARISM_CHECK_TASK,
+        status__in=['queued', 'running'],
+    ).values_list('payload__test', flat=True)
+    test_ids = []
+    for test in tests_due_for_plagiarism_check(now).exclude(id__in=set(in_flight)):
+        queue_plagiarism_check(test)
+        test_ids.append(test.id)
+    return test_ids
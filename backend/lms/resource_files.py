@@ -0,0 +1,46 @@
+import hashlib
+
+from .models import Resource
+
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_BLOCK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def find_stored_duplicate(content_hash, exclude_pk=None):
+    """Name of a stored file with these exact bytes, if one still exists in storage."""
+    if not content_hash:
+        return None
+    candidates = Resource.objects.filter(content_hash=content_hash).exclude(file='').exclude(file__isnull=True)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+    storage = Resource._meta.get_field('file').storage
+    for name in candidates.order_by('id').values_list('file', flat=True).distinct()[:5]:
+        if storage.exists(name):
+            return name
+    return None
+
+
+def attach_resource_file(resource, content, content_hash=None, filename=None):
+    """
+    Set resource.file to `content`. When another resource already stores the
+    same bytes, its file is reused and nothing is written to storage. Returns
+    True when a new file was stored.
+    """
+    content_hash = content_hash or hash_file(content)
+    existing_name = find_stored_duplicate(content_hash, exclude_pk=resource.pk)
+    resource.content_hash = content_hash
+    if existing_name:
+        resource.file.name = existing_name
+    else:
+        resource.file.save(filename or content.name, content, save=False)
+    resource.save(update_fields=['file', 'content_hash', 'updated_at'])
+    return existing_name is None
@@ -0,0 +1,186 @@
+"""
+Preview images for the resource library.
+
+A background task renders the first page of each PDF (with poppler's
+pdftoppm, falling back to the largest image embedded in that page) or
+shrinks an image file to a thumbnail. Previews are stored once per content
+hash and served from a stable signed URL, so browsers can cache them forever.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from .background_jobs import PRIORITY_LOW, enqueue
+from .models import Resource, ResourcePreview
+
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_PREVIEW_TASK = 'resource_preview'
+PREVIEW_SIGNER_SALT = 'lms.resource-preview'
+PREVIEW_FORMAT = 'WEBP'
+PREVIEW_QUALITY = 80
+PDF_RENDER_TIMEOUT_SECONDS = 60
+
+
+class PreviewUnavailable(Exception):
+    """The file has nothing to preview: not a PDF or image, or a PDF without renderable content."""
+
+
+def _max_size():
+    return int(getattr(settings, 'RESOURCE_PREVIEW_MAX_SIZE', 480))
+
+
+def _local_copy(field_file, directory):
+    """Path of the file on local disk, copying it out of remote storage when needed."""
+    try:
+        return field_file.path
+    except NotImplementedError:
+        path = os.path.join(directory, 'source')
+        with field_file.open('rb') as source, open(path, 'wb') as destination:
+            shutil.copyfileobj(source, destination)
+        return path
+
+
+def _render_pdf_with_poppler(pdf_path, directory):
+    output_prefix = os.path.join(directory, 'page')
+    size = str(_max_size() * 2)
+    try:
+        subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to', size, pdf_path, output_prefix],
+            check=True,
+            capture_output=True,
+            timeout=PDF_RENDER_TIMEOUT_SECONDS,
+        )
+    except FileNotFoundError:
+        return None
+    return f'{output_prefix}.png'
+
+
+def _largest_page_image(pdf_path):
+    from PIL import Image
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    reader = PdfReader(pdf_path)
+    if not reader.pages:
+        return None
+    largest = None
+    for embedded in reader.pages[0].images:
+        image = Image.open(io.BytesIO(embedded.data))
+        if largest is None or image.width * image.height > largest.width * largest.height:
+            largest = image
+    return largest
+
+
+def render_preview(field_file):
+    """A PIL image previewing field_file, at most RESOURCE_PREVIEW_MAX_SIZE pixels on its long side."""
+    from PIL import Image, UnidentifiedImageError
+
+    with field_file.open('rb') as content:
+        is_pdf = content.read(5) == b'%PDF-'
+
+    with tempfile.TemporaryDirectory(prefix='tutorlix-preview-') as directory:
+        if is_pdf:
+            pdf_path = _local_copy(field_file, directory)
+            rendered_path = _render_pdf_with_poppler(pdf_path, directory)
+            image = Image.open(rendered_path) if rendered_path else _largest_page_image(pdf_path)
+            if image is None:
+                raise PreviewUnavailable('Install poppler-utils (pdftoppm) to render PDF pages.')
+        else:
+            try:
+                with field_file.open('rb') as content:
+                    image = Image.open(content)
+                    image.load()
+            except UnidentifiedImageError as exc:
+                raise PreviewUnavailable('The file is neither a PDF nor an image.') from exc
+
+        image.thumbnail((_max_size(), _max_size()))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        return image
+
+
+def generate_preview(content_hash):
+    """Create the preview for content_hash unless one exists. Returns the preview status."""
+    preview = ResourcePreview.objects.filter(content_hash=content_hash).first()
+    if preview is not None and preview.status == 'ready':
+        return preview.status
+    resource = (
+        Resource.objects.filter(content_hash=content_hash)
+        .exclude(file='')
+        .exclude(file__isnull=True)
+        .order_by('id')
+        .first()
+    )
+    if resource is None:
+        return 'missing'
+
+    preview = preview or ResourcePreview(content_hash=content_hash)
+    preview.error = ''
+    try:
+        image = render_preview(resource.file)
+    except PreviewUnavailable as exc:
+        preview.status = 'unavailable'
+        preview.error = str(exc)
+    except Exception as exc:
+        logger.warning('Preview generation failed for resource %s: %s', resource.pk, exc)
+        preview.status = 'failed'
+        preview.error = str(exc)
+    else:
+        output = io.BytesIO()
+        image.save(output, PREVIEW_FORMAT, quality=PREVIEW_QUALITY)
+        preview.image.save(f'{content_hash}.webp', ContentFile(output.getvalue()), save=False)
+        preview.width, preview.height = image.size
+        preview.status = 'ready'
+    preview.save()
+    return preview.status
+
+
+def generate_previews(resource_ids):
+    content_hashes = (
+        Resource.objects.filter(pk__in=resource_ids)
+        .exclude(content_hash='')
+        .values_list('content_hash', flat=True)
+        .distinct()
+    )
+    statuses = {}
+    for content_hash in content_hashes:
+        status = generate_preview(content_hash)
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def queue_resource_previews(resource_ids):
+    resource_ids = sorted(set(resource_ids))
+    if resource_ids:
+        enqueue(RESOURCE_PREVIEW_TASK, {'resources': resource_ids}, priority=PRIORITY_LOW)
+
+
+def preview_url(request, content_hash):
+    """
+    Stable URL for the preview of content_hash. It only changes with the
+    content, which is what lets the response be cached as immutable.
+    """
+    token = signing.Signer(salt=PREVIEW_SIGNER_SALT).sign(content_hash)
+    url = reverse('resource-preview', kwargs={'token': token})
+    return request.build_absolute_uri(url) if request else url
+
+
+def resolve_preview_token(token):
+    """The ready ResourcePreview for a token from preview_url(), or None."""
+    try:
+        content_hash = signing.Signer(salt=PREVIEW_SIGNER_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    return ResourcePreview.objects.filter(content_hash=content_hash, status='ready').first()
@@ -0,0 +1,243 @@
+"""
+Full-text search over resources, including the text inside their PDFs.
+
+Text is extracted on the background job worker and kept in the SQLite FTS5
+table lms_resource_search (created by migration 0058). ResourceText records
+which file each indexed row came from, so re-indexing after a metadata edit
+reuses the stored text and identical files are only extracted once.
+"""
+import html
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .background_jobs import PRIORITY_LOW, enqueue
+from .models import Resource, ResourceText
+
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_INDEX_TASK = 'resource_index'
+SEARCH_TABLE = 'lms_resource_search'
+SEARCH_TERM_PATTERN = re.compile(r'[^\W_]+')
+WHITESPACE_PATTERN = re.compile(r'[\s\x00-\x1f]+')
+MAX_SEARCH_TERMS = 12
+# Column weights for bm25(): title, description, tags, body.
+RANK_WEIGHTS = (10.0, 4.0, 4.0, 1.0)
+SNIPPET_TOKENS = 24
+# Control characters cannot appear in normalized text, so they are safe
+# markers to replace with <mark> once the snippet has been HTML-escaped.
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+class ResourceTextError(Exception):
+    pass
+
+
+def search_index_available():
+    return connection.vendor == 'sqlite'
+
+
+def _max_text_chars():
+    return int(getattr(settings, 'RESOURCE_TEXT_MAX_CHARS', 500_000))
+
+
+def normalize_text(text):
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def extract_pdf_text(content, max_chars=None):
+    """Returns (text, page_count) for an open PDF file, stopping after max_chars characters."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:
+        raise ResourceTextError('PDF text extraction needs the pypdf package. Install pypdf from pip.') from exc
+
+    max_chars = max_chars or _max_text_chars()
+    try:
+        reader = PdfReader(content)
+        pages = []
+        length = 0
+        for page in reader.pages:
+            text = normalize_text(page.extract_text() or '')
+            if text:
+                pages.append(text)
+                length += len(text) + 1
+            if length >= max_chars:
+                break
+        return ' '.join(pages)[:max_chars], len(reader.pages)
+    except ResourceTextError:
+        raise
+    except Exception as exc:
+        raise ResourceTextError(f'Could not read PDF text: {exc}') from exc
+
+
+def _is_pdf(resource):
+    with resource.file.open('rb') as content:
+        return content.read(5) == b'%PDF-'
+
+
+def _stored_body(resource_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT body FROM {SEARCH_TABLE} WHERE rowid = %s', [resource_id])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _write_index_row(resource, body):
+    tags = ' '.join(str(tag) for tag in resource.tags or [])
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [resource.pk])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, description, tags, body) VALUES (%s, %s, %s, %s, %s)',
+            [resource.pk, resource.title, resource.description or '', tags, body],
+        )
+
+
+def remove_from_index(resource_ids):
+    if not search_index_available() or not resource_ids:
+        return
+    with connection.cursor() as cursor:
+        for resource_id in resource_ids:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [resource_id])
+
+
+def _extract_body(resource, record):
+    """
+    Text for the resource's current file: reused from its own row or from
+    another resource with the same bytes when possible, extracted otherwise.
+    """
+    content_hash = resource.content_hash
+    if record.content_hash == content_hash and record.status != 'failed':
+        body = _stored_body(resource.pk)
+        if body is not None:
+            return body
+
+    sibling = (
+        ResourceText.objects.filter(content_hash=content_hash, status='indexed')
+        .exclude(resource_id=resource.pk)
+        .first()
+    )
+    if sibling is not None:
+        body = _stored_body(sibling.resource_id)
+        if body is not None:
+            record.page_count = sibling.page_count
+            return body
+
+    if not _is_pdf(resource):
+        record.page_count = 0
+        return ''
+    with resource.file.open('rb') as content:
+        body, record.page_count = extract_pdf_text(content)
+    return body
+
+
+def index_resource(resource_id):
+    """Refresh one resource's row in the search index. Returns its ResourceText status."""
+    resource = Resource.objects.filter(pk=resource_id).first()
+    if resource is None:
+        remove_from_index([resource_id])
+        return 'missing'
+
+    record = ResourceText.objects.filter(resource=resource).first() or ResourceText(resource=resource)
+    record.error = ''
+    body = ''
+    if resource.file and resource.content_hash:
+        try:
+            body = _extract_body(resource, record)
+        except (ResourceTextError, OSError) as exc:
+            logger.warning('Text extraction failed for resource %s: %s', resource.pk, exc)
+            record.error = str(exc)
+    else:
+        record.page_count = 0
+
+    record.content_hash = resource.content_hash if resource.file else ''
+    record.char_count = len(body)
+    record.status = 'failed' if record.error else 'indexed' if body else 'no_text'
+    with transaction.atomic():
+        _write_index_row(resource, body)
+        record.save()
+    return record.status
+
+
+def index_resources(resource_ids):
+    statuses = {}
+    for resource_id in resource_ids:
+        status = index_resource(resource_id)
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def queue_resource_indexing(resource_ids):
+    """Index the resources on the background worker, behind imports and other interactive work."""
+    resource_ids = sorted(set(resource_ids))
+    if resource_ids and search_index_available():
+        enqueue(RESOURCE_INDEX_TASK, {'resources': resource_ids}, priority=PRIORITY_LOW)
+
+
+def build_match_query(query):
+    """
+    FTS5 query matching every word of `query`, the last one as a prefix so
+    results follow the user while they type. Quoting each term keeps FTS5
+    operators in user input from being interpreted.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(query.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return ''
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def search_resources(queryset, query):
+    """
+    Restrict queryset to resources matching `query`, best matches first. Only
+    the RESOURCE_SEARCH_MAX_RESULTS best ranked matches are considered. The
+    matches and their rank come from subqueries on the FTS table, so the
+    query binds a fixed handful of parameters however many rows match.
+    """
+    if not search_index_available():
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    match_query = build_match_query(query)
+    if not match_query:
+        return queryset.none()
+    limit = int(getattr(settings, 'RESOURCE_SEARCH_MAX_RESULTS', 1000))
+    rank = f'bm25({SEARCH_TABLE}, {", ".join(str(weight) for weight in RANK_WEIGHTS)})'
+    resource_id = f'{connection.ops.quote_name(Resource._meta.db_table)}.{connection.ops.quote_name("id")}'
+    best_matches = RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY {rank} LIMIT %s',
+        (match_query, limit),
+    )
+    match_rank = RawSQL(
+        f'SELECT {rank} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid = {resource_id}',
+        (match_query,),
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=best_matches).annotate(search_rank=match_rank).order_by('search_rank', 'pk')
+
+
+def search_snippets(resource_ids, query):
+    """
+    {resource id: HTML snippet} for the best matching passage of each
+    resource, with matched terms wrapped in <mark> and everything else escaped.
+    """
+    match_query = build_match_query(query)
+    if not resource_ids or not match_query or not search_index_available():
+        return {}
+    placeholders = ', '.join(['%s'] * len(resource_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, '…', {SNIPPET_TOKENS}) FROM {SEARCH_TABLE} "
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid IN ({placeholders})',
+            [SNIPPET_START, SNIPPET_END, match_query, *resource_ids],
+        )
+        rows = cursor.fetchall()
+    return {
+        resource_id: html.escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+        for resource_id, snippet in rows
+        if snippet
+    }
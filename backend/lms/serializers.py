@@ -6,12 +6,15 @@ from .models import (
     Category, ProfileType, PaymentHistory, Product, ProductImage, Offer, CourseBooking,
     AdhocPayment, AdhocPaymentHistory,
     StudentSpecificClass, CourseSpecificClass,
-    Recording, Attendance, TestScore, Test, TestQuestion, TestAttempt, TestAnswer,
+    Recording, Attendance, TestScore, Test, TestQuestion, TestAttempt, TestAnswer, CodePlagiarismReport,
+    ChunkedUpload, BackgroundJob,
     Expense, ContactFormMessage, SellerExpense, TeacherExpense, ProductLead, Masterclass,
-    QuestionBankCourse, QuestionBankTopic, QuestionBankQuestion, ReelGenerationJob, Resource, ApprovedResourceDomain, ResourceImportJob,
+    QuestionBankCourse, QuestionBankTopic, QuestionBankQuestion, ReelGenerationJob, Resource, ResourcePreview, ApprovedResourceDomain, ResourceImportJob,
     ForumPost, ForumPostLike, ForumComment, ForumNotification, MicrosoftCourse,
 )
+from .file_serving import signed_file_url
 from .frontend_urls import build_frontend_url
+from .resource_previews import preview_url
 from django.utils.text import slugify
 
 User = get_user_model()
@@ -1295,17 +1298,12 @@ class TestQuestionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'test', 'order', 'title', 'prompt', 'question_type', 'marks',
             'is_required', 'options', 'correct_options', 'attachment', 'attachment_url',
-            'allowed_file_types', 'starter_code', 'coding_language', 'created_at', 'updated_at'
+            'allowed_file_types', 'starter_code', 'coding_language', 'test_cases', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'attachment_url']
 
     def get_attachment_url(self, obj):
-        request = self.context.get('request')
-        if not obj.attachment:
-            return None
-        if request:
-            return request.build_absolute_uri(obj.attachment.url)
-        return obj.attachment.url
+        return signed_file_url(self.context.get('request'), obj, 'attachment')
 
     def validate(self, attrs):
         question_type = attrs.get('question_type') or getattr(self.instance, 'question_type', None)
@@ -1325,6 +1323,9 @@ class TestQuestionSerializer(serializers.ModelSerializer):
         if question_type != 'coding':
             attrs['starter_code'] = ''
             attrs['coding_language'] = ''
+            attrs['test_cases'] = []
+        elif 'test_cases' in attrs:
+            attrs['test_cases'] = self._validate_test_cases(attrs['test_cases'])
 
         for item in correct_options:
             if item not in options:
@@ -1332,6 +1333,20 @@ class TestQuestionSerializer(serializers.ModelSerializer):
 
         return attrs
 
+    def _validate_test_cases(self, test_cases):
+        if not isinstance(test_cases, list):
+            raise serializers.ValidationError({'test_cases': 'Test cases must be a list.'})
+        cleaned = []
+        for case in test_cases:
+            if not isinstance(case, dict) or 'expected_output' not in case:
+                raise serializers.ValidationError({'test_cases': 'Each test case needs an input and an expected_output.'})
+            cleaned.append({
+                'input': str(case.get('input') or ''),
+                'expected_output': str(case.get('expected_output') or ''),
+                'is_hidden': bool(case.get('is_hidden', True)),
+            })
+        return cleaned
+
 
 class TestAnswerSerializer(serializers.ModelSerializer):
     question_id = serializers.IntegerField(source='question.id', read_only=True)
@@ -1344,40 +1359,39 @@ class TestAnswerSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'question', 'question_id', 'question_prompt', 'selected_options',
             'subjective_answer', 'code_answer', 'code_language',
-            'uploaded_file', 'uploaded_file_url', 'awarded_marks', 'review_comment',
+            'uploaded_file', 'uploaded_file_url', 'save_sequence', 'judge_result', 'awarded_marks', 'review_comment',
             'reviewed_at', 'reviewed_by', 'reviewed_by_name', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'question_id', 'question_prompt', 'uploaded_file_url',
+            'id', 'question_id', 'question_prompt', 'uploaded_file_url', 'save_sequence', 'judge_result',
             'reviewed_at', 'reviewed_by', 'reviewed_by_name', 'created_at', 'updated_at'
         ]
 
     def get_uploaded_file_url(self, obj):
-        request = self.context.get('request')
-        if not obj.uploaded_file:
-            return None
-        if request:
-            return request.build_absolute_uri(obj.uploaded_file.url)
-        return obj.uploaded_file.url
+        return signed_file_url(self.context.get('request'), obj, 'uploaded_file')
 
 
 class StudentVisibleTestQuestionSerializer(serializers.ModelSerializer):
     attachment_url = serializers.SerializerMethodField()
+    sample_test_cases = serializers.SerializerMethodField()
 
     class Meta:
         model = TestQuestion
         fields = [
             'id', 'order', 'title', 'prompt', 'question_type', 'marks', 'is_required',
-            'options', 'attachment_url', 'allowed_file_types', 'starter_code', 'coding_language'
+            'options', 'attachment_url', 'allowed_file_types', 'starter_code', 'coding_language',
+            'sample_test_cases'
+        ]
+
+    def get_sample_test_cases(self, obj):
+        return [
+            {'input': case.get('input', ''), 'expected_output': case.get('expected_output', '')}
+            for case in (obj.test_cases or [])
+            if not case.get('is_hidden', True)
         ]
 
     def get_attachment_url(self, obj):
-        request = self.context.get('request')
-        if not obj.attachment:
-            return None
-        if request:
-            return request.build_absolute_uri(obj.attachment.url)
-        return obj.attachment.url
+        return signed_file_url(self.context.get('request'), obj, 'attachment')
 
 
 class TestSerializer(serializers.ModelSerializer):
@@ -1387,7 +1401,7 @@ class TestSerializer(serializers.ModelSerializer):
     total_marks = serializers.SerializerMethodField()
     locked_attempt_count = serializers.SerializerMethodField()
     my_attempt = serializers.SerializerMethodField()
-    questions = TestQuestionSerializer(many=True, read_only=True)
+    questions = serializers.SerializerMethodField()
 
     class Meta:
         model = Test
@@ -1400,23 +1414,46 @@ class TestSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_by', 'created_by_name', 'question_count', 'total_marks', 'locked_attempt_count', 'my_attempt', 'questions', 'created_at', 'updated_at']
 
+    # TestViewSet annotates the counts and prefetches `my_attempts`; the fallbacks
+    # keep the serializer usable for tests loaded elsewhere (e.g. attempt detail).
     def get_question_count(self, obj):
+        if hasattr(obj, 'annotated_question_count'):
+            return obj.annotated_question_count
         return obj.questions.count()
 
     def get_total_marks(self, obj):
+        if hasattr(obj, 'annotated_total_marks'):
+            return str(Decimal(obj.annotated_total_marks).quantize(Decimal('0.01')))
         return str(sum(question.marks for question in obj.questions.all()))
 
     def get_locked_attempt_count(self, obj):
+        if hasattr(obj, 'annotated_locked_attempt_count'):
+            return obj.annotated_locked_attempt_count
         return obj.attempts.filter(status='locked').count()
 
+    def get_questions(self, obj):
+        # Students get the filtered view: no answer keys and no hidden judge cases.
+        user = getattr(self.context.get('request'), 'user', None)
+        if user and user.is_authenticated and user.role in ['admin', 'teacher']:
+            serializer_class = TestQuestionSerializer
+        else:
+            serializer_class = StudentVisibleTestQuestionSerializer
+        return serializer_class(obj.questions.all(), many=True, context=self.context).data
+
     def get_my_attempt(self, obj):
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not user.is_authenticated or user.role != 'student':
             return None
-        attempt = obj.attempts.filter(student=user).order_by('-updated_at').first()
+        if hasattr(obj, 'my_attempts'):
+            attempt = obj.my_attempts[0] if obj.my_attempts else None
+        else:
+            attempt = obj.attempts.filter(student=user).exclude(status='not_started').order_by('-updated_at').first()
         if not attempt:
             return None
+        reviewed_count = getattr(attempt, 'reviewed_answer_count', None)
+        if reviewed_count is None:
+            reviewed_count = attempt.answers.filter(reviewed_at__isnull=False).count()
         return {
             'id': attempt.id,
             'status': attempt.status,
@@ -1425,7 +1462,7 @@ class TestSerializer(serializers.ModelSerializer):
             'current_question_index': attempt.current_question_index,
             'total_awarded_marks': str(attempt.total_awarded_marks or 0),
             'reviewed_at': attempt.reviewed_at,
-            'reviewed_count': attempt.answers.filter(reviewed_at__isnull=False).count(),
+            'reviewed_count': reviewed_count,
         }
 
 
@@ -1486,6 +1523,45 @@ class TestAttemptDetailSerializer(TestAttemptSerializer):
         return serializer.data
 
 
+class CodePlagiarismReportSerializer(serializers.ModelSerializer):
+    question_order = serializers.IntegerField(source='question.order', read_only=True)
+    question_title = serializers.CharField(source='question.title', read_only=True)
+
+    class Meta:
+        model = CodePlagiarismReport
+        fields = [
+            'id', 'test', 'question', 'question_order', 'question_title', 'status',
+            'submission_count', 'clusters', 'error', 'generated_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = [
+            'id', 'purpose', 'target', 'filename', 'content_type', 'total_size', 'chunk_size', 'total_chunks',
+            'received_chunks', 'sha256', 'status', 'expires_at', 'completed_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_received_chunks(self, obj):
+        return sorted(part.index for part in obj.parts.all())
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'task', 'status', 'priority', 'attempts', 'max_attempts', 'error',
+            'created_at', 'started_at', 'finished_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
 # ============= Expense Serializers =============
 
 class ExpenseSerializer(serializers.ModelSerializer):
@@ -1700,9 +1776,17 @@ class MicrosoftCourseSerializer(serializers.ModelSerializer):
         return [str(item).strip() for item in value if str(item).strip()]
 
 
+class MicrosoftCourseListSerializer(MicrosoftCourseSerializer):
+    """Catalog page entries; raw_payload is only needed when viewing a single item."""
+
+    class Meta(MicrosoftCourseSerializer.Meta):
+        fields = [field for field in MicrosoftCourseSerializer.Meta.fields if field != 'raw_payload']
+
+
 class ResourceSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     download_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     has_file = serializers.SerializerMethodField()
     has_external_url = serializers.SerializerMethodField()
     can_edit = serializers.SerializerMethodField()
@@ -1730,6 +1814,7 @@ class ResourceSerializer(serializers.ModelSerializer):
             'has_file',
             'has_external_url',
             'download_url',
+            'preview_url',
             'can_edit',
             'can_delete',
             'created_at',
@@ -1745,6 +1830,7 @@ class ResourceSerializer(serializers.ModelSerializer):
             'has_file',
             'has_external_url',
             'download_url',
+            'preview_url',
             'can_edit',
             'can_delete',
             'source_url',
@@ -1782,6 +1868,17 @@ class ResourceSerializer(serializers.ModelSerializer):
             return None
         return request.build_absolute_uri(f'/api/lms/resources/{obj.pk}/download/')
 
+    def get_preview_url(self, obj):
+        # ResourceViewSet annotates has_preview; other callers look it up.
+        has_preview = getattr(obj, 'has_preview', None)
+        if has_preview is None:
+            has_preview = bool(obj.content_hash) and ResourcePreview.objects.filter(
+                content_hash=obj.content_hash, status='ready'
+            ).exists()
+        if not has_preview:
+            return None
+        return preview_url(self.context.get('request'), obj.content_hash)
+
     def get_has_file(self, obj):
         return bool(obj.file)
 
@@ -1833,7 +1930,6 @@ class ResourceImportJobSerializer(serializers.ModelSerializer):
             'progress_total',
             'progress_percent',
             'created_resources_count',
-            'log_lines',
             'error_message',
             'can_abort',
             'created_by',
@@ -0,0 +1,51 @@
+"""Tasks run by the background job worker (lms.background_jobs)."""
+from lms.background_jobs import register_task
+from lms.chunked_uploads import purge_expired_uploads
+from lms.plagiarism import PLAGIARISM_CHECK_TASK, queue_due_plagiarism_checks, run_plagiarism_check
+from lms.resource_previews import RESOURCE_PREVIEW_TASK, generate_previews
+from lms.resource_search import RESOURCE_INDEX_TASK, index_resources
+from lms.views.resource_views import run_resource_import_job
+from lms.views.test_views import grade_submitted_attempt
+from lms.views.video_views import VIDEO_RENDER_TASK, remove_render_files, render_slides_video
+
+
+@register_task('resource_import')
+def resource_import(payload):
+    run_resource_import_job(payload['import_job'])
+
+
+@register_task('attempt_auto_grade')
+def attempt_auto_grade(payload):
+    grade_submitted_attempt(payload['attempt'])
+
+
+@register_task(PLAGIARISM_CHECK_TASK)
+def plagiarism_check(payload):
+    run_plagiarism_check(payload['test'])
+
+
+# Tests closed by available_until have no request to queue their check.
+@register_task('plagiarism_scan', every=5 * 60)
+def plagiarism_scan(payload):
+    return {'tests': queue_due_plagiarism_checks()}
+
+
+@register_task(RESOURCE_INDEX_TASK)
+def resource_index(payload):
+    return index_resources(payload['resources'])
+
+
+@register_task(RESOURCE_PREVIEW_TASK)
+def resource_preview(payload):
+    return generate_previews(payload['resources'])
+
+
+@register_task(VIDEO_RENDER_TASK, cleanup=remove_render_files)
+def video_render(payload):
+    output = render_slides_video(payload['work_dir'], payload['slide_count'], set(payload.get('audio_indexes') or []))
+    return {'output': output}
+
+
+@register_task('purge_chunked_uploads', every=60 * 60)
+def purge_chunked_uploads(payload):
+    return {'purged': purge_expired_uploads()}
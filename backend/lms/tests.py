@@ -1,6 +1,53 @@
-from django.test import SimpleTestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-from lms.code_runner import CodeRunnerValidationError, run_code
+import requests
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from lms import background_jobs
+from lms.attempt_activity import flush_attempt_activity
+from lms.chunked_uploads import assemble_upload
+from lms.code_execution import CodeExecutionService, ExecutionQueueFull
+from lms.code_runner import CodeRunnerValidationError, compile_cache_stats, judge_code, run_code
+from lms.gradebook import build_score_matrix, iter_gradebook_csv, refresh_gradebook_entry
+from lms.models import (
+    ApprovedResourceDomain,
+    BackgroundJob,
+    ChunkedUpload,
+    CodePlagiarismReport,
+    CourseBooking,
+    MicrosoftCourse,
+    Product,
+    Resource,
+    ResourceCrawlPage,
+    ResourceImportJob,
+    ResourcePreview,
+    Test,
+    TestAnswer,
+    TestAttempt,
+    TestQuestion,
+)
+from lms.views import resource_views, upload_views
+from notes.models import Note
 
 
 class CodeRunnerTests(SimpleTestCase):
@@ -14,3 +61,1288 @@ class CodeRunnerTests(SimpleTestCase):
     def test_unsupported_language_raises_validation_error(self):
         with self.assertRaises(CodeRunnerValidationError):
             run_code('ruby', 'puts "hello"')
+
+    def test_judge_reports_verdict_per_test_case(self):
+        source = "import time\nn = int(input())\nif n < 0:\n    raise SystemExit(3)\nif n == 0:\n    time.sleep(5)\nprint(n * 2)"
+        result = judge_code('python', source, [
+            {'input': '2', 'expected_output': '4\n'},
+            {'input': '3', 'expected_output': '7'},
+            {'input': '-1', 'expected_output': ''},
+            {'input': '0', 'expected_output': '0'},
+        ], timeout_seconds=1)
+
+        self.assertEqual([case['verdict'] for case in result['cases']], ['AC', 'WA', 'RE', 'TLE'])
+        self.assertEqual(result['passed_count'], 1)
+        self.assertFalse(result['success'])
+
+    def test_runaway_output_is_killed_at_capture_limit(self):
+        result = run_code('python', "while True:\n    print('x' * 1000)")
+
+        self.assertTrue(result['output_limit_exceeded'])
+        self.assertFalse(result['timed_out'])
+        self.assertFalse(result['success'])
+        self.assertTrue(result['stdout'].endswith('[output truncated]'))
+        self.assertLess(result['duration_ms'], 4000)
+
+    def test_run_reports_cpu_time_and_peak_memory(self):
+        result = run_code('python', 'data = bytearray(64 * 1024 * 1024)\nsum(range(2_000_000))\nprint(len(data))')
+
+        self.assertTrue(result['success'], result)
+        self.assertGreater(result['cpu_time_ms'], 0)
+        self.assertGreaterEqual(result['peak_memory_kb'], 64 * 1024)
+
+    @unittest.skipIf(os.name == 'nt', 'rlimits are POSIX only')
+    @override_settings(CODE_RUNNER_WARM_POOL_SIZE=0)
+    def test_rlimits_are_applied_with_and_without_prlimit(self):
+        source = 'import resource\nprint(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_CORE)[0])'
+        which = shutil.which
+        with mock.patch('lms.code_runner.shutil.which', side_effect=lambda name: None if name == 'prlimit' else which(name)):
+            launcher_result = run_code('python', source, timeout_seconds=3)
+        prlimit_result = run_code('python', source, timeout_seconds=3)
+
+        self.assertEqual(launcher_result['stdout'], '4 0\n')
+        self.assertEqual(prlimit_result['stdout'], '4 0\n')
+
+    @override_settings(CODE_RUNNER_WARM_POOL_SIZE=1)
+    def test_warm_python_worker_matches_cold_run(self):
+        source = "import sys\nprint(__name__, sys.stdin.read().upper())\nraise ValueError('boom')"
+        warm_results = [run_code('python', source, 'abc') for _ in range(2)]
+        with override_settings(CODE_RUNNER_WARM_POOL_SIZE=0):
+            cold_result = run_code('python', source, 'abc')
+
+        for result in warm_results:
+            self.assertEqual(result['stdout'], '__main__ ABC\n')
+            self.assertEqual(result['exit_code'], 1)
+            self.assertEqual(result['stderr'].splitlines()[2:], cold_result['stderr'].splitlines()[2:])
+            self.assertTrue(result['stderr'].startswith('Traceback (most recent call last):\n  File "/'))
+
+
+
+@unittest.skipUnless(shutil.which('gcc'), 'gcc is not installed')
+class CompileCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.mkdtemp(prefix='tutorlix-compile-cache-test-')
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def test_second_run_of_same_source_skips_compilation(self):
+        source = '#include <stdio.h>\nint main(void) { printf("cached\\n"); return 0; }\n'
+        with override_settings(CODE_RUNNER_COMPILE_CACHE_DIR=self.cache_dir, CODE_RUNNER_COMPILE_CACHE_MAX_BYTES=10 * 1024 * 1024):
+            first = run_code('c', source)
+            second = run_code('c', source)
+            stats = compile_cache_stats()
+
+        self.assertEqual(first['compile_cache'], 'miss')
+        self.assertEqual(second['compile_cache'], 'hit')
+        self.assertEqual(second['stdout'], 'cached\n')
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+
+class TestEngineTestCase(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pass', role='teacher')
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@example.com',
+            password='pass',
+            role='student',
+            first_name='Asha',
+        )
+        self.product = Product.objects.create(name='Python Basics', total_seats=10, price=Decimal('100'), description='Course')
+        self.test = Test.objects.create(title='Quiz', product=self.product, created_by=self.teacher, status='published')
+        self.first_question = TestQuestion.objects.create(test=self.test, order=1, prompt='Q1', question_type='subjective', marks=5)
+        self.second_question = TestQuestion.objects.create(test=self.test, order=2, prompt='Q2', question_type='subjective', marks=5)
+        self.attempt = TestAttempt.objects.create(test=self.test, student=self.student, status='submitted')
+
+
+class GradebookTests(TestEngineTestCase):
+    def test_refresh_builds_entry_and_score_matrix(self):
+        TestAnswer.objects.create(attempt=self.attempt, question=self.first_question, awarded_marks=Decimal('4'), reviewed_by=self.teacher)
+        TestAnswer.objects.create(attempt=self.attempt, question=self.second_question, awarded_marks=Decimal('2'))
+
+        entry = refresh_gradebook_entry(self.attempt)
+        matrix = build_score_matrix(self.test)
+
+        self.assertEqual(entry.total_awarded_marks, Decimal('6'))
+        self.assertEqual(entry.answered_count, 2)
+        self.assertEqual(matrix['total_marks'], '10.00')
+        self.assertEqual(matrix['rows'][0]['student_name'], 'Asha')
+        self.assertEqual(matrix['rows'][0]['scores'], ['4.00', '2.00'])
+
+    def test_csv_export_streams_one_line_per_student(self):
+        TestAnswer.objects.create(attempt=self.attempt, question=self.second_question, awarded_marks=Decimal('3'))
+        refresh_gradebook_entry(self.attempt)
+
+        lines = list(iter_gradebook_csv(self.test))
+
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Q1 (5.00)', lines[0])
+        self.assertIn('Asha,student@example.com,submitted,,3.00,3.00', lines[1])
+
+
+class BatchAnswerSaveTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt.status = 'in_progress'
+        self.attempt.save(update_fields=['status'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = f'/api/lms/test-attempts/{self.attempt.id}/save_answers/'
+
+    def test_batch_save_upserts_answers_and_drops_stale_sequences(self):
+        response = self.client.post(self.url, {
+            'current_question_index': 1,
+            'answers': [
+                {'question': self.first_question.id, 'subjective_answer': 'first', 'sequence': 2},
+                {'question': self.second_question.id, 'subjective_answer': 'second', 'sequence': 1},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['saved']), 2)
+
+        response = self.client.post(self.url, {
+            'answers': [
+                {'question': self.first_question.id, 'subjective_answer': 'older', 'sequence': 1},
+                {'question': self.second_question.id, 'subjective_answer': 'newer', 'sequence': 3},
+            ],
+        }, format='json')
+        self.assertEqual(response.data['stale'], [{'question': self.first_question.id, 'sequence': 2}])
+
+        answers = dict(self.attempt.answers.values_list('question_id', 'subjective_answer'))
+        self.assertEqual(answers, {self.first_question.id: 'first', self.second_question.id: 'newer'})
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.current_question_index, 1)
+
+    def test_batch_items_without_a_sequence_are_saved_like_save_answer(self):
+        self.client.post(self.url, {
+            'answers': [{'question': self.first_question.id, 'subjective_answer': 'first', 'sequence': 5}],
+        }, format='json')
+
+        response = self.client.post(self.url, {
+            'answers': [{'question': self.first_question.id, 'subjective_answer': 'unsequenced'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stale'], [])
+        answer = self.attempt.answers.get()
+        self.assertEqual((answer.subjective_answer, answer.save_sequence), ('unsequenced', 5))
+
+    def test_batch_save_writes_over_a_row_inserted_concurrently(self):
+        bulk_create = TestAnswer.objects.bulk_create
+
+        def racing_bulk_create(answers, **kwargs):
+            TestAnswer.objects.create(attempt=self.attempt, question=self.first_question, review_comment='graded')
+            return bulk_create(answers, **kwargs)
+
+        with mock.patch.object(TestAnswer.objects, 'bulk_create', side_effect=racing_bulk_create):
+            response = self.client.post(self.url, {
+                'answers': [{'question': self.first_question.id, 'subjective_answer': 'mine', 'sequence': 1}],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        answer = self.attempt.answers.get()
+        self.assertEqual((answer.subjective_answer, answer.save_sequence, answer.review_comment), ('mine', 1, 'graded'))
+
+    def test_batch_save_rejects_questions_from_other_tests(self):
+        response = self.client.post(self.url, {'answers': [{'question': 999999, 'sequence': 1}]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ProvisionedAttemptStartTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.attempt.delete()
+        CourseBooking.objects.create(
+            student=self.student,
+            product=self.product,
+            course_name=self.product.name,
+            price=self.product.price,
+            payment_status='paid',
+        )
+        self.client = APIClient()
+
+    def test_publish_provisions_attempts_and_start_activates_them(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(f'/api/lms/tests/{self.test.id}/provision_attempts/')
+        self.assertEqual(response.data['eligible_students'], 1)
+        self.assertEqual(TestAttempt.objects.get(test=self.test).status, 'not_started')
+
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/lms/test-attempts/start/', {'test': self.test.id}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        attempt = TestAttempt.objects.get(test=self.test, student=self.student)
+        self.assertEqual(attempt.status, 'in_progress')
+        self.assertIsNotNone(attempt.started_at)
+
+
+@override_settings(TEST_ATTEMPT_ACTIVITY_CACHE_SHARED=True)
+class AttemptHeartbeatTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.started_at = timezone.now() - timedelta(minutes=5)
+        self.attempt.status = 'in_progress'
+        self.attempt.started_at = self.started_at
+        self.attempt.last_resumed_at = self.started_at
+        self.attempt.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_heartbeat_is_cached_until_flushed(self):
+        response = self.client.post(f'/api/lms/test-attempts/{self.attempt.id}/heartbeat/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertGreaterEqual(response.data['time_spent_seconds'], 300)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.time_spent_seconds, 0)
+
+        self.assertEqual(flush_attempt_activity(), 1)
+        self.attempt.refresh_from_db()
+        self.assertGreaterEqual(self.attempt.time_spent_seconds, 300)
+        self.assertGreater(self.attempt.last_resumed_at, self.started_at)
+        self.assertEqual(flush_attempt_activity(), 0)
+
+    def test_heartbeat_rejects_other_students_attempts(self):
+        other = get_user_model().objects.create_user(username='other', password='pass', role='student')
+        self.client.force_authenticate(other)
+
+        response = self.client.post(f'/api/lms/test-attempts/{self.attempt.id}/heartbeat/')
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(TEST_ATTEMPT_ACTIVITY_CACHE_SHARED=False)
+    def test_heartbeat_is_written_through_without_a_shared_cache(self):
+        response = self.client.post(f'/api/lms/test-attempts/{self.attempt.id}/heartbeat/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.attempt.refresh_from_db()
+        self.assertIsNotNone(self.attempt.last_activity_at)
+        with self.assertRaises(CommandError):
+            call_command('flush_test_attempt_activity')
+
+
+class TestListingQueryTests(TestEngineTestCase):
+    def _list_tests(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/lms/tests/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], len(queries)
+
+    def test_teacher_listing_reads_annotations_without_per_test_queries(self):
+        self.attempt.status = 'locked'
+        self.attempt.save(update_fields=['status'])
+        results, baseline_queries = self._list_tests(self.teacher)
+        self.assertEqual(results[0]['question_count'], 2)
+        self.assertEqual(results[0]['total_marks'], '10.00')
+        self.assertEqual(results[0]['locked_attempt_count'], 1)
+
+        for index in range(3):
+            extra_test = Test.objects.create(title=f'Extra {index}', product=self.product, created_by=self.teacher)
+            TestQuestion.objects.create(test=extra_test, prompt='Q', question_type='subjective', marks=1)
+        _, queries = self._list_tests(self.teacher)
+
+        self.assertEqual(queries, baseline_queries)
+
+    def test_student_listing_includes_prefetched_attempt(self):
+        CourseBooking.objects.create(
+            student=self.student,
+            product=self.product,
+            course_name=self.product.name,
+            price=self.product.price,
+            payment_status='paid',
+        )
+        TestAnswer.objects.create(attempt=self.attempt, question=self.first_question, reviewed_at=timezone.now())
+
+        results, _ = self._list_tests(self.student)
+
+        self.assertEqual(results[0]['my_attempt']['id'], self.attempt.id)
+        self.assertEqual(results[0]['my_attempt']['reviewed_count'], 1)
+
+    def test_student_listing_hides_judge_cases_and_answer_keys(self):
+        CourseBooking.objects.create(
+            student=self.student,
+            product=self.product,
+            course_name=self.product.name,
+            price=self.product.price,
+            payment_status='paid',
+        )
+        TestQuestion.objects.create(
+            test=self.test,
+            order=3,
+            prompt='Double it',
+            question_type='coding',
+            marks=4,
+            coding_language='python',
+            test_cases=[
+                {'input': '2', 'expected_output': '4', 'is_hidden': False},
+                {'input': '5', 'expected_output': '10', 'is_hidden': True},
+            ],
+        )
+
+        results, _ = self._list_tests(self.student)
+        coding_question = results[0]['questions'][2]
+
+        self.assertNotIn('test_cases', coding_question)
+        self.assertNotIn('correct_options', coding_question)
+        self.assertEqual(coding_question['sample_test_cases'], [{'input': '2', 'expected_output': '4'}])
+        teacher_results, _ = self._list_tests(self.teacher)
+        self.assertEqual(len(teacher_results[0]['questions'][2]['test_cases']), 2)
+
+
+@override_settings(CODE_EXECUTION_WORKERS=0, BACKGROUND_JOBS_EAGER=True)
+class CodingAutoGradeTests(TestEngineTestCase):
+    def test_submit_judges_coding_answers_against_hidden_cases(self):
+        question = TestQuestion.objects.create(
+            test=self.test,
+            order=3,
+            prompt='Double it',
+            question_type='coding',
+            marks=4,
+            coding_language='python',
+            test_cases=[
+                {'input': '2', 'expected_output': '4', 'is_hidden': False},
+                {'input': '5', 'expected_output': '11', 'is_hidden': True},
+            ],
+        )
+        self.attempt.status = 'in_progress'
+        self.attempt.save(update_fields=['status'])
+        TestAnswer.objects.create(attempt=self.attempt, question=question, code_answer='print(int(input()) * 2)', code_language='python')
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        response = client.post(f'/api/lms/test-attempts/{self.attempt.id}/submit/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        answer = TestAnswer.objects.get(attempt=self.attempt, question=question)
+        self.assertEqual(answer.awarded_marks, Decimal('2.00'))
+        self.assertEqual([case['verdict'] for case in answer.judge_result['cases']], ['AC', 'WA'])
+        self.assertNotIn('stdout', answer.judge_result['cases'][1])
+        self.assertEqual(response.data['total_awarded_marks'], '2.00')
+        self.assertEqual(
+            list(BackgroundJob.objects.filter(task='attempt_auto_grade').values_list('status', flat=True)),
+            ['completed'],
+        )
+
+    def test_async_run_is_polled_by_job_id(self):
+        question = TestQuestion.objects.create(
+            test=self.test,
+            order=3,
+            prompt='Echo',
+            question_type='coding',
+            marks=2,
+            coding_language='python',
+        )
+        self.attempt.status = 'in_progress'
+        self.attempt.save(update_fields=['status'])
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        response = client.post(
+            f'/api/lms/test-attempts/{self.attempt.id}/run_code/',
+            {'question': question.id, 'code': 'print(input())', 'stdin': 'hi', 'async': True},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 202, response.data)
+
+        poll = client.get(f"/api/lms/code-executions/{response.data['job_id']}/")
+        self.assertEqual(poll.status_code, 200, poll.data)
+        self.assertEqual(poll.data['status'], 'completed')
+        self.assertEqual(poll.data['result']['stdout'], 'hi\n')
+        self.assertNotIn('user_id', poll.data)
+
+        client.force_authenticate(self.teacher)
+        self.assertEqual(client.get(f"/api/lms/code-executions/{response.data['job_id']}/").status_code, 404)
+
+
+class CodeExecutionServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.blocker_started = threading.Event()
+
+    def _block(self):
+        self.blocker_started.set()
+        self.release.wait(5)
+
+    def test_jobs_are_scheduled_round_robin_across_users(self):
+        service = CodeExecutionService(max_workers=1, max_queue_size=10, max_jobs_per_user=5)
+        order = []
+        service.submit('blocker', self._block)
+        self.assertTrue(self.blocker_started.wait(5))
+
+        jobs = [
+            service.submit('a', order.append, 'a1'),
+            service.submit('a', order.append, 'a2'),
+            service.submit('b', order.append, 'b1'),
+        ]
+        self.release.set()
+        for job in jobs:
+            self.assertTrue(job.wait(5))
+
+        self.assertEqual(order, ['a1', 'b1', 'a2'])
+
+    def test_full_queue_and_per_user_limit_raise_with_retry_after(self):
+        service = CodeExecutionService(max_workers=1, max_queue_size=1, max_jobs_per_user=1)
+        service.submit('blocker', self._block)
+        self.assertTrue(self.blocker_started.wait(5))
+        try:
+            with self.assertRaises(ExecutionQueueFull):
+                service.submit('blocker', len, '')
+            queued = service.submit('a', len, 'abc')
+            with self.assertRaises(ExecutionQueueFull) as raised:
+                service.submit('b', len, '')
+            self.assertGreaterEqual(raised.exception.retry_after, 1)
+        finally:
+            self.release.set()
+        self.assertTrue(queued.wait(5))
+        self.assertEqual(queued.result, 3)
+
+
+@override_settings(CODE_EXECUTION_WORKERS=0, BACKGROUND_JOBS_EAGER=True)
+class CodePlagiarismTests(TestEngineTestCase):
+    ORIGINAL = '''
+def count_vowels(text):
+    total = 0
+    for letter in text.lower():
+        if letter in "aeiou":
+            total += 1
+    return total
+
+words = input().split()
+best = max(words, key=count_vowels)
+print(best, count_vowels(best))
+'''
+    RENAMED = '''
+# my own solution
+def vowel_count(s):
+    n = 0
+    for ch in s.lower():
+        if ch in 'aeiou':
+            n += 1
+    return n
+
+items = input().split()
+answer = max(items, key=vowel_count)
+print(answer, vowel_count(answer))
+'''
+    UNRELATED = '''
+import sys
+data = sys.stdin.read().split()
+lengths = sorted(len(word) for word in data)
+print(lengths[-1] if lengths else 0)
+'''
+
+    def test_post_builds_report_clustering_renamed_copies(self):
+        User = get_user_model()
+        question = TestQuestion.objects.create(test=self.test, order=3, prompt='Vowels', question_type='coding', marks=5)
+        for index, source in enumerate([self.ORIGINAL, self.RENAMED, self.UNRELATED]):
+            student = self.student if index == 0 else User.objects.create_user(
+                username=f'student{index}',
+                email=f'student{index}@example.com',
+                password='pass',
+                role='student',
+            )
+            attempt = self.attempt if index == 0 else TestAttempt.objects.create(test=self.test, student=student, status='submitted')
+            TestAnswer.objects.create(attempt=attempt, question=question, code_answer=source, code_language='python')
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+
+        response = client.post(f'/api/lms/tests/{self.test.id}/plagiarism/')
+
+        self.assertEqual(response.status_code, 202, response.data)
+        report = response.data[0]
+        self.assertEqual((report['status'], report['submission_count']), ('completed', 3))
+        self.assertEqual(len(report['clusters']), 1)
+        cluster = report['clusters'][0]
+        self.assertEqual({member['student_name'] for member in cluster['members']}, {'Asha', 'student1@example.com'})
+        self.assertGreaterEqual(cluster['max_similarity'], 0.9)
+
+
+    def test_worker_checks_tests_closed_by_their_deadline(self):
+        question = TestQuestion.objects.create(test=self.test, order=3, prompt='Vowels', question_type='coding', marks=5)
+        TestAnswer.objects.create(attempt=self.attempt, question=question, code_answer=self.ORIGINAL, code_language='python')
+        Test.objects.filter(pk=self.test.pk).update(available_until=timezone.now() - timedelta(minutes=1))
+
+        self.assertIn('plagiarism_scan', background_jobs.enqueue_periodic_jobs())
+        self.assertNotIn('plagiarism_scan', background_jobs.enqueue_periodic_jobs())
+        background_jobs.run_worker('worker-1', once=True)
+
+        report = CodePlagiarismReport.objects.get(question=question)
+        self.assertEqual((report.status, report.submission_count), ('completed', 1))
+        self.assertEqual(BackgroundJob.objects.filter(task='plagiarism_check', status='completed').count(), 1)
+
+
+class ItemAnalysisTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User = get_user_model()
+        self.choice_question = TestQuestion.objects.create(
+            test=self.test,
+            order=3,
+            prompt='Pick one',
+            question_type='multiple_choice',
+            marks=2,
+            options=['A', 'B', 'C'],
+            correct_options=['B'],
+        )
+        self.attempts = [self.attempt]
+        for index in range(1, 4):
+            student = User.objects.create_user(username=f'student{index}', email=f'student{index}@example.com', password='pass', role='student')
+            self.attempts.append(TestAttempt.objects.create(test=self.test, student=student, status='submitted'))
+        # Stronger students (higher first-question marks) pick the correct option.
+        for attempt, first_marks, choice in zip(self.attempts, [5, 4, 1, 0], ['B', 'B', 'A', 'C']):
+            TestAnswer.objects.create(attempt=attempt, question=self.first_question, awarded_marks=Decimal(first_marks))
+            TestAnswer.objects.create(
+                attempt=attempt,
+                question=self.choice_question,
+                selected_options=[choice],
+                awarded_marks=Decimal('2') if choice == 'B' else Decimal('0'),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_reports_difficulty_discrimination_and_options(self):
+        response = self.client.get(f'/api/lms/tests/{self.test.id}/item_analysis/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['attempt_count'], 4)
+        first, second, choice = response.data['items']
+        self.assertEqual(first['difficulty'], 0.5)
+        self.assertIsNone(second['discrimination'])
+        self.assertEqual(choice['difficulty'], 0.5)
+        self.assertGreater(choice['discrimination'], 0.8)
+        self.assertEqual([(option['option'], option['count']) for option in choice['options']], [('A', 1), ('B', 2), ('C', 1)])
+        self.assertEqual(sum(bucket['count'] for bucket in response.data['score_distribution']['histogram']), 4)
+
+    def test_cached_analysis_is_rebuilt_after_grading(self):
+        self.client.get(f'/api/lms/tests/{self.test.id}/item_analysis/')
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/lms/tests/{self.test.id}/item_analysis/')
+
+        self.client.post(
+            f'/api/lms/test-attempts/{self.attempts[3].id}/grade_answer/',
+            {'question': self.first_question.id, 'awarded_marks': '5'},
+            format='json',
+        )
+        response = self.client.get(f'/api/lms/tests/{self.test.id}/item_analysis/')
+
+        self.assertEqual(response.data['items'][0]['difficulty'], 0.75)
+
+
+class BulkGradeTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.attempts = [self.attempt]
+        for index in range(1, 6):
+            student = User.objects.create_user(username=f'student{index}', email=f'student{index}@example.com', password='pass', role='student')
+            self.attempts.append(TestAttempt.objects.create(test=self.test, student=student, status='submitted'))
+        for attempt in self.attempts[:3]:
+            TestAnswer.objects.create(attempt=attempt, question=self.first_question, subjective_answer='answer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def _grade(self, grades):
+        return self.client.post('/api/lms/test-attempts/bulk_grade/', {'grades': grades}, format='json')
+
+    def test_grades_many_attempts_with_constant_queries(self):
+        grades = [
+            {'attempt': attempt.id, 'question': self.first_question.id, 'awarded_marks': '3', 'review_comment': 'ok'}
+            for attempt in self.attempts
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._grade(grades)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['graded'], 6)
+        self.assertLessEqual(len(queries), 15)
+        self.assertEqual(TestAnswer.objects.filter(question=self.first_question, awarded_marks=Decimal('3')).count(), 6)
+        self.assertEqual(
+            set(TestAttempt.objects.filter(test=self.test).values_list('total_awarded_marks', flat=True)),
+            {Decimal('3.00')},
+        )
+        self.assertFalse(TestAttempt.objects.filter(test=self.test, reviewed_at__isnull=True).exists())
+        entry = self.attempts[4].gradebook_entry
+        self.assertEqual((entry.total_awarded_marks, entry.reviewed_count, entry.is_fully_reviewed), (Decimal('3.00'), 1, True))
+
+    def test_rejects_whole_batch_when_any_grade_is_invalid(self):
+        response = self._grade([
+            {'attempt': self.attempts[0].id, 'question': self.first_question.id, 'awarded_marks': '2'},
+            {'attempt': self.attempts[1].id, 'question': self.first_question.id, 'awarded_marks': '6'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.data['grades'])
+        self.assertFalse(TestAnswer.objects.filter(reviewed_at__isnull=False).exists())
+
+
+class ChunkedUploadTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload_dir = tempfile.mkdtemp(prefix='tutorlix-chunked-upload-test-')
+        self.media_dir = tempfile.mkdtemp(prefix='tutorlix-media-test-')
+        self.addCleanup(shutil.rmtree, self.upload_dir, True)
+        self.addCleanup(shutil.rmtree, self.media_dir, True)
+        settings_override = override_settings(
+            CHUNKED_UPLOAD_DIR=self.upload_dir,
+            CHUNKED_UPLOAD_CHUNK_SIZE=4,
+            MEDIA_ROOT=self.media_dir,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.attempt.status = 'in_progress'
+        self.attempt.save(update_fields=['status'])
+        self.content = b'0123456789'
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def _put_chunk(self, upload_id, index, data, digest=None):
+        return self.client.generic(
+            'PUT',
+            f'/api/lms/uploads/{upload_id}/chunks/{index}/',
+            data,
+            content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=digest or hashlib.sha256(data).hexdigest(),
+        )
+
+    def test_resumes_and_attaches_file_to_answer(self):
+        response = self.client.post('/api/lms/uploads/', {
+            'purpose': 'test_answer',
+            'target': {'attempt': self.attempt.id, 'question': self.first_question.id},
+            'filename': 'answer.txt',
+            'total_size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        upload_id = response.data['id']
+        self.assertEqual(response.data['total_chunks'], 3)
+
+        self.assertEqual(self._put_chunk(upload_id, 0, b'0123').status_code, 200)
+        self.assertEqual(self._put_chunk(upload_id, 2, b'89').status_code, 200)
+        rejected = self._put_chunk(upload_id, 1, b'4567', digest='0' * 64)
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(self._put_chunk(upload_id, 1, b'45678').status_code, 400)
+
+        status_response = self.client.get(f'/api/lms/uploads/{upload_id}/')
+        self.assertEqual(status_response.data['received_chunks'], [0, 2])
+        self.assertEqual(self.client.post(f'/api/lms/uploads/{upload_id}/complete/').status_code, 400)
+
+        self.assertEqual(self._put_chunk(upload_id, 1, b'4567').status_code, 200)
+        response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['status'], 'completed')
+        answer = TestAnswer.objects.get(attempt=self.attempt, question=self.first_question)
+        with answer.uploaded_file.open('rb') as uploaded_file:
+            self.assertEqual(uploaded_file.read(), self.content)
+
+    def test_workers_purge_expired_uploads(self):
+        response = self.client.post('/api/lms/uploads/', {
+            'purpose': 'test_answer',
+            'target': {'attempt': self.attempt.id, 'question': self.first_question.id},
+            'filename': 'answer.txt',
+            'total_size': 4,
+        }, format='json')
+        upload_id = response.data['id']
+        self.assertEqual(self._put_chunk(upload_id, 0, b'0123').status_code, 200)
+        ChunkedUpload.objects.filter(pk=upload_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertIn('purge_chunked_uploads', background_jobs.enqueue_periodic_jobs())
+        background_jobs.run_worker('worker-1', once=True)
+
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload_id).status, 'aborted')
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_attempt_submitted_during_assembly_gets_no_file(self):
+        response = self.client.post('/api/lms/uploads/', {
+            'purpose': 'test_answer',
+            'target': {'attempt': self.attempt.id, 'question': self.first_question.id},
+            'filename': 'answer.txt',
+            'total_size': 4,
+        }, format='json')
+        upload_id = response.data['id']
+        self.assertEqual(self._put_chunk(upload_id, 0, b'0123').status_code, 200)
+
+        def assemble_then_submit(upload):
+            TestAttempt.objects.filter(pk=self.attempt.pk).update(status='submitted')
+            return assemble_upload(upload)
+
+        with mock.patch.object(upload_views, 'assemble_upload', side_effect=assemble_then_submit):
+            response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertFalse(TestAnswer.objects.filter(attempt=self.attempt, question=self.first_question).exists())
+
+    def test_note_attachment_upload_checks_ownership_and_creates_attachment(self):
+        note = Note.objects.create(title='Loops', creator=self.teacher)
+        payload = {
+            'purpose': 'note_attachment',
+            'target': {'note': note.id},
+            'filename': 'loops.pdf',
+            'total_size': len(self.content),
+        }
+        self.assertEqual(self.client.post('/api/lms/uploads/', payload, format='json').status_code, 403)
+
+        self.client.force_authenticate(self.teacher)
+        for rejected in ({'total_size': 100 * 1024 * 1024 + 1}, {'filename': 'loops.exe'}):
+            response = self.client.post('/api/lms/uploads/', {**payload, **rejected}, format='json')
+            self.assertEqual(response.status_code, 400, response.data)
+        response = self.client.post('/api/lms/uploads/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        upload_id = response.data['id']
+        for index, start in enumerate(range(0, len(self.content), 4)):
+            self.assertEqual(self._put_chunk(upload_id, index, self.content[start:start + 4]).status_code, 200)
+        response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        attachment = note.attachments.get()
+        self.assertEqual((attachment.file_type, attachment.file_name, attachment.file_size), ('pdf', 'loops.pdf', 10))
+        with attachment.file.open('rb') as stored_file:
+            self.assertEqual(stored_file.read(), self.content)
+
+    def test_rejects_upload_to_another_students_attempt(self):
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='pass', role='student')
+        self.client.force_authenticate(other)
+        response = self.client.post('/api/lms/uploads/', {
+            'purpose': 'test_answer',
+            'target': {'attempt': self.attempt.id, 'question': self.first_question.id},
+            'filename': 'answer.txt',
+            'total_size': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class FileServingTests(TestEngineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_dir = tempfile.mkdtemp(prefix='tutorlix-media-test-')
+        self.addCleanup(shutil.rmtree, self.media_dir, True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.first_question.attachment.save('diagram.pdf', ContentFile(b'%PDF-0123456789'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def _attachment_url(self):
+        response = self.client.get(f'/api/lms/test-questions/{self.first_question.id}/')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['attachment_url']
+
+    def test_signed_attachment_url_serves_byte_ranges_without_login(self):
+        url = self._attachment_url()
+        anonymous = APIClient()
+
+        full = anonymous.get(url)
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(b''.join(full.streaming_content), b'%PDF-0123456789')
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+
+        partial = anonymous.get(url, HTTP_RANGE='bytes=5-8')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 5-8/15')
+        self.assertEqual(b''.join(partial.streaming_content), b'0123')
+        self.assertEqual(b''.join(anonymous.get(url, HTTP_RANGE='bytes=-3').streaming_content), b'789')
+        self.assertEqual(anonymous.get(url, HTTP_RANGE='bytes=99-').status_code, 416)
+
+        stale = anonymous.get(url, HTTP_RANGE='bytes=5-8', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(anonymous.get(url.replace('/files/', '/files/x')).status_code, 404)
+
+    def test_offloads_transfer_to_front_proxy(self):
+        url = self._attachment_url()
+        with override_settings(FILE_SERVING_BACKEND='x-accel-redirect', FILE_SERVING_ACCEL_PREFIX='/protected-files/'):
+            response = APIClient().get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-files/media/{self.first_question.attachment.name}')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+class MicrosoftCatalogTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username='admin', email='admin@example.com', password='pass', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _sync(self, items, **payload):
+        response = self.client.post(
+            '/api/lms/microsoft-courses/sync-snapshot/',
+            {'locale': 'en-us', 'items': items, **payload},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_catalog_page_is_filtered_and_ordered_in_the_database(self):
+        self._sync([
+            {'uid': 'azure-fundamentals', 'title': 'Azure Fundamentals', 'levels': ['Beginner'], 'popularity': 0.9},
+            {'uid': 'azure-networking', 'title': 'Azure Networking', 'levels': ['Intermediate'], 'popularity': 0.5},
+            {'uid': 'azure-ai', 'title': 'Azure AI Engineer', 'levels': ['Advanced', 'Intermediate'], 'popularity': 0.7},
+            {'uid': 'power-bi', 'title': 'Power BI', 'levels': ['Beginner'], 'popularity': 1.0},
+        ])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/lms/microsoft-courses/', {'q': 'AZURE', 'pageSize': 2, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 5)
+        self.assertEqual([item['uid'] for item in response.data['items']], ['azure-networking'])
+        self.assertEqual((response.data['total'], response.data['totalPages']), (3, 2))
+        self.assertEqual(response.data['availableLevels'], ['Advanced', 'Beginner', 'Intermediate'])
+        self.assertNotIn('raw_payload', response.data['items'][0])
+
+        response = self.client.get('/api/lms/microsoft-courses/', {'level': 'intermediate'})
+        self.assertEqual([item['uid'] for item in response.data['items']], ['azure-ai', 'azure-networking'])
+
+    def test_snapshot_sync_skips_unchanged_rows_and_deactivates_missing_ones(self):
+        items = [
+            {'uid': 'azure-fundamentals', 'title': 'Azure Fundamentals', 'type': 'modules'},
+            {'uid': 'azure-networking', 'title': 'Azure Networking', 'type': 'modules'},
+            {'uid': 'power-bi', 'title': 'Power BI', 'type': 'modules'},
+        ]
+        summary = self._sync(items, cachedAt='2026-01-01T00:00:00Z')
+        self.assertEqual((summary['created'], summary['updated'], summary['total']), (3, 0, 3))
+        updated_at = dict(MicrosoftCourse.objects.values_list('uid', 'updated_at'))
+
+        items[0]['title'] = 'Azure Fundamentals (2026)'
+        summary = self._sync(items, cachedAt='2026-02-01T00:00:00Z')
+        self.assertEqual((summary['created'], summary['updated'], summary['unchanged']), (0, 1, 2))
+        power_bi = MicrosoftCourse.objects.get(uid='power-bi')
+        self.assertEqual(power_bi.updated_at, updated_at['power-bi'])
+        self.assertEqual(power_bi.synced_at.month, 2)
+        self.assertIn('(2026)', MicrosoftCourse.objects.get(uid='azure-fundamentals').search_text)
+
+        for cached_at in ({}, {'cachedAt': 'yesterday'}, {'cachedAt': '2026-13-01T00:00:00Z'}):
+            response = self.client.post(
+                '/api/lms/microsoft-courses/sync-snapshot/',
+                {'locale': 'en-us', 'items': items[:2], 'fullSnapshot': True, **cached_at},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 400, response.data)
+        summary = self._sync(items[:2], cachedAt='2026-03-01T00:00:00Z', fullSnapshot=True)
+        self.assertEqual((summary['unchanged'], summary['deactivated']), (2, 1))
+        self.assertFalse(MicrosoftCourse.objects.get(uid='power-bi').is_active)
+
+        summary = self._sync(items, cachedAt='2026-04-01T00:00:00Z')
+        self.assertEqual((summary['updated'], summary['unchanged']), (1, 2))
+        self.assertTrue(MicrosoftCourse.objects.get(uid='power-bi').is_active)
+
+
+class FakeImportResponse:
+    def __init__(self, status_code=200, content=b'', content_type='application/pdf', etag=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode('utf-8', 'ignore')
+        self.headers = {'Content-Type': content_type, 'Content-Length': str(len(content))}
+        if etag:
+            self.headers['ETag'] = etag
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} error')
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeImportSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested_urls = []
+        self.not_modified_urls = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requested_urls.append(url)
+        page = self.pages.get(url) or FakeImportResponse(status_code=404)
+        etag = page.headers.get('ETag')
+        if etag and (headers or {}).get('If-None-Match') == etag:
+            self.not_modified_urls.append(url)
+            return FakeImportResponse(status_code=304, content_type='text/html')
+        return page
+
+    def close(self):
+        pass
+
+
+def build_text_pdf(text):
+    """A one-page PDF showing `text`, enough for text extraction."""
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref_offset = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+    return pdf
+
+
+@override_settings(RESOURCE_IMPORT_WORKERS=1, RESOURCE_CRAWL_MIN_DELAY_SECONDS=0)
+class ResourceImportTests(TestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp(prefix='tutorlix-resource-import-test-')
+        self.addCleanup(shutil.rmtree, self.storage_dir, True)
+        for field in (Resource._meta.get_field('file'), ResourcePreview._meta.get_field('image')):
+            storage_patch = mock.patch.object(field, 'storage', FileSystemStorage(self.storage_dir))
+            storage_patch.start()
+            self.addCleanup(storage_patch.stop)
+        backoff_patch = mock.patch.object(resource_views, 'BACKOFF_BASE_SECONDS', 0)
+        backoff_patch.start()
+        self.addCleanup(backoff_patch.stop)
+        ApprovedResourceDomain.objects.create(domain='example.com')
+        cache.clear()
+
+    def _run(self, pages, **job_fields):
+        job = ResourceImportJob.objects.create(
+            source_url='https://example.com/papers/',
+            subject='Maths',
+            curriculum='CBSE',
+            grade_or_course='10',
+            topic='Algebra',
+            **job_fields,
+        )
+        session = FakeImportSession(pages)
+        with mock.patch.object(resource_views, 'build_import_session', return_value=session):
+            resource_views.run_resource_import_job(job.id)
+        job.refresh_from_db()
+        return job, session
+
+    def test_folder_body_is_read_while_holding_the_host_slot(self):
+        folder_url = 'https://docs.example.com/folder/'
+        limiter = resource_views.HostConcurrencyLimiter(1)
+        slot_free_while_reading = []
+
+        class SlowFolderResponse(FakeImportResponse):
+            @property
+            def text(self):
+                semaphore = limiter.for_url(folder_url)
+                slot_free_while_reading.append(semaphore.acquire(blocking=False))
+                return self.content.decode('utf-8')
+
+            @text.setter
+            def text(self, value):
+                pass
+
+        page = SlowFolderResponse(content=b'<a href="guide.pdf">Guide</a>', content_type='text/html')
+        result = resource_views.crawl_folder(
+            folder_url,
+            None,
+            ['docs.example.com'],
+            session=FakeImportSession({folder_url: page}),
+            host_limiter=limiter,
+        )
+
+        self.assertEqual(slot_free_while_reading, [False])
+        self.assertEqual([link['url'] for link in result['pdf_links']], ['https://docs.example.com/folder/guide.pdf'])
+
+    def test_folder_import_counts_each_outcome(self):
+        Resource.objects.create(
+            title='Existing', subject='Maths', curriculum='CBSE', grade_or_course='10', topic='Algebra',
+            resource_type='pdf', source_url='https://example.com/papers/old.pdf', file='resources/old.pdf',
+        )
+        folder = b'<a href="a.pdf">A</a><a href="b.pdf">B</a><a href="old.pdf">Old</a><a href="missing.pdf">Missing</a>'
+        job, session = self._run({
+            'https://example.com/papers/': FakeImportResponse(content=folder, content_type='text/html'),
+            'https://example.com/papers/a.pdf': FakeImportResponse(content=b'%PDF-a'),
+            'https://example.com/papers/b.pdf': FakeImportResponse(content=b'%PDF-b'),
+        })
+
+        log = ' '.join(job.log_entries.values_list('message', flat=True))
+        self.assertEqual(job.status, 'completed', log)
+        self.assertEqual((job.progress_current, job.progress_total, job.created_resources_count), (4, 4, 2))
+        self.assertIn('imported=2, duplicates_skipped=1, oversized_skipped=0, failed_url_skipped=1', log)
+        self.assertEqual(session.requested_urls.count('https://example.com/papers/missing.pdf'), resource_views.PDF_RETRY_ATTEMPTS)
+        self.assertFalse(Resource.objects.filter(source_url='https://example.com/papers/missing.pdf').exists())
+
+    def test_job_aborted_while_queued_is_not_started(self):
+        job, session = self._run({}, status='aborted')
+
+        self.assertEqual(job.status, 'aborted')
+        self.assertEqual(session.requested_urls, [])
+
+    def test_retry_downloads_pdfs_left_without_a_file_by_a_killed_attempt(self):
+        interrupted_at = timezone.now() - timedelta(minutes=5)
+        Resource.objects.create(
+            title='a.pdf', subject='Maths', curriculum='CBSE', grade_or_course='10', topic='Algebra',
+            resource_type='pdf', source_url='https://example.com/papers/a.pdf', imported_at=interrupted_at,
+        )
+        job, session = self._run({
+            'https://example.com/papers/': FakeImportResponse(content=b'<a href="a.pdf">A</a>', content_type='text/html'),
+            'https://example.com/papers/a.pdf': FakeImportResponse(content=b'%PDF-a'),
+        }, status='running', started_at=interrupted_at)
+
+        self.assertEqual((job.status, job.created_resources_count), ('completed', 1))
+        self.assertIn('https://example.com/papers/a.pdf', session.requested_urls)
+        resource = Resource.objects.get(source_url='https://example.com/papers/a.pdf')
+        self.assertTrue(resource.file)
+
+    def test_reimport_revalidates_unchanged_folders(self):
+        pages = {
+            'https://example.com/papers/': FakeImportResponse(
+                content=b'<a href="2023/">2023</a><a href="a.pdf">A</a>', content_type='text/html', etag='"root-1"',
+            ),
+            'https://example.com/papers/2023/': FakeImportResponse(
+                content=b'<a href="b.pdf">B</a>', content_type='text/html', etag='"2023-1"',
+            ),
+            'https://example.com/papers/a.pdf': FakeImportResponse(content=b'%PDF-a'),
+            'https://example.com/papers/2023/b.pdf': FakeImportResponse(content=b'%PDF-b'),
+        }
+        job, _ = self._run(pages)
+        self.assertEqual(job.created_resources_count, 2)
+        self.assertEqual(ResourceCrawlPage.objects.get(url='https://example.com/papers/2023/').etag, '"2023-1"')
+
+        pages['https://example.com/papers/2023/'] = FakeImportResponse(
+            content=b'<a href="b.pdf">B</a><a href="c.pdf">C</a>', content_type='text/html', etag='"2023-2"',
+        )
+        pages['https://example.com/papers/2023/c.pdf'] = FakeImportResponse(content=b'%PDF-c')
+        job, session = self._run(pages)
+
+        self.assertEqual(session.not_modified_urls, ['https://example.com/papers/'])
+        self.assertEqual((job.status, job.progress_total, job.created_resources_count), ('completed', 3, 1))
+        self.assertTrue(Resource.objects.filter(source_url='https://example.com/papers/2023/c.pdf').exists())
+        self.assertNotIn('https://example.com/papers/a.pdf', session.requested_urls)
+
+    def test_identical_pdfs_share_one_stored_file(self):
+        job, _ = self._run({
+            'https://example.com/papers/': FakeImportResponse(
+                content=b'<a href="a.pdf">A</a><a href="copy-of-a.pdf">Copy</a>', content_type='text/html',
+            ),
+            'https://example.com/papers/a.pdf': FakeImportResponse(content=b'%PDF-same'),
+            'https://example.com/papers/copy-of-a.pdf': FakeImportResponse(content=b'%PDF-same'),
+        })
+
+        self.assertEqual(job.created_resources_count, 2)
+        first, second = Resource.objects.order_by('id')
+        self.assertEqual(first.content_hash, hashlib.sha256(b'%PDF-same').hexdigest())
+        self.assertEqual((second.content_hash, second.file.name), (first.content_hash, first.file.name))
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.storage_dir)), 1)
+
+    def test_backfill_hashes_and_links_duplicates(self):
+        storage = Resource._meta.get_field('file').storage
+        names = [storage.save(f'resources/legacy-{index}.pdf', ContentFile(b'%PDF-legacy')) for index in range(2)]
+        for name in names:
+            Resource.objects.create(
+                title=name, subject='Maths', curriculum='CBSE', grade_or_course='10', topic='Algebra',
+                resource_type='pdf', file=name,
+            )
+
+        call_command('backfill_resource_hashes', '--link-duplicates', stdout=io.StringIO())
+
+        self.assertEqual(
+            list(Resource.objects.order_by('id').values_list('file', 'content_hash')),
+            [(names[0], hashlib.sha256(b'%PDF-legacy').hexdigest())] * 2,
+        )
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_imported_pdf_text_is_searchable(self):
+        folder = b'<a href="cells.pdf">Biology notes</a><a href="light.pdf">Plants</a><a href="forces.pdf">Physics</a>'
+        self._run({
+            'https://example.com/papers/': FakeImportResponse(content=folder, content_type='text/html'),
+            'https://example.com/papers/cells.pdf': FakeImportResponse(content=build_text_pdf('Mitochondria power the cell')),
+            'https://example.com/papers/light.pdf': FakeImportResponse(
+                content=build_text_pdf('Photosynthesis in chloroplasts needs light'),
+            ),
+            'https://example.com/papers/forces.pdf': FakeImportResponse(content=build_text_pdf('Newton laws of motion')),
+        })
+        plants = Resource.objects.get(source_url='https://example.com/papers/light.pdf')
+        self.assertEqual(plants.text_index.status, 'indexed')
+        self.assertEqual(BackgroundJob.objects.filter(task='resource_index').count(), 1)
+
+        admin = get_user_model().objects.create_user(username='admin', email='admin@example.com', password='pass', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        results = client.get('/api/lms/resources/', {'q': 'chloroplast'}).data['results']
+        self.assertEqual([row['id'] for row in results], [plants.id])
+        self.assertIn('<mark>chloroplasts</mark>', results[0]['search_snippet'])
+        forces = Resource.objects.get(source_url='https://example.com/papers/forces.pdf')
+        client.patch(f'/api/lms/resources/{forces.id}/', {'title': 'Light and motion'}, format='json')
+        results = client.get('/api/lms/resources/', {'q': 'light'}).data['results']
+        self.assertEqual([row['id'] for row in results], [forces.id, plants.id])
+
+        # Editing metadata re-indexes the title without extracting the PDF again.
+        with mock.patch('lms.resource_search.extract_pdf_text') as extract:
+            client.patch(f'/api/lms/resources/{plants.id}/', {'title': 'Leaf energy'}, format='json')
+        extract.assert_not_called()
+        results = client.get('/api/lms/resources/', {'q': 'leaf photo'}).data['results']
+        self.assertEqual([row['title'] for row in results], ['Leaf energy'])
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True, RESOURCE_PREVIEW_MAX_SIZE=64)
+    def test_previews_are_cached_by_content_hash(self):
+        admin = get_user_model().objects.create_user(username='admin', email='admin@example.com', password='pass', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        photo = io.BytesIO()
+        Image.new('RGB', (640, 320), 'teal').save(photo, 'PNG')
+        metadata = {'subject': 'Maths', 'curriculum': 'CBSE', 'grade_or_course': '10', 'topic': 'Algebra', 'resource_type': 'notes'}
+        for title in ('Board photo', 'Board photo copy'):
+            upload = ContentFile(photo.getvalue(), name='board.png')
+            response = client.post('/api/lms/resources/', {**metadata, 'title': title, 'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, 201, response.data)
+
+        self.assertEqual(ResourcePreview.objects.get().status, 'ready')
+        results = client.get('/api/lms/resources/').data['results']
+        self.assertEqual(len({row['preview_url'] for row in results}), 1)
+
+        preview = APIClient().get(results[0]['preview_url'])
+        self.assertEqual(preview.status_code, 200)
+        self.assertEqual(preview['Content-Type'], 'image/webp')
+        self.assertIn('immutable', preview['Cache-Control'])
+        self.assertEqual(Image.open(io.BytesIO(b''.join(preview.streaming_content))).size, (64, 32))
+        self.assertEqual(APIClient().get(results[0]['preview_url'].replace('/resource-previews/', '/resource-previews/0')).status_code, 404)
+
+        # Without pdftoppm, a PDF with no embedded images has nothing to show.
+        with mock.patch('lms.resource_previews.subprocess.run', side_effect=FileNotFoundError):
+            response = client.post('/api/lms/resources/', {
+                **metadata, 'title': 'Notes', 'file': ContentFile(build_text_pdf('Only text'), name='notes.pdf'),
+            }, format='multipart')
+        self.assertIsNone(response.data['preview_url'])
+        self.assertEqual(ResourcePreview.objects.filter(status='unavailable').count(), 1)
+
+    def test_log_tail_pages_and_cached_abort_flag(self):
+        admin = get_user_model().objects.create_user(username='admin', email='admin@example.com', password='pass', role='admin')
+        job = ResourceImportJob.objects.create(
+            source_url='https://example.com/papers/', subject='Maths', curriculum='CBSE', grade_or_course='10', topic='Algebra',
+        )
+        for index in range(5):
+            resource_views.append_job_log(job.id, f'line {index}')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        tail = client.get(f'/api/lms/resource-import-jobs/{job.id}/logs/', {'limit': 2}).data
+        self.assertEqual([entry['line'][-6:] for entry in tail['results']], ['line 3', 'line 4'])
+        self.assertTrue(tail['has_more'])
+        resource_views.append_job_log(job.id, 'line 5')
+        newer = client.get(f'/api/lms/resource-import-jobs/{job.id}/logs/', {'after': tail['last_id']}).data
+        self.assertEqual([entry['line'][-6:] for entry in newer['results']], ['line 5'])
+
+        job.status = 'running'
+        job.save(update_fields=['status'])
+        self.assertEqual(client.post(f'/api/lms/resource-import-jobs/{job.id}/abort/').status_code, 200)
+        with self.assertNumQueries(0):
+            with self.assertRaises(resource_views.ImportAbortedError):
+                resource_views.ensure_job_not_aborted(job.id)
+
+    def test_download_streams_to_storage_and_enforces_size_while_reading(self):
+        resource = Resource.objects.create(
+            title='Paper', subject='Maths', curriculum='CBSE', grade_or_course='10', topic='Algebra', resource_type='pdf',
+        )
+        content = b'%PDF-' + b'x' * 200000
+        session = FakeImportSession({'https://example.com/paper.pdf': FakeImportResponse(content=content)})
+
+        digest = resource_views.download_pdf_to_resource(resource, 'https://example.com/paper.pdf', session=session)
+
+        self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+        with resource.file.open('rb') as stored_file:
+            self.assertEqual(stored_file.read(), content)
+
+        oversized = FakeImportResponse(content=content)
+        del oversized.headers['Content-Length']
+        session.pages['https://example.com/big.pdf'] = oversized
+        with mock.patch.object(resource_views, 'MAX_IMPORTED_PDF_SIZE', 100000):
+            with self.assertRaises(resource_views.PdfTooLargeError):
+                resource_views.download_pdf_to_resource(resource, 'https://example.com/big.pdf', session=session)
+
+    def test_parallel_downloads_respect_per_host_limit(self):
+        active = {}
+        peak = {}
+        lock = threading.Lock()
+
+        def fake_import_pdf(job, pdf, position, total, *, session, host_limiter, abort_event):
+            host = pdf['url'].split('/')[2]
+            with host_limiter.for_url(pdf['url']):
+                with lock:
+                    active[host] = active.get(host, 0) + 1
+                    peak[host] = max(peak.get(host, 0), active[host])
+                time.sleep(0.02)
+                with lock:
+                    active[host] -= 1
+            return 'imported', None
+
+        progress = mock.Mock()
+        pdf_links = [{'url': f'https://{host}/{index}.pdf', 'title': ''} for host in ['a.test', 'b.test'] for index in range(6)]
+        with override_settings(RESOURCE_IMPORT_WORKERS=6, RESOURCE_IMPORT_MAX_PER_HOST=2), \
+                mock.patch.object(resource_views, 'import_pdf', side_effect=fake_import_pdf):
+            resource_views.import_pdfs(mock.Mock(), pdf_links, progress, session=None, abort_event=threading.Event())
+
+        self.assertEqual(progress.record.call_count, 12)
+        self.assertEqual(peak, {'a.test': 2, 'b.test': 2})
+
+
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        background_jobs.register_task('test_record')(lambda payload: self.calls.append(payload['name']) or len(self.calls))
+        background_jobs.register_task('test_fail')(self._fail)
+        self.addCleanup(background_jobs._tasks.pop, 'test_record', None)
+        self.addCleanup(background_jobs._tasks.pop, 'test_fail', None)
+
+    def _fail(self, payload):
+        raise RuntimeError('boom')
+
+    def test_worker_runs_jobs_by_priority_then_age(self):
+        low = background_jobs.enqueue('test_record', {'name': 'low'}, priority=background_jobs.PRIORITY_LOW)
+        first = background_jobs.enqueue('test_record', {'name': 'first'})
+        background_jobs.enqueue('test_record', {'name': 'high'}, priority=background_jobs.PRIORITY_HIGH)
+        background_jobs.enqueue('test_record', {'name': 'later'}, run_after=timezone.now() + timedelta(hours=1))
+        background_jobs.enqueue('test_record', {'name': 'second'})
+
+        processed = background_jobs.run_worker('worker-1', once=True)
+
+        self.assertEqual(processed, 4)
+        self.assertEqual(self.calls, ['high', 'first', 'second', 'low'])
+        first.refresh_from_db()
+        low.refresh_from_db()
+        self.assertEqual((first.status, first.result, first.attempts), ('completed', 2, 1))
+        self.assertEqual(low.result, 4)
+
+    def test_failures_retry_with_backoff_and_stale_leases_are_recovered(self):
+        job = background_jobs.enqueue('test_fail', max_attempts=2)
+        claimed = background_jobs.claim_next_job('worker-1')
+        self.assertIsNone(background_jobs.claim_job(job.id, 'worker-2'))
+        with self.assertLogs('lms.background_jobs', level='ERROR'):
+            background_jobs.run_job(claimed, heartbeat=False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, 'boom'))
+        self.assertGreater(job.run_after, timezone.now())
+
+        BackgroundJob.objects.filter(pk=job.id).update(run_after=timezone.now())
+        self.assertIsNotNone(background_jobs.claim_next_job('worker-1'))
+        BackgroundJob.objects.filter(pk=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('lms.background_jobs', level='WARNING'):
+            self.assertEqual(background_jobs.recover_stale_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+        crashed = background_jobs.enqueue('test_record', {'name': 'crashed'})
+        background_jobs.claim_job(crashed.id, 'worker-1')
+        BackgroundJob.objects.filter(pk=crashed.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('lms.background_jobs', level='WARNING'):
+            self.assertEqual(background_jobs.recover_stale_jobs(), (1, 0))
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.locked_by), ('queued', ''))
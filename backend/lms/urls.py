@@ -35,6 +35,8 @@ router.register(r'forum-notifications', views.ForumNotificationViewSet, basename
 router.register(r'resources', views.ResourceViewSet, basename='resource')
 router.register(r'approved-resource-domains', views.ApprovedResourceDomainViewSet, basename='approved-resource-domain')
 router.register(r'resource-import-jobs', views.ResourceImportJobViewSet, basename='resource-import-job')
+router.register(r'uploads', views.ChunkedUploadViewSet, basename='chunked-upload')
+router.register(r'background-jobs', views.BackgroundJobViewSet, basename='background-job')
 router.register(r'microsoft-courses', views.MicrosoftCourseViewSet, basename='microsoft-course')
 
 # 🎬 VIDEO RENDERING (ADMIN ONLY)
@@ -52,6 +54,11 @@ urlpatterns = [
         views.LiveClassParticipantRemoveView.as_view(),
         name='live-class-remove-participant',
     ),
+    path(
+        'code-executions/<str:job_id>/',
+        views.CodeExecutionJobView.as_view(),
+        name='code-execution-job',
+    ),
     path(
         'ai-tutor/courses/',
         views.AITutorCourseListView.as_view(),
@@ -67,6 +74,16 @@ urlpatterns = [
         views.AITutorCodeReviewView.as_view(),
         name='ai-tutor-code-review',
     ),
+    path(
+        'files/<str:token>/',
+        views.SignedFileView.as_view(),
+        name='signed-file',
+    ),
+    path(
+        'resource-previews/<str:token>/',
+        views.ResourcePreviewView.as_view(),
+        name='resource-preview',
+    ),
     re_path(
         r'^webhook/payment-status/?$',
         views.RazorpayWebhookView.as_view(),
@@ -13,3 +13,6 @@ from .test_views import *
 from .resource_views import *
 from .microsoft_views import *
 from .livekit_views import *
+from .upload_views import *
+from .background_job_views import *
+from .file_views import *
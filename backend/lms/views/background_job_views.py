@@ -0,0 +1,20 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from lms.models import BackgroundJob
+from lms.serializers import BackgroundJobSerializer
+
+
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued work (imports, renders, plagiarism checks) for polling clients."""
+    serializer_class = BackgroundJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['task', 'status']
+
+    def get_queryset(self):
+        queryset = BackgroundJob.objects.all()
+        if self.request.user.role == 'admin':
+            return queryset
+        return queryset.filter(created_by=self.request.user)
@@ -0,0 +1,37 @@
+from django.http import Http404
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+from lms.file_serving import resolve_signed_file, serve_file
+from lms.resource_previews import resolve_preview_token
+
+
+class SignedFileView(APIView):
+    """
+    Serves a file from a URL issued by lms.file_serving.signed_file_url. The
+    signature stands in for authentication, so the link works in <img>, <a>
+    and PDF viewers that cannot send the JWT.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, token):
+        field_file, filename = resolve_signed_file(token)
+        return serve_file(request, field_file, filename=filename)
+
+
+class ResourcePreviewView(APIView):
+    """
+    Preview image of a resource file. The URL is derived from the content
+    hash, so the response never changes and browsers may keep it for a year.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, token):
+        preview = resolve_preview_token(token)
+        if preview is None:
+            raise Http404('Preview not found.')
+        response = serve_file(request, preview.image)
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
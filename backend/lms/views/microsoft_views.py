@@ -1,7 +1,9 @@
 import hashlib
+import json
 from datetime import datetime
 
 from django.conf import settings
+from django.db.models import Count, F, Max
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from rest_framework import status, viewsets
@@ -11,11 +13,24 @@ from rest_framework.response import Response
 
 from lms.models import MicrosoftCourse
 from lms.permissions import IsAdminOrReadOnly
-from lms.serializers import MicrosoftCourseSerializer
+from lms.serializers import MicrosoftCourseListSerializer, MicrosoftCourseSerializer
 
 
 ALLOWED_TYPES = ['modules', 'learningPaths', 'courses', 'certifications', 'appliedSkills']
 DEFAULT_ALL_TYPES = ['learningPaths', 'modules', 'courses']
+# Columns read for a catalog page: everything MicrosoftCourseListSerializer shows.
+MICROSOFT_COURSE_LIST_FIELDS = [
+    'id', 'uid', 'slug', 'title', 'summary', 'subtitle', 'url', 'icon_url', 'social_image_url',
+    'duration_in_minutes', 'levels', 'roles', 'products', 'subjects', 'learning_objectives',
+    'prerequisites', 'last_modified', 'course_type', 'type_label', 'popularity', 'locale',
+    'source_url', 'scraped', 'scraped_duration_label', 'is_active', 'synced_at', 'created_at', 'updated_at',
+]
+# Rows written per INSERT ... ON CONFLICT statement, and keys per IN (...) lookup,
+# kept under SQLite's bound-parameter limit.
+CATALOG_UPSERT_BATCH_SIZE = 200
+CATALOG_LOOKUP_BATCH_SIZE = 900
+# Normalized fields that change on every sync and so are left out of content_hash.
+CATALOG_VOLATILE_FIELDS = {'is_active', 'synced_at'}
 TYPE_LABELS = {
     'modules': 'Module',
     'learningPaths': 'Learning Path',
@@ -68,7 +83,10 @@ def parse_catalog_datetime(value):
     if isinstance(value, datetime):
         parsed = value
     elif value:
-        parsed = parse_datetime(str(value))
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:
+            parsed = None
     else:
         parsed = None
 
@@ -77,32 +95,6 @@ def parse_catalog_datetime(value):
     return parsed
 
 
-def build_search_haystack(course):
-    return ' '.join([
-        course.title or '',
-        course.summary or '',
-        course.subtitle or '',
-        course.uid or '',
-        course.url or '',
-        course.type_label or '',
-        *as_string_list(course.levels),
-        *as_string_list(course.roles),
-        *as_string_list(course.products),
-        *as_string_list(course.subjects),
-    ]).lower()
-
-
-def course_matches_level(course, level):
-    if not level:
-        return True
-    return any(item.lower() == level for item in as_string_list(course.levels))
-
-
-def catalog_sort_key(course):
-    last_modified_ts = course.last_modified.timestamp() if course.last_modified else 0
-    return (course.popularity or 0, last_modified_ts)
-
-
 def build_source_key(item, locale, course_type):
     explicit_key = (
         as_string(item.get('uid'))
@@ -156,6 +148,88 @@ def normalize_course_item(item, *, default_locale, source, scraped, synced_at):
     }
 
 
+def catalog_content_hash(normalized):
+    content = {key: value for key, value in normalized.items() if key not in CATALOG_VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def existing_catalog_state(source_key_hashes):
+    """{source_key_hash: (content_hash, is_active)} for the rows already stored."""
+    state = {}
+    for start in range(0, len(source_key_hashes), CATALOG_LOOKUP_BATCH_SIZE):
+        rows = MicrosoftCourse.objects.filter(
+            source_key_hash__in=source_key_hashes[start:start + CATALOG_LOOKUP_BATCH_SIZE],
+        ).values_list('source_key_hash', 'content_hash', 'is_active')
+        state.update((key, (content_hash, is_active)) for key, content_hash, is_active in rows)
+    return state
+
+
+def upsert_catalog_items(normalized_items, *, synced_at, full_snapshot=False):
+    """
+    Store normalized catalog items, writing only rows that are new, changed or
+    were deactivated. Unchanged rows just have synced_at moved forward.
+
+    With full_snapshot, active rows of the snapshot's locales and types that
+    were not synced at this snapshot's synced_at are deactivated. Batches of
+    one snapshot share its cachedAt, so only the last batch needs the flag.
+    """
+    by_key = {}
+    for normalized in normalized_items:
+        normalized['content_hash'] = catalog_content_hash(normalized)
+        by_key[normalized['source_key_hash']] = normalized
+
+    existing = existing_catalog_state(list(by_key))
+    changed = []
+    unchanged_keys = []
+    created_count = 0
+    for key, normalized in by_key.items():
+        if key not in existing:
+            created_count += 1
+        elif existing[key] == (normalized['content_hash'], True):
+            unchanged_keys.append(key)
+            continue
+        course = MicrosoftCourse(**normalized)
+        course.refresh_search_fields()
+        changed.append(course)
+
+    update_fields = [
+        field.name for field in MicrosoftCourse._meta.concrete_fields
+        if field.name not in ('id', 'source_key_hash', 'created_at')
+    ]
+    for start in range(0, len(changed), CATALOG_UPSERT_BATCH_SIZE):
+        MicrosoftCourse.objects.bulk_create(
+            changed[start:start + CATALOG_UPSERT_BATCH_SIZE],
+            update_conflicts=True,
+            unique_fields=['source_key_hash'],
+            update_fields=update_fields,
+        )
+    for start in range(0, len(unchanged_keys), CATALOG_LOOKUP_BATCH_SIZE):
+        MicrosoftCourse.objects.filter(
+            source_key_hash__in=unchanged_keys[start:start + CATALOG_LOOKUP_BATCH_SIZE],
+        ).update(synced_at=synced_at)
+
+    deactivated_count = 0
+    if full_snapshot and by_key:
+        deactivated_count = (
+            MicrosoftCourse.objects.filter(
+                is_active=True,
+                locale__in={normalized['locale'] for normalized in by_key.values()},
+                course_type__in={normalized['course_type'] for normalized in by_key.values()},
+            )
+            .exclude(synced_at=synced_at)
+            .update(is_active=False, updated_at=timezone.now())
+        )
+
+    return {
+        'created': created_count,
+        'updated': len(changed) - created_count,
+        'unchanged': len(unchanged_keys),
+        'deactivated': deactivated_count,
+        'total': len(by_key),
+    }
+
+
 def sync_token_allowed(request):
     configured_token = getattr(settings, 'MICROSOFT_CATALOG_SYNC_TOKEN', '')
     provided_token = (
@@ -204,28 +278,33 @@ class MicrosoftCourseViewSet(viewsets.ReadOnlyModelViewSet):
 
         base_queryset = self.get_queryset().filter(locale=locale, course_type__in=effective_types)
         stored_count = base_queryset.count()
-        courses = list(base_queryset)
 
+        courses = base_queryset
         if q:
-            courses = [course for course in courses if q in build_search_haystack(course)]
+            courses = courses.filter(search_text__contains=q)
         if level:
-            courses = [course for course in courses if course_matches_level(course, level)]
+            courses = courses.filter(level_keys__contains=f'|{level}|')
 
-        courses.sort(key=catalog_sort_key, reverse=True)
-        total = len(courses)
+        summary = courses.aggregate(total=Count('id'), latest_sync=Max('synced_at'))
+        total = summary['total']
         total_pages = max(1, (total + page_size - 1) // page_size)
         current_page = min(page, total_pages)
         start_index = (current_page - 1) * page_size
-        page_items = courses[start_index:start_index + page_size]
+        page_items = (
+            courses.only(*MICROSOFT_COURSE_LIST_FIELDS)
+            .order_by(F('popularity').desc(), F('last_modified').desc(nulls_last=True), 'title', 'id')
+            [start_index:start_index + page_size]
+        )
 
+        # Few distinct level combinations exist, so they are read with DISTINCT and merged here.
         available_levels = sorted({
             item
-            for course in courses
-            for item in as_string_list(course.levels)
+            for levels in courses.order_by().values_list('levels', flat=True).distinct()
+            for item in as_string_list(levels)
         })
-        latest_sync = max((course.synced_at for course in courses if course.synced_at), default=None)
+        latest_sync = summary['latest_sync']
 
-        serializer = self.get_serializer(page_items, many=True)
+        serializer = MicrosoftCourseListSerializer(page_items, many=True, context=self.get_serializer_context())
         return Response({
             'items': serializer.data,
             'total': total,
@@ -256,34 +335,34 @@ class MicrosoftCourseViewSet(viewsets.ReadOnlyModelViewSet):
         default_locale = as_string(payload.get('locale'), 'en-us').lower()
         source = as_string(payload.get('source'))
         scraped = bool(payload.get('scraped', False))
-        synced_at = parse_catalog_datetime(payload.get('cachedAt')) or timezone.now()
-
-        created_count = 0
-        updated_count = 0
+        full_snapshot = bool(payload.get('fullSnapshot', False))
+        cached_at = parse_catalog_datetime(payload.get('cachedAt'))
+        if full_snapshot and cached_at is None:
+            # Batches of one snapshot are matched by their shared cachedAt when deactivating missing rows.
+            return Response(
+                {'cachedAt': ['A valid cachedAt is required for a full snapshot.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        synced_at = cached_at or timezone.now()
 
-        for item in items:
-            if not isinstance(item, dict):
-                continue
-            defaults = normalize_course_item(
+        normalized_items = [
+            normalize_course_item(
                 item,
                 default_locale=default_locale,
                 source=source,
                 scraped=scraped,
                 synced_at=synced_at,
             )
-            source_key_hash = defaults.pop('source_key_hash')
-            _, created = MicrosoftCourse.objects.update_or_create(
-                source_key_hash=source_key_hash,
-                defaults=defaults,
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+            for item in items
+            if isinstance(item, dict)
+        ]
+        summary = upsert_catalog_items(
+            normalized_items,
+            synced_at=synced_at,
+            full_snapshot=full_snapshot,
+        )
 
         return Response({
-            'created': created_count,
-            'updated': updated_count,
-            'total': created_count + updated_count,
+            **summary,
             'syncedAt': synced_at.isoformat(),
         }, status=status.HTTP_200_OK)
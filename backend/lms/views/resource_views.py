@@ -1,13 +1,21 @@
+import hashlib
 import os
+import random
+import tempfile
 import threading
 import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from html.parser import HTMLParser
 from urllib.parse import urljoin, urlparse
 
 import requests
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import File
 from django.db import close_old_connections
-from django.http import FileResponse, Http404
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, serializers, status, viewsets
@@ -15,8 +23,20 @@ from rest_framework.decorators import action
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 
-from lms.models import ApprovedResourceDomain, Resource, ResourceImportJob
+from lms.background_jobs import PRIORITY_HIGH, enqueue
+from lms.file_serving import serve_file
+from lms.models import (
+    ApprovedResourceDomain,
+    Resource,
+    ResourceCrawlPage,
+    ResourceImportJob,
+    ResourceImportLogLine,
+    ResourcePreview,
+)
 from lms.permissions import IsAdmin, IsAdminOrTeacher
+from lms.resource_files import attach_resource_file
+from lms.resource_previews import queue_resource_previews
+from lms.resource_search import queue_resource_indexing, remove_from_index, search_resources, search_snippets
 from lms.serializers import (
     ApprovedResourceDomainSerializer,
     ResourceImportJobSerializer,
@@ -26,11 +46,23 @@ from lms.serializers import (
 IMPORT_USER_AGENT = 'TutorlixResourceImporter/1.0'
 MAX_IMPORTED_PDF_SIZE = 50 * 1024 * 1024
 MAX_IMPORTED_PDF_SIZE_MB = MAX_IMPORTED_PDF_SIZE // (1024 * 1024)
+# Downloads are spooled to disk past this size, so memory per download stays flat.
+IMPORT_SPOOL_MAX_MEMORY_SIZE = 1024 * 1024
+IMPORT_CHUNK_SIZE = 64 * 1024
 HTTP_RETRY_ATTEMPTS = 20
 PDF_RETRY_ATTEMPTS = 20
 BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 60
 MAX_FOLDER_DEPTH = 5
 MAX_FOLDER_PAGES = 100
+ABORT_DB_CHECK_SECONDS = 5
+ABORT_FLAG_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_LOG_PAGE_SIZE = 200
+MAX_LOG_PAGE_SIZE = 1000
+# Stays under SQLite's bound-parameter limit.
+SOURCE_URL_BATCH_SIZE = 900
+# Imported resources per text-indexing / preview background job.
+FOLLOW_UP_JOB_BATCH_SIZE = 100
 
 
 class ImportAbortedError(Exception):
@@ -67,11 +99,7 @@ class BasicPageParser(HTMLParser):
 
 
 def append_job_log(job_id, message):
-    job = ResourceImportJob.objects.only('id', 'log_lines').get(pk=job_id)
-    log_lines = list(job.log_lines or [])
-    timestamp = timezone.now().strftime('%H:%M:%S')
-    log_lines.append(f'[{timestamp}] {message}')
-    ResourceImportJob.objects.filter(pk=job_id).update(log_lines=log_lines, updated_at=timezone.now())
+    ResourceImportLogLine.objects.create(job_id=job_id, message=message)
 
 
 def update_job(job_id, **updates):
@@ -83,11 +111,42 @@ def get_job_status(job_id):
     return ResourceImportJob.objects.values_list('status', flat=True).get(pk=job_id)
 
 
+def _abort_cache_key(job_id):
+    return f'resource-import:aborted:{job_id}'
+
+
+_abort_checked_at = {}
+_abort_checked_at_lock = threading.Lock()
+
+
+def mark_job_aborted(job_id):
+    cache.set(_abort_cache_key(job_id), True, ABORT_FLAG_TTL_SECONDS)
+
+
 def ensure_job_not_aborted(job_id):
+    """
+    The abort view sets a cache flag, so the check before every step is a cache
+    read. The database is still consulted every ABORT_DB_CHECK_SECONDS in case
+    the flag was lost (cache restart, per-process cache).
+    """
+    if cache.get(_abort_cache_key(job_id)):
+        raise ImportAbortedError('Import aborted by admin.')
+
+    now = time.monotonic()
+    with _abort_checked_at_lock:
+        if now - _abort_checked_at.get(job_id, 0) < ABORT_DB_CHECK_SECONDS:
+            return
+        _abort_checked_at[job_id] = now
     if get_job_status(job_id) == 'aborted':
+        mark_job_aborted(job_id)
         raise ImportAbortedError('Import aborted by admin.')
 
 
+def forget_abort_checks(job_id):
+    with _abort_checked_at_lock:
+        _abort_checked_at.pop(job_id, None)
+
+
 def is_allowed_domain(hostname, approved_domains):
     hostname = (hostname or '').lower()
     for domain in approved_domains:
@@ -104,16 +163,40 @@ def build_import_filename(resource_id, pdf_url):
     return filename
 
 
-def fetch_with_retry(url, *, stream=False, attempts=HTTP_RETRY_ATTEMPTS, timeout=(10, 90)):
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter, so retries from parallel downloads spread out."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def build_import_session(pool_size=10):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = IMPORT_USER_AGENT
+    return session
+
+
+def fetch_with_retry(
+    url,
+    *,
+    stream=False,
+    attempts=HTTP_RETRY_ATTEMPTS,
+    timeout=(10, 90),
+    session=None,
+    abort_event=None,
+    headers=None,
+):
     last_error = None
+    client = session or requests
 
     for attempt in range(1, attempts + 1):
         try:
-            response = requests.get(
+            response = client.get(
                 url,
                 stream=stream,
                 timeout=timeout,
-                headers={'User-Agent': IMPORT_USER_AGENT},
+                headers={'User-Agent': IMPORT_USER_AGENT, **(headers or {})},
             )
             response.raise_for_status()
             return response
@@ -121,49 +204,126 @@ def fetch_with_retry(url, *, stream=False, attempts=HTTP_RETRY_ATTEMPTS, timeout
             last_error = exc
             if attempt == attempts:
                 break
-            time.sleep(BACKOFF_BASE_SECONDS * attempt)
+            if abort_event is None:
+                time.sleep(backoff_delay(attempt))
+            elif abort_event.wait(backoff_delay(attempt)):
+                raise ImportAbortedError('Import aborted by admin.')
 
     raise last_error
 
 
-def download_pdf_to_resource(resource, pdf_url):
+class HostConcurrencyLimiter:
+    """
+    Caps simultaneous requests per host, and optionally spaces out request
+    starts to the same host, so a parallel import does not hammer one server.
+    """
+
+    def __init__(self, max_per_host, min_interval_seconds=0):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval_seconds = max(0, min_interval_seconds)
+        self._semaphores = {}
+        self._next_start = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        hostname = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            semaphore = self._semaphores.get(hostname)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._semaphores[hostname] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url):
+        with self.for_url(url):
+            if self.min_interval_seconds:
+                hostname = (urlparse(url).hostname or '').lower()
+                with self._lock:
+                    now = time.monotonic()
+                    start_at = max(now, self._next_start.get(hostname, now))
+                    self._next_start[hostname] = start_at + self.min_interval_seconds
+                if start_at > now:
+                    time.sleep(start_at - now)
+            yield
+
+
+class ImportProgress:
+    """
+    Counters shared by the download workers. Each finished PDF bumps the counts
+    and writes them under one lock, so the job row never moves backwards.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.counts = {'imported': 0, 'duplicate': 0, 'oversized': 0, 'failed': 0}
+        self.processed = 0
+        self.resource_ids = []
+        self._lock = threading.Lock()
+
+    def record(self, outcome, count=1, resource_id=None):
+        with self._lock:
+            self.counts[outcome] += count
+            self.processed += count
+            if resource_id is not None:
+                self.resource_ids.append(resource_id)
+            update_job(self.job_id, progress_current=self.processed, created_resources_count=self.counts['imported'])
+
+
+def download_pdf_to_resource(resource, pdf_url, *, session=None, abort_event=None):
+    """
+    Stream the PDF into resource.file through a spooled temporary file, enforcing
+    MAX_IMPORTED_PDF_SIZE as bytes arrive. Returns the SHA-256 of the content;
+    a PDF already stored under another URL reuses the existing file.
+    """
     try:
         response = fetch_with_retry(
             pdf_url,
             stream=True,
             attempts=PDF_RETRY_ATTEMPTS,
             timeout=(10, 180),
+            session=session,
+            abort_event=abort_event,
         )
     except requests.RequestException as exc:
         raise PdfImportSkipError(str(exc)) from exc
 
-    content_type = (response.headers.get('Content-Type') or '').lower()
-    if 'application/pdf' not in content_type and not urlparse(pdf_url).path.lower().endswith('.pdf'):
-        raise ValueError('Imported file is not a PDF.')
-
-    content_length = response.headers.get('Content-Length')
-    if content_length:
-        try:
-            if int(content_length) > MAX_IMPORTED_PDF_SIZE:
-                raise PdfTooLargeError(f'PDF exceeds the {MAX_IMPORTED_PDF_SIZE_MB} MB import limit.')
-        except (TypeError, ValueError):
-            pass
+    with response:
+        content_type = (response.headers.get('Content-Type') or '').lower()
+        if 'application/pdf' not in content_type and not urlparse(pdf_url).path.lower().endswith('.pdf'):
+            raise ValueError('Imported file is not a PDF.')
 
-    total_size = 0
-    chunks = []
-    for chunk in response.iter_content(chunk_size=8192):
-        if not chunk:
-            continue
-        total_size += len(chunk)
-        if total_size > MAX_IMPORTED_PDF_SIZE:
-            raise PdfTooLargeError(f'PDF exceeds the {MAX_IMPORTED_PDF_SIZE_MB} MB import limit.')
-        chunks.append(chunk)
-
-    resource.file.save(
-        build_import_filename(resource.id, pdf_url),
-        ContentFile(b''.join(chunks)),
-        save=True,
-    )
+        content_length = response.headers.get('Content-Length')
+        if content_length:
+            try:
+                if int(content_length) > MAX_IMPORTED_PDF_SIZE:
+                    raise PdfTooLargeError(f'PDF exceeds the {MAX_IMPORTED_PDF_SIZE_MB} MB import limit.')
+            except (TypeError, ValueError):
+                pass
+
+        digest = hashlib.sha256()
+        total_size = 0
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_MEMORY_SIZE) as spooled_file:
+            for chunk in response.iter_content(chunk_size=IMPORT_CHUNK_SIZE):
+                if abort_event is not None and abort_event.is_set():
+                    raise ImportAbortedError('Import aborted by admin.')
+                if not chunk:
+                    continue
+                total_size += len(chunk)
+                if total_size > MAX_IMPORTED_PDF_SIZE:
+                    raise PdfTooLargeError(f'PDF exceeds the {MAX_IMPORTED_PDF_SIZE_MB} MB import limit.')
+                digest.update(chunk)
+                spooled_file.write(chunk)
+
+            spooled_file.seek(0)
+            content_hash = digest.hexdigest()
+            attach_resource_file(
+                resource,
+                File(spooled_file),
+                content_hash,
+                filename=build_import_filename(resource.id, pdf_url),
+            )
+        return content_hash
 
 
 def is_probable_folder(url):
@@ -176,101 +336,348 @@ def is_probable_folder(url):
     return '.' not in last_segment
 
 
-def collect_pdf_links(start_url, approved_domains, *, job_id=None):
-    visited_pages = set()
+def _conditional_headers(page):
+    headers = {}
+    if page is not None and page.etag:
+        headers['If-None-Match'] = page.etag
+    if page is not None and page.last_modified:
+        headers['If-Modified-Since'] = page.last_modified
+    return headers
+
+
+def crawl_folder(folder_url, cached_page, approved_domains, *, session=None, host_limiter, abort_event=None):
+    """
+    Fetch one folder page (conditionally when it was seen before) and return
+    its PDF and subfolder links. Runs in crawler threads, so it does not touch
+    the database.
+    """
+    # The slot covers reading the body too: a slow folder page still occupies its host.
+    with host_limiter.slot(folder_url):
+        response = fetch_with_retry(
+            folder_url,
+            stream=True,
+            attempts=HTTP_RETRY_ATTEMPTS,
+            timeout=(10, 90),
+            session=session,
+            abort_event=abort_event,
+            headers=_conditional_headers(cached_page),
+        )
+        with response:
+            if response.status_code == 304 and cached_page is not None:
+                return {
+                    'kind': 'unchanged',
+                    'pdf_links': cached_page.pdf_links,
+                    'folder_links': cached_page.folder_links,
+                    'etag': cached_page.etag,
+                    'last_modified': cached_page.last_modified,
+                }
+
+            content_type = (response.headers.get('Content-Type') or '').lower()
+            parsed_folder = urlparse(folder_url)
+            if 'application/pdf' in content_type or parsed_folder.path.lower().endswith('.pdf'):
+                return {
+                    'kind': 'pdf',
+                    'pdf_links': [{'url': folder_url, 'title': os.path.basename(parsed_folder.path) or 'Imported PDF'}],
+                    'folder_links': [],
+                }
+
+            parser = BasicPageParser()
+            parser.feed(response.text)
+
+    pdf_links = []
+    folder_links = []
+    for link in parser.links:
+        absolute_url = urljoin(folder_url, link['href'])
+        absolute_parsed = urlparse(absolute_url)
+        if not is_allowed_domain(absolute_parsed.hostname, approved_domains):
+            continue
+        if absolute_url == folder_url:
+            continue
+
+        if absolute_parsed.path.lower().endswith('.pdf'):
+            pdf_links.append({
+                'url': absolute_url,
+                'title': link['text'] or os.path.basename(absolute_parsed.path) or 'Imported PDF',
+            })
+        elif is_probable_folder(absolute_url):
+            folder_links.append(absolute_url)
+
+    return {
+        'kind': 'folder',
+        'pdf_links': pdf_links,
+        'folder_links': folder_links,
+        'etag': response.headers.get('ETag') or '',
+        'last_modified': response.headers.get('Last-Modified') or '',
+    }
+
+
+def _save_crawl_pages(results, now):
+    pages = [
+        ResourceCrawlPage(
+            url=url,
+            etag=result['etag'][:255],
+            last_modified=result['last_modified'][:64],
+            pdf_links=result['pdf_links'],
+            folder_links=result['folder_links'],
+            fetched_at=now,
+        )
+        for url, result in results
+        if result['kind'] == 'folder' and (result['etag'] or result['last_modified'])
+    ]
+    if pages:
+        ResourceCrawlPage.objects.bulk_create(
+            pages,
+            update_conflicts=True,
+            unique_fields=['url'],
+            update_fields=['etag', 'last_modified', 'pdf_links', 'folder_links', 'fetched_at', 'updated_at'],
+        )
+
+
+def collect_pdf_links(start_url, approved_domains, *, job_id=None, session=None, abort_event=None):
+    """
+    Breadth-first crawl from start_url. Each depth level is fetched in parallel
+    (RESOURCE_IMPORT_WORKERS threads, RESOURCE_IMPORT_MAX_PER_HOST and
+    RESOURCE_CRAWL_MIN_DELAY_SECONDS per host). Folders seen before are
+    revalidated with If-None-Match / If-Modified-Since; a 304 reuses the stored
+    links without downloading or parsing the page. Subfolders of an unchanged
+    folder are still revalidated, because listing servers do not update a
+    parent's validators when something deeper changes.
+    """
     found_pdfs = []
     seen_pdfs = set()
+    visited_pages = {start_url}
+    host_limiter = HostConcurrencyLimiter(
+        int(getattr(settings, 'RESOURCE_IMPORT_MAX_PER_HOST', 2)),
+        float(getattr(settings, 'RESOURCE_CRAWL_MIN_DELAY_SECONDS', 0)),
+    )
+    max_workers = max(1, int(getattr(settings, 'RESOURCE_IMPORT_WORKERS', 4)))
+    level = [start_url]
+    depth = 0
+    pages_crawled = 0
 
-    def walk_folder(folder_url, depth):
-        if job_id:
-            ensure_job_not_aborted(job_id)
-        if depth > MAX_FOLDER_DEPTH:
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='resource-crawl') as executor:
+        while level:
             if job_id:
-                append_job_log(job_id, f'Skipping deep folder: {folder_url}')
-            return
-        if folder_url in visited_pages or len(visited_pages) >= MAX_FOLDER_PAGES:
-            return
+                ensure_job_not_aborted(job_id)
+            if depth > MAX_FOLDER_DEPTH:
+                if job_id:
+                    for folder_url in level:
+                        append_job_log(job_id, f'Skipping deep folder: {folder_url}')
+                break
+            level = level[:max(0, MAX_FOLDER_PAGES - pages_crawled)]
+            pages_crawled += len(level)
+
+            cached_pages = {page.url: page for page in ResourceCrawlPage.objects.filter(url__in=level)}
+            results = list(zip(level, executor.map(
+                lambda folder_url: crawl_folder(
+                    folder_url,
+                    cached_pages.get(folder_url),
+                    approved_domains,
+                    session=session,
+                    host_limiter=host_limiter,
+                    abort_event=abort_event,
+                ),
+                level,
+            )))
+            _save_crawl_pages(results, timezone.now())
+
+            next_level = []
+            for folder_url, result in results:
+                if job_id:
+                    if result['kind'] == 'unchanged':
+                        append_job_log(job_id, f'Folder unchanged since last import: {folder_url}')
+                    elif result['kind'] == 'folder':
+                        append_job_log(job_id, f'Scanned folder: {folder_url}')
+
+                for pdf in result['pdf_links']:
+                    if pdf['url'] in seen_pdfs:
+                        continue
+                    seen_pdfs.add(pdf['url'])
+                    found_pdfs.append(pdf)
+                    if job_id:
+                        label = 'Found direct PDF' if result['kind'] == 'pdf' else 'Queued PDF'
+                        append_job_log(job_id, f"{label}: {pdf['url']}")
 
-        visited_pages.add(folder_url)
-        if job_id:
-            append_job_log(job_id, f'Scanning folder: {folder_url}')
+                for next_folder in result['folder_links']:
+                    if next_folder not in visited_pages:
+                        visited_pages.add(next_folder)
+                        next_level.append(next_folder)
 
-        response = fetch_with_retry(folder_url, attempts=HTTP_RETRY_ATTEMPTS, timeout=(10, 90))
-        content_type = (response.headers.get('Content-Type') or '').lower()
-        parsed_folder = urlparse(folder_url)
-
-        if 'application/pdf' in content_type or parsed_folder.path.lower().endswith('.pdf'):
-            if folder_url not in seen_pdfs:
-                seen_pdfs.add(folder_url)
-                found_pdfs.append({
-                    'url': folder_url,
-                    'title': os.path.basename(parsed_folder.path) or 'Imported PDF',
-                })
-                if job_id:
-                    append_job_log(job_id, f'Found direct PDF: {folder_url}')
-            return
+            level = next_level
+            depth += 1
 
-        parser = BasicPageParser()
-        parser.feed(response.text)
-
-        pdf_links = []
-        folder_links = []
-
-        for link in parser.links:
-            absolute_url = urljoin(folder_url, link['href'])
-            absolute_parsed = urlparse(absolute_url)
-            if not is_allowed_domain(absolute_parsed.hostname, approved_domains):
-                continue
-            if absolute_url == folder_url:
-                continue
-
-            if absolute_parsed.path.lower().endswith('.pdf'):
-                if absolute_url not in seen_pdfs:
-                    seen_pdfs.add(absolute_url)
-                    pdf_links.append({
-                        'url': absolute_url,
-                        'title': link['text'] or os.path.basename(absolute_parsed.path) or 'Imported PDF',
-                    })
-                    if job_id:
-                        append_job_log(job_id, f'Queued PDF: {absolute_url}')
-                continue
+    return found_pdfs
 
-            if is_probable_folder(absolute_url):
-                folder_links.append(absolute_url)
 
-        found_pdfs.extend(pdf_links)
+def known_source_urls(urls):
+    """
+    Which of urls were imported before, fetched in one query per
+    SOURCE_URL_BATCH_SIZE urls. Rows whose download never finished have no
+    file and do not count.
+    """
+    known = set()
+    for start in range(0, len(urls), SOURCE_URL_BATCH_SIZE):
+        batch = urls[start:start + SOURCE_URL_BATCH_SIZE]
+        known.update(
+            Resource.objects.filter(source_url__in=batch)
+            .exclude(file='')
+            .exclude(file__isnull=True)
+            .values_list('source_url', flat=True)
+        )
+    return known
+
+
+def discard_unfinished_imports(job, urls, since):
+    """
+    Delete the file-less resources a killed earlier attempt of job left behind
+    for urls, so the retry downloads them again.
+    """
+    discarded = 0
+    for start in range(0, len(urls), SOURCE_URL_BATCH_SIZE):
+        batch = urls[start:start + SOURCE_URL_BATCH_SIZE]
+        discarded += Resource.objects.filter(
+            Q(file='') | Q(file__isnull=True),
+            source_url__in=batch,
+            uploaded_by_id=job.created_by_id,
+            imported_at__gte=since,
+        ).delete()[0]
+    return discarded
+
+
+def queue_imported_resource_work(resource_ids):
+    """Queue text indexing and previews for an import's resources, FOLLOW_UP_JOB_BATCH_SIZE per job."""
+    resource_ids = sorted(resource_ids)
+    for start in range(0, len(resource_ids), FOLLOW_UP_JOB_BATCH_SIZE):
+        batch = resource_ids[start:start + FOLLOW_UP_JOB_BATCH_SIZE]
+        queue_resource_indexing(batch)
+        queue_resource_previews(batch)
+
+
+def import_pdf(job, pdf, position, total, *, session, host_limiter, abort_event):
+    """
+    Create and download one discovered PDF. Returns (outcome counted in
+    ImportProgress, id of the created resource or None).
+    """
+    pdf_url = pdf['url']
+    label = f' {position}/{total}' if total > 1 else ''
+    if abort_event.is_set():
+        raise ImportAbortedError('Import aborted by admin.')
+    ensure_job_not_aborted(job.id)
+
+    resource = Resource.objects.create(
+        title=(pdf['title'] or os.path.basename(urlparse(pdf_url).path) or 'Imported PDF')[:255],
+        description='Imported PDF resource',
+        subject=job.subject,
+        curriculum=job.curriculum,
+        grade_or_course=job.grade_or_course,
+        topic=job.topic,
+        resource_type='pdf',
+        external_url='',
+        source_url=pdf_url,
+        imported_at=timezone.now(),
+        visibility=job.visibility,
+        uploaded_by=job.created_by,
+    )
+    try:
+        with host_limiter.slot(pdf_url):
+            ensure_job_not_aborted(job.id)
+            append_job_log(job.id, f'Downloading PDF{label}: {pdf_url}')
+            download_pdf_to_resource(resource, pdf_url, session=session, abort_event=abort_event)
+        append_job_log(job.id, f'Imported PDF: {resource.title}')
+        return 'imported', resource.id
+    except PdfTooLargeError as exc:
+        append_job_log(job.id, f'Skipped oversized PDF{label}: {pdf_url} ({exc})')
+        resource.delete()
+        return 'oversized', None
+    except PdfImportSkipError as exc:
+        append_job_log(job.id, f'Skipped PDF{label} due to fetch/import failure: {pdf_url} ({exc})')
+        resource.delete()
+        return 'failed', None
+    except BaseException:
+        resource.delete()
+        raise
+
+
+def _import_pdf_in_worker(*args, **kwargs):
+    close_old_connections()
+    try:
+        return import_pdf(*args, **kwargs)
+    finally:
+        close_old_connections()
 
-        for next_folder in folder_links:
-            if job_id:
-                ensure_job_not_aborted(job_id)
-            walk_folder(next_folder, depth + 1)
 
-    walk_folder(start_url, 0)
-    return found_pdfs
+def import_pdfs(job, pdf_links, progress, *, session, abort_event):
+    """
+    Download the PDFs with up to RESOURCE_IMPORT_WORKERS threads and at most
+    RESOURCE_IMPORT_MAX_PER_HOST of them talking to the same host. The first
+    abort or unexpected error stops new downloads, cancels the queued ones and
+    is re-raised once the running downloads have finished.
+    """
+    total = len(pdf_links)
+    if not total:
+        return
+    host_limiter = HostConcurrencyLimiter(int(getattr(settings, 'RESOURCE_IMPORT_MAX_PER_HOST', 2)))
+    max_workers = min(total, int(getattr(settings, 'RESOURCE_IMPORT_WORKERS', 4)))
+    options = {'session': session, 'host_limiter': host_limiter, 'abort_event': abort_event}
+
+    if max_workers <= 1:
+        for position, pdf in enumerate(pdf_links, start=1):
+            outcome, resource_id = import_pdf(job, pdf, position, total, **options)
+            progress.record(outcome, resource_id=resource_id)
+        return
+
+    first_error = None
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='resource-import') as executor:
+        pending = {
+            executor.submit(_import_pdf_in_worker, job, pdf, position, total, **options)
+            for position, pdf in enumerate(pdf_links, start=1)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                try:
+                    outcome, resource_id = future.result()
+                    progress.record(outcome, resource_id=resource_id)
+                except BaseException as exc:
+                    if first_error is None:
+                        first_error = exc
+                        abort_event.set()
+                        for queued in pending:
+                            queued.cancel()
+    if first_error is not None:
+        raise first_error
 
 
 def run_resource_import_job(job_id):
     close_old_connections()
+    abort_event = threading.Event()
+    workers = int(getattr(settings, 'RESOURCE_IMPORT_WORKERS', 4))
+    session = build_import_session(pool_size=max(workers, 1) + 1)
     try:
-        job = ResourceImportJob.objects.get(pk=job_id)
+        job = ResourceImportJob.objects.select_related('created_by').get(pk=job_id)
         approved_domains = list(
             ApprovedResourceDomain.objects.filter(is_active=True).values_list('domain', flat=True)
         )
-        imported_count = 0
-        duplicate_count = 0
-        oversized_count = 0
-        failed_pdf_count = 0
+        progress = ImportProgress(job_id)
         total_pdfs_found = 0
+        # Still 'running' here means an earlier attempt was killed mid-import and the queue retried it.
+        interrupted_at = job.started_at if job.status == 'running' else None
 
-        update_job(
-            job_id,
+        # Conditional, so an abort while the job was queued is not overwritten even without a shared cache.
+        # 'running' is accepted for a retry of an attempt that was killed mid-import.
+        started = ResourceImportJob.objects.filter(pk=job_id, status__in=('queued', 'running')).update(
             status='running',
             progress_current=0,
             progress_total=0,
             created_resources_count=0,
             started_at=timezone.now(),
             error_message='',
+            updated_at=timezone.now(),
         )
+        if not started:
+            return
         append_job_log(job_id, f'Starting import for {job.source_url}')
         ensure_job_not_aborted(job_id)
 
@@ -279,128 +686,67 @@ def run_resource_import_job(job_id):
             raise ValueError('This domain is not approved for importing.')
 
         try:
-            response = fetch_with_retry(job.source_url, attempts=HTTP_RETRY_ATTEMPTS, timeout=(10, 90))
+            response = fetch_with_retry(
+                job.source_url,
+                stream=True,
+                attempts=HTTP_RETRY_ATTEMPTS,
+                timeout=(10, 90),
+                session=session,
+            )
         except requests.RequestException as exc:
             raise ValueError(f'Failed to fetch URL: {exc}') from exc
-
-        content_type = (response.headers.get('Content-Type') or '').lower()
+        with response:
+            content_type = (response.headers.get('Content-Type') or '').lower()
 
         if 'application/pdf' in content_type or parsed.path.lower().endswith('.pdf'):
-            ensure_job_not_aborted(job_id)
-            update_job(job_id, progress_total=1)
-            total_pdfs_found = 1
-            if Resource.objects.filter(source_url=job.source_url).exists():
-                append_job_log(job_id, f'Skipped duplicate PDF: {job.source_url}')
-                duplicate_count += 1
-            else:
-                resource = Resource.objects.create(
-                    title=(os.path.basename(parsed.path) or 'Imported PDF')[:255],
-                    description='Imported PDF resource',
-                    subject=job.subject,
-                    curriculum=job.curriculum,
-                    grade_or_course=job.grade_or_course,
-                    topic=job.topic,
-                    resource_type='pdf',
-                    external_url='',
-                    source_url=job.source_url,
-                    imported_at=timezone.now(),
-                    visibility=job.visibility,
-                    uploaded_by=job.created_by,
-                )
-                try:
-                    ensure_job_not_aborted(job_id)
-                    append_job_log(job_id, f'Downloading PDF: {job.source_url}')
-                    download_pdf_to_resource(resource, job.source_url)
-                    imported_count += 1
-                    append_job_log(job_id, f'Imported PDF: {resource.title}')
-                except PdfTooLargeError as exc:
-                    append_job_log(job_id, f'Skipped oversized PDF: {job.source_url} ({exc})')
-                    oversized_count += 1
-                    resource.delete()
-                except PdfImportSkipError as exc:
-                    append_job_log(job_id, f'Skipped PDF due to fetch/import failure: {job.source_url} ({exc})')
-                    failed_pdf_count += 1
-                    resource.delete()
-                except Exception:
-                    resource.delete()
-                    raise
-            update_job(job_id, progress_current=1, created_resources_count=imported_count)
+            pdf_links = [{'url': job.source_url, 'title': os.path.basename(parsed.path) or 'Imported PDF'}]
         else:
             try:
-                pdf_links = collect_pdf_links(job.source_url, approved_domains, job_id=job_id)
+                pdf_links = collect_pdf_links(
+                    job.source_url,
+                    approved_domains,
+                    job_id=job_id,
+                    session=session,
+                    abort_event=abort_event,
+                )
             except requests.RequestException as exc:
                 raise ValueError(f'Failed while traversing folders: {exc}') from exc
 
             if not pdf_links:
                 raise ValueError('No importable PDFs were found at this approved URL.')
-
-            total = len(pdf_links)
-            total_pdfs_found = total
-            update_job(job_id, progress_total=total)
-            append_job_log(job_id, f'Found {total} PDF file(s) to process.')
-
-            processed = 0
-            for pdf in pdf_links:
-                ensure_job_not_aborted(job_id)
-                pdf_url = pdf['url']
-                processed += 1
-                update_job(job_id, progress_current=processed)
-
-                if Resource.objects.filter(source_url=pdf_url).exists():
-                    append_job_log(job_id, f'Skipped duplicate PDF: {pdf_url}')
-                    duplicate_count += 1
-                    continue
-
-                resource = Resource.objects.create(
-                    title=(pdf['title'] or os.path.basename(urlparse(pdf_url).path) or 'Imported PDF')[:255],
-                    description='Imported PDF resource',
-                    subject=job.subject,
-                    curriculum=job.curriculum,
-                    grade_or_course=job.grade_or_course,
-                    topic=job.topic,
-                    resource_type='pdf',
-                    external_url='',
-                    source_url=pdf_url,
-                    imported_at=timezone.now(),
-                    visibility=job.visibility,
-                    uploaded_by=job.created_by,
-                )
-
-                try:
-                    ensure_job_not_aborted(job_id)
-                    append_job_log(job_id, f'Downloading PDF {processed}/{total}: {pdf_url}')
-                    download_pdf_to_resource(resource, pdf_url)
-                    imported_count += 1
-                    append_job_log(job_id, f'Imported PDF: {resource.title}')
-                    update_job(job_id, created_resources_count=imported_count)
-                except PdfTooLargeError as exc:
-                    append_job_log(job_id, f'Skipped oversized PDF {processed}/{total}: {pdf_url} ({exc})')
-                    oversized_count += 1
-                    resource.delete()
-                except PdfImportSkipError as exc:
-                    append_job_log(job_id, f'Skipped PDF {processed}/{total} due to fetch/import failure: {pdf_url} ({exc})')
-                    failed_pdf_count += 1
-                    resource.delete()
-                except Exception:
-                    resource.delete()
-                    raise
+            append_job_log(job_id, f'Found {len(pdf_links)} PDF file(s) to process.')
+
+        total_pdfs_found = len(pdf_links)
+        update_job(job_id, progress_total=total_pdfs_found)
+        if interrupted_at is not None:
+            discarded = discard_unfinished_imports(job, [pdf['url'] for pdf in pdf_links], interrupted_at)
+            if discarded:
+                append_job_log(job_id, f'Retrying {discarded} PDF(s) left unfinished by an interrupted run.')
+        imported_urls = known_source_urls([pdf['url'] for pdf in pdf_links])
+        if imported_urls:
+            append_job_log(job_id, f'Skipped {len(imported_urls)} duplicate PDF(s) imported earlier.')
+            progress.record('duplicate', count=len(imported_urls))
+            pdf_links = [pdf for pdf in pdf_links if pdf['url'] not in imported_urls]
+        try:
+            import_pdfs(job, pdf_links, progress, session=session, abort_event=abort_event)
+        finally:
+            queue_imported_resource_work(progress.resource_ids)
 
         append_job_log(
             job_id,
             'Import summary: '
             f'found={total_pdfs_found}, '
-            f'imported={imported_count}, '
-            f'duplicates_skipped={duplicate_count}, '
-            f'oversized_skipped={oversized_count}, '
-            f'failed_url_skipped={failed_pdf_count}.'
+            f'imported={progress.counts["imported"]}, '
+            f'duplicates_skipped={progress.counts["duplicate"]}, '
+            f'oversized_skipped={progress.counts["oversized"]}, '
+            f'failed_url_skipped={progress.counts["failed"]}.'
         )
-        append_job_log(job_id, f'Import completed. Created {imported_count} resource(s).')
-        final_job = ResourceImportJob.objects.get(pk=job_id)
+        append_job_log(job_id, f'Import completed. Created {progress.counts["imported"]} resource(s).')
         update_job(
             job_id,
             status='completed',
-            progress_current=final_job.progress_total or final_job.progress_current,
-            created_resources_count=imported_count,
+            progress_current=total_pdfs_found,
+            created_resources_count=progress.counts['imported'],
             finished_at=timezone.now(),
         )
     except ImportAbortedError as exc:
@@ -410,6 +756,8 @@ def run_resource_import_job(job_id):
         append_job_log(job_id, f'Import failed: {exc}')
         update_job(job_id, status='failed', error_message=str(exc), finished_at=timezone.now())
     finally:
+        forget_abort_checks(job_id)
+        session.close()
         close_old_connections()
 
 
@@ -443,11 +791,43 @@ class ResourceImportJobViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
         update_job(job.pk, status='aborted', finished_at=timezone.now(), error_message='')
+        mark_job_aborted(job.pk)
         append_job_log(job.pk, f'Abort requested by {request.user.get_full_name() or request.user.username or "admin"}.')
         job.refresh_from_db()
         serializer = self.get_serializer(job)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'])
+    def logs(self, request, pk=None):
+        """
+        Log lines oldest first. With ?after=<id> returns the lines after that id
+        (for polling); without it returns the last `limit` lines. has_more says
+        whether further lines exist beyond the page in that direction.
+        """
+        job = self.get_object()
+        try:
+            limit = min(MAX_LOG_PAGE_SIZE, max(1, int(request.query_params.get('limit', DEFAULT_LOG_PAGE_SIZE))))
+            after = request.query_params.get('after')
+            after = int(after) if after not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'detail': 'after and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = ResourceImportLogLine.objects.filter(job=job).only('id', 'message', 'created_at')
+        if after is None:
+            entries = list(entries.order_by('-id')[:limit + 1])[::-1]
+            has_more = len(entries) > limit
+            entries = entries[-limit:]
+        else:
+            entries = list(entries.filter(id__gt=after).order_by('id')[:limit + 1])
+            has_more = len(entries) > limit
+            entries = entries[:limit]
+
+        return Response({
+            'results': [{'id': entry.id, 'line': entry.line} for entry in entries],
+            'last_id': entries[-1].id if entries else after,
+            'has_more': has_more,
+        })
+
 
 class ResourceViewSet(viewsets.ModelViewSet):
     queryset = Resource.objects.select_related('uploaded_by')
@@ -458,6 +838,8 @@ class ResourceViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description', 'subject', 'curriculum', 'grade_or_course', 'topic', 'tags']
     ordering_fields = ['title', 'created_at', 'updated_at', 'subject', 'curriculum']
     ordering = ['-updated_at', '-created_at']
+    # Ranked full-text search over titles, descriptions, tags and PDF text.
+    content_search_param = 'q'
 
     def get_permissions(self):
         if self.action == 'import_from_url':
@@ -467,7 +849,9 @@ class ResourceViewSet(viewsets.ModelViewSet):
         return [IsAdmin()]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().annotate(
+            has_preview=Exists(ResourcePreview.objects.filter(content_hash=OuterRef('content_hash'), status='ready'))
+        )
         user = self.request.user
 
         if not user.is_authenticated:
@@ -478,8 +862,54 @@ class ResourceViewSet(viewsets.ModelViewSet):
             return queryset.filter(visibility='teacher')
         return queryset.none()
 
+    def _content_search_query(self):
+        if self.action != 'list':
+            return ''
+        return (self.request.query_params.get(self.content_search_param) or '').strip()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self._content_search_query()
+        if not query:
+            return queryset
+        ranked = search_resources(queryset, query)
+        # An explicit ?ordering= wins over relevance.
+        if 'ordering' in self.request.query_params:
+            ranked = ranked.order_by(*queryset.query.order_by)
+        return ranked
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        query = self._content_search_query()
+        if query:
+            rows = response.data['results'] if isinstance(response.data, dict) else response.data
+            snippets = search_snippets([row['id'] for row in rows], query)
+            for row in rows:
+                row['search_snippet'] = snippets.get(row['id'], '')
+        return response
+
     def perform_create(self, serializer):
-        serializer.save(uploaded_by=self.request.user)
+        upload = serializer.validated_data.pop('file', None)
+        resource = serializer.save(uploaded_by=self.request.user)
+        if upload:
+            attach_resource_file(resource, upload)
+            queue_resource_previews([resource.id])
+        queue_resource_indexing([resource.id])
+
+    def perform_update(self, serializer):
+        upload = serializer.validated_data.pop('file', None)
+        if 'file' in serializer.initial_data and not upload:
+            serializer.validated_data.update({'file': None, 'content_hash': ''})
+        resource = serializer.save()
+        if upload:
+            attach_resource_file(resource, upload)
+            queue_resource_previews([resource.id])
+        queue_resource_indexing([resource.id])
+
+    def perform_destroy(self, instance):
+        resource_id = instance.id
+        instance.delete()
+        remove_from_index([resource_id])
 
     @action(detail=False, methods=['post'])
     def import_from_url(self, request):
@@ -512,11 +942,11 @@ class ResourceViewSet(viewsets.ModelViewSet):
             topic=topic or 'Imported',
             visibility=visibility if visibility in ('teacher', 'admin') else 'teacher',
             created_by=request.user,
-            log_lines=['Import job queued.'],
         )
+        append_job_log(job.pk, 'Import job queued.')
 
-        thread = threading.Thread(target=run_resource_import_job, args=(job.pk,), daemon=True)
-        thread.start()
+        enqueue('resource_import', {'import_job': job.pk}, priority=PRIORITY_HIGH, max_attempts=2, created_by=request.user)
+        job.refresh_from_db()
 
         serializer = ResourceImportJobSerializer(job, context={'request': request})
         return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
@@ -526,10 +956,7 @@ class ResourceViewSet(viewsets.ModelViewSet):
         resource = self.get_object()
         if not resource.file:
             raise Http404('No file attached to this resource.')
-
-        file_handle = resource.file.open('rb')
-        filename = os.path.basename(resource.file.name)
-        return FileResponse(file_handle, as_attachment=True, filename=filename)
+        return serve_file(request, resource.file, as_attachment=True)
 
     def update(self, request, *args, **kwargs):
         if request.user.role != 'admin':
@@ -1,6 +1,11 @@
 import json
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import filters, mixins, serializers, status, viewsets
@@ -8,12 +13,31 @@ from rest_framework.decorators import action
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 
-from lms.code_runner import CodeRunnerValidationError, run_code
-from lms.models import CourseBooking, Test, TestAnswer, TestAttempt, TestQuestion
+from lms.attempt_activity import (
+    estimated_time_spent_seconds,
+    forget_attempt_activity,
+    record_attempt_activity,
+    remember_attempt_activity,
+)
+from lms.background_jobs import enqueue
+from lms.code_execution import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+    ExecutionQueueFull,
+    get_execution_service,
+    get_job_state,
+)
+from lms.code_runner import CodeRunnerValidationError, judge_code, run_code
+from lms.gradebook import build_score_matrix, iter_gradebook_csv, refresh_gradebook_entries, refresh_gradebook_entry
+from lms.item_analysis import get_item_analysis, invalidate_item_analysis
+from lms.models import CodePlagiarismReport, CourseBooking, Test, TestAnswer, TestAttempt, TestQuestion
 from lms.permissions import IsAdminOrTeacher
+from lms.plagiarism import queue_plagiarism_check
 from lms.serializers import (
+    CodePlagiarismReportSerializer,
     TestAnswerSerializer,
     TestAttemptDetailSerializer,
     TestAttemptSerializer,
@@ -22,6 +46,9 @@ from lms.serializers import (
 )
 
 
+MAX_BULK_GRADES = 500
+
+
 def _teacher_can_manage_test(user, test):
     return user.role == 'admin' or (user.role == 'teacher' and test.created_by_id == user.id)
 
@@ -34,6 +61,34 @@ def _recalculate_attempt_review(attempt):
     attempt.save(update_fields=['total_awarded_marks', 'reviewed_at', 'updated_at'])
 
 
+def _recalculate_attempt_reviews(attempt_ids, now):
+    """Bulk _recalculate_attempt_review() for many attempts with one aggregate query."""
+    totals = {
+        row['attempt_id']: row
+        for row in TestAnswer.objects.filter(attempt_id__in=attempt_ids).values('attempt_id').annotate(
+            total_awarded_marks=Sum('awarded_marks'),
+            reviewed_count=Count('id', filter=Q(reviewed_at__isnull=False)),
+        )
+    }
+    attempts = []
+    for attempt_id in attempt_ids:
+        row = totals.get(attempt_id, {})
+        attempts.append(TestAttempt(
+            id=attempt_id,
+            total_awarded_marks=row.get('total_awarded_marks') or Decimal('0'),
+            reviewed_at=now if row.get('reviewed_count') else None,
+            updated_at=now,
+        ))
+    TestAttempt.objects.bulk_update(attempts, ['total_awarded_marks', 'reviewed_at', 'updated_at'])
+
+
+def _parse_awarded_marks(value):
+    try:
+        return Decimal(str(value if value is not None else '0').strip() or '0')
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
 def _student_can_take_test(student, test):
     if student.role != 'student':
         return False
@@ -53,6 +108,78 @@ def _student_can_take_test(student, test):
     ).exists()
 
 
+def _provision_test_attempts(test):
+    student_ids = CourseBooking.objects.filter(
+        product_id=test.product_id,
+        payment_status='paid',
+        student__role='student',
+    ).values_list('student_id', flat=True).distinct()
+    attempts = [
+        TestAttempt(test=test, student_id=student_id, status='not_started')
+        for student_id in student_ids
+    ]
+    TestAttempt.objects.bulk_create(attempts, batch_size=500, ignore_conflicts=True)
+    return len(attempts)
+
+
+def _start_provisioned_attempt(student, test_id, now):
+    paid_booking = CourseBooking.objects.filter(
+        student_id=OuterRef('student_id'),
+        product_id=OuterRef('test__product_id'),
+        payment_status='paid',
+    )
+    started_count = TestAttempt.objects.filter(
+        test_id=test_id,
+        student=student,
+        status='not_started',
+        test__status='published',
+        test__is_active=True,
+    ).filter(
+        Q(test__available_from__isnull=True) | Q(test__available_from__lte=now),
+        Q(test__available_until__isnull=True) | Q(test__available_until__gte=now),
+        Exists(paid_booking),
+    ).update(
+        status='in_progress',
+        started_at=now,
+        last_resumed_at=now,
+        last_activity_at=now,
+        updated_at=now,
+    )
+    return started_count == 1
+
+
+def _annotate_test_summary(queryset):
+    question_totals = TestQuestion.objects.filter(test=OuterRef('pk')).order_by().values('test')
+    locked_attempts = TestAttempt.objects.filter(test=OuterRef('pk'), status='locked').order_by().values('test')
+    return queryset.annotate(
+        annotated_question_count=Coalesce(
+            Subquery(question_totals.annotate(total=Count('id')).values('total')),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        annotated_total_marks=Coalesce(
+            Subquery(question_totals.annotate(total=Sum('marks')).values('total')),
+            Value(0),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        annotated_locked_attempt_count=Coalesce(
+            Subquery(locked_attempts.annotate(total=Count('id')).values('total')),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def _prefetch_student_attempts(queryset, student):
+    attempts = (
+        TestAttempt.objects.filter(student=student)
+        .exclude(status='not_started')
+        .annotate(reviewed_answer_count=Count('answers', filter=Q(answers__reviewed_at__isnull=False)))
+        .order_by('-updated_at')
+    )
+    return queryset.prefetch_related(Prefetch('attempts', queryset=attempts, to_attr='my_attempts'))
+
+
 def _parse_list_payload(value):
     if value in (None, '', []):
         return []
@@ -74,6 +201,126 @@ def _parse_list_payload(value):
     return [str(value).strip()]
 
 
+def _parse_json_list_payload(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise serializers.ValidationError({'test_cases': 'Test cases must be a JSON list.'})
+    return value
+
+
+def _public_judge_result(result, test_cases, include_hidden_output=False):
+    cases = []
+    for case in result.get('cases', []):
+        is_hidden = bool(test_cases[case['index']].get('is_hidden', True))
+        public_case = {
+            'index': case['index'],
+            'verdict': case['verdict'],
+            'duration_ms': case['duration_ms'],
+            'cpu_time_ms': case.get('cpu_time_ms'),
+            'peak_memory_kb': case.get('peak_memory_kb'),
+            'timed_out': case['timed_out'],
+            'exit_code': case['exit_code'],
+            'is_hidden': is_hidden,
+        }
+        if include_hidden_output or not is_hidden:
+            public_case['stdout'] = case['stdout']
+            public_case['stderr'] = case['stderr']
+        cases.append(public_case)
+    public_result = {key: value for key, value in result.items() if key != 'cases'}
+    return {**public_result, 'cases': cases}
+
+
+def _judge_coding_answer(answer, question):
+    test_cases = question.test_cases or []
+    if not test_cases or not (answer.code_answer or '').strip():
+        return False
+
+    try:
+        result = judge_code(answer.code_language or question.coding_language or '', answer.code_answer, test_cases)
+    except CodeRunnerValidationError as exc:
+        result = {'success': False, 'stage': 'validation', 'stderr': str(exc), 'cases': [], 'passed_count': 0, 'total_count': len(test_cases)}
+
+    passed_ratio = Decimal(result['passed_count']) / Decimal(result['total_count'] or 1)
+    answer.awarded_marks = (question.marks * passed_ratio).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    answer.judge_result = {
+        **_public_judge_result(result, test_cases),
+        'judged_at': timezone.now().isoformat(),
+    }
+    return True
+
+
+def _auto_grade_coding_answers(attempt):
+    answers = attempt.answers.select_related('question').filter(question__question_type='coding')
+    judged_answers = [answer for answer in answers if _judge_coding_answer(answer, answer.question)]
+    if not judged_answers:
+        return
+    TestAnswer.objects.bulk_update(judged_answers, ['awarded_marks', 'judge_result'])
+    attempt.total_awarded_marks = sum(
+        (marks or Decimal('0')) for marks in attempt.answers.values_list('awarded_marks', flat=True)
+    )
+    attempt.save(update_fields=['total_awarded_marks', 'updated_at'])
+
+
+def grade_submitted_attempt(attempt_id):
+    attempt = TestAttempt.objects.get(pk=attempt_id)
+    _auto_grade_coding_answers(attempt)
+    refresh_gradebook_entry(attempt)
+
+
+def _queue_auto_grading(attempt, user):
+    has_judged_questions = TestQuestion.objects.filter(
+        test_id=attempt.test_id,
+        question_type='coding',
+    ).exclude(test_cases=[]).exists()
+    if not has_judged_questions:
+        return
+
+    enqueue('attempt_auto_grade', {'attempt': attempt.id}, created_by=user)
+    attempt.refresh_from_db(fields=['total_awarded_marks', 'updated_at'])
+    getattr(attempt, '_prefetched_objects_cache', {}).pop('answers', None)
+
+
+def _code_execution_response(job, wait_seconds):
+    if wait_seconds > 0 and job.wait(wait_seconds):
+        if job.error:
+            return Response({'detail': job.error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(job.result)
+    return Response({'job_id': job.id, 'status': get_job_state(job.id)['status']}, status=status.HTTP_202_ACCEPTED)
+
+
+def _queue_full_response(exc):
+    return Response(
+        {'detail': str(exc), 'retry_after': exc.retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(exc.retry_after)},
+    )
+
+
+def _parse_save_sequence(value):
+    if value in (None, ''):
+        return None
+    try:
+        sequence = int(value)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({'sequence': 'A valid non-negative integer is required.'})
+    if sequence < 0:
+        raise serializers.ValidationError({'sequence': 'A valid non-negative integer is required.'})
+    return sequence
+
+
+def _parse_question_index(value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 def _elapsed_seconds_between(start, end):
     if not start or not end:
         return 0
@@ -124,7 +371,7 @@ def _normalize_legacy_attempt_timer(attempt, now=None):
 
 
 class TestViewSet(viewsets.ModelViewSet):
-    queryset = Test.objects.select_related('product', 'created_by').prefetch_related('questions', 'attempts')
+    queryset = Test.objects.select_related('product', 'created_by').prefetch_related('questions')
     serializer_class = TestSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -139,7 +386,7 @@ class TestViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = _annotate_test_summary(super().get_queryset())
         user = self.request.user
 
         if user.role == 'admin':
@@ -149,7 +396,7 @@ class TestViewSet(viewsets.ModelViewSet):
             return queryset.filter(created_by=user)
 
         if user.role == 'student':
-            return queryset.filter(
+            return _prefetch_student_attempts(queryset, user).filter(
                 status='published',
                 is_active=True,
                 product__bookings__student=user,
@@ -163,7 +410,9 @@ class TestViewSet(viewsets.ModelViewSet):
         product = serializer.validated_data['product']
         if user.role == 'teacher' and not product.instructors.filter(id=user.id).exists():
             raise serializers.ValidationError({'product': 'You can only create tests for your own course.'})
-        serializer.save(created_by=user)
+        test = serializer.save(created_by=user)
+        if test.status == 'published':
+            _provision_test_attempts(test)
 
     def perform_update(self, serializer):
         test = self.get_object()
@@ -174,13 +423,68 @@ class TestViewSet(viewsets.ModelViewSet):
         product = serializer.validated_data.get('product', test.product)
         if user.role == 'teacher' and not product.instructors.filter(id=user.id).exists():
             raise serializers.ValidationError({'product': 'You can only assign tests to your own course.'})
-        serializer.save()
+        was_published = test.status == 'published'
+        was_archived = test.status == 'archived'
+        previous_product_id = test.product_id
+        test = serializer.save()
+        if test.status == 'published' and (not was_published or test.product_id != previous_product_id):
+            _provision_test_attempts(test)
+        if test.status == 'archived' and not was_archived and test.questions.filter(question_type='coding').exists():
+            queue_plagiarism_check(test, user)
 
     def perform_destroy(self, instance):
         if not _teacher_can_manage_test(self.request.user, instance):
             raise serializers.ValidationError({'detail': 'You cannot delete this test.'})
         instance.delete()
 
+    @action(detail=True, methods=['post'])
+    def provision_attempts(self, request, pk=None):
+        test = self.get_object()
+        if not _teacher_can_manage_test(request.user, test):
+            return Response({'detail': 'Only admin or the creating teacher can provision attempts.'}, status=status.HTTP_403_FORBIDDEN)
+        if test.status != 'published':
+            return Response({'detail': 'Only published tests can be provisioned.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'test': test.id, 'eligible_students': _provision_test_attempts(test)})
+
+    @action(detail=True, methods=['get'])
+    def gradebook(self, request, pk=None):
+        test = self.get_object()
+        if not _teacher_can_manage_test(request.user, test):
+            return Response({'detail': 'Only admin or the creating teacher can view the gradebook.'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(build_score_matrix(test))
+
+    @action(detail=True, methods=['get'])
+    def item_analysis(self, request, pk=None):
+        test = self.get_object()
+        if not _teacher_can_manage_test(request.user, test):
+            return Response({'detail': 'Only admin or the creating teacher can view item analysis.'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(get_item_analysis(test))
+
+    @action(detail=True, methods=['get', 'post'])
+    def plagiarism(self, request, pk=None):
+        test = self.get_object()
+        if not _teacher_can_manage_test(request.user, test):
+            return Response({'detail': 'Only admin or the creating teacher can view plagiarism reports.'}, status=status.HTTP_403_FORBIDDEN)
+
+        response_status = status.HTTP_200_OK
+        if request.method == 'POST':
+            if not test.questions.filter(question_type='coding').exists():
+                return Response({'detail': 'This test has no coding questions.'}, status=status.HTTP_400_BAD_REQUEST)
+            queue_plagiarism_check(test, request.user)
+            response_status = status.HTTP_202_ACCEPTED
+
+        reports = CodePlagiarismReport.objects.filter(test=test).select_related('question')
+        return Response(CodePlagiarismReportSerializer(reports, many=True).data, status=response_status)
+
+    @action(detail=True, methods=['get'], url_path='gradebook/export')
+    def gradebook_export(self, request, pk=None):
+        test = self.get_object()
+        if not _teacher_can_manage_test(request.user, test):
+            return Response({'detail': 'Only admin or the creating teacher can export the gradebook.'}, status=status.HTTP_403_FORBIDDEN)
+        response = StreamingHttpResponse(iter_gradebook_csv(test), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="test-{test.id}-gradebook.csv"'
+        return response
+
 
 class TestQuestionViewSet(viewsets.ModelViewSet):
     queryset = TestQuestion.objects.select_related('test', 'test__product')
@@ -221,6 +525,7 @@ class TestQuestionViewSet(viewsets.ModelViewSet):
             'coding_language': request.data.get('coding_language'),
             'options': _parse_list_payload(request.data.get('options')),
             'correct_options': _parse_list_payload(request.data.get('correct_options')),
+            'test_cases': _parse_json_list_payload(request.data.get('test_cases')),
         }
         if request.FILES.get('attachment'):
             payload['attachment'] = request.FILES['attachment']
@@ -252,6 +557,8 @@ class TestQuestionViewSet(viewsets.ModelViewSet):
             payload['options'] = _parse_list_payload(request.data.get('options'))
         if 'correct_options' in request.data:
             payload['correct_options'] = _parse_list_payload(request.data.get('correct_options'))
+        if 'test_cases' in request.data:
+            payload['test_cases'] = _parse_json_list_payload(request.data.get('test_cases'))
         if request.FILES.get('attachment'):
             payload['attachment'] = request.FILES['attachment']
         serializer = self.get_serializer(instance, data=payload, partial=partial)
@@ -265,16 +572,22 @@ class TestQuestionViewSet(viewsets.ModelViewSet):
         if not _teacher_can_manage_test(user, test):
             raise serializers.ValidationError({'test': 'You cannot add questions to this test.'})
         serializer.save()
+        invalidate_item_analysis(test.id)
 
     def perform_update(self, serializer):
         if not _teacher_can_manage_test(self.request.user, serializer.instance.test):
             raise serializers.ValidationError({'detail': 'You cannot update this question.'})
-        serializer.save()
+        previous_test_id = serializer.instance.test_id
+        question = serializer.save()
+        invalidate_item_analysis(previous_test_id)
+        invalidate_item_analysis(question.test_id)
 
     def perform_destroy(self, instance):
         if not _teacher_can_manage_test(self.request.user, instance.test):
             raise serializers.ValidationError({'detail': 'You cannot delete this question.'})
+        test_id = instance.test_id
         instance.delete()
+        invalidate_item_analysis(test_id)
 
 
 class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -291,6 +604,10 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
         queryset = super().get_queryset()
         user = self.request.user
 
+        if self.action == 'list' and self.request.query_params.get('status') != 'not_started':
+            # Attempts provisioned at publish time stay hidden until the student starts them.
+            queryset = queryset.exclude(status='not_started')
+
         if user.role == 'admin':
             return queryset
         if user.role == 'teacher':
@@ -318,6 +635,8 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             update_fields.extend(['time_spent_seconds', 'last_resumed_at', 'last_activity_at'])
         if update_fields:
             attempt.save(update_fields=[*sorted(set(update_fields)), 'updated_at'])
+        if request.user.role == 'student' and attempt.student_id == request.user.id:
+            remember_attempt_activity(attempt)
         serializer = self.get_serializer(attempt)
         return Response(serializer.data)
 
@@ -326,11 +645,18 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
         if request.user.role != 'student':
             return Response({'detail': 'Only students can start tests.'}, status=status.HTTP_403_FORBIDDEN)
 
-        test = get_object_or_404(Test, pk=request.data.get('test'))
+        now = timezone.now()
+        test_id = request.data.get('test')
+        if str(test_id or '').isdigit() and _start_provisioned_attempt(request.user, test_id, now):
+            attempt = self.get_queryset().get(test_id=test_id, student=request.user)
+            remember_attempt_activity(attempt)
+            serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
+            return Response(serializer.data)
+
+        test = get_object_or_404(Test, pk=test_id)
         if not _student_can_take_test(request.user, test):
             return Response({'detail': 'You are not eligible to take this test.'}, status=status.HTTP_403_FORBIDDEN)
 
-        now = timezone.now()
         attempt, created = TestAttempt.objects.get_or_create(
             test=test,
             student=request.user,
@@ -364,39 +690,171 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             'time_spent_seconds',
             'updated_at',
         ])
+        remember_attempt_activity(attempt)
 
         serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def heartbeat(self, request, pk=None):
+        if request.user.role != 'student':
+            return Response({'detail': 'Only students can send attempt heartbeats.'}, status=status.HTTP_403_FORBIDDEN)
+
+        now = timezone.now()
+        state = record_attempt_activity(pk, request.user.id, now) if str(pk).isdigit() else None
+        if state is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'attempt': int(pk),
+            'status': state['status'],
+            'last_activity_at': now,
+            'time_spent_seconds': estimated_time_spent_seconds(state, now),
+        })
+
     @action(detail=True, methods=['post'])
     def save_answer(self, request, pk=None):
         attempt = self.get_object()
         if request.user.role != 'student' or attempt.student_id != request.user.id:
             return Response({'detail': 'You can only save your own answers.'}, status=status.HTTP_403_FORBIDDEN)
-        if attempt.status in ['locked', 'submitted']:
-            return Response({'detail': f'Cannot save answer while attempt is {attempt.status}.'}, status=status.HTTP_400_BAD_REQUEST)
 
         question = get_object_or_404(TestQuestion, pk=request.data.get('question'), test=attempt.test)
-        answer, _ = TestAnswer.objects.get_or_create(attempt=attempt, question=question)
+        sequence = _parse_save_sequence(request.data.get('sequence'))
+        with transaction.atomic():
+            # Same row lock as save_answers, so the two never insert one answer twice.
+            locked_attempt = TestAttempt.objects.select_for_update().only('id', 'status').get(pk=attempt.pk)
+            if locked_attempt.status in ['not_started', 'locked', 'submitted']:
+                return Response(
+                    {'detail': f'Cannot save answer while attempt is {locked_attempt.status}.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            answer, _ = TestAnswer.objects.get_or_create(attempt=attempt, question=question)
+            if sequence is not None and answer.save_sequence and sequence <= answer.save_sequence:
+                serializer = TestAnswerSerializer(answer, context={'request': request})
+                return Response({**serializer.data, 'stale': True})
+
+            answer.selected_options = _parse_list_payload(request.data.get('selected_options'))
+            answer.subjective_answer = request.data.get('subjective_answer') or ''
+            answer.code_answer = request.data.get('code_answer') or ''
+            answer.code_language = request.data.get('code_language') or ''
+            if sequence is not None:
+                answer.save_sequence = sequence
+            if request.FILES.get('uploaded_file'):
+                answer.uploaded_file = request.FILES['uploaded_file']
+            answer.save()
+
+            question_index = _parse_question_index(request.data.get('current_question_index'))
+            if question_index is not None and question_index != attempt.current_question_index:
+                attempt.current_question_index = question_index
+                attempt.save(update_fields=['current_question_index', 'updated_at'])
+        record_attempt_activity(attempt.id, request.user.id)
+
+        serializer = TestAnswerSerializer(answer, context={'request': request})
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def save_answers(self, request, pk=None):
+        attempt = self.get_object()
+        if request.user.role != 'student' or attempt.student_id != request.user.id:
+            return Response({'detail': 'You can only save your own answers.'}, status=status.HTTP_403_FORBIDDEN)
 
-        answer.selected_options = _parse_list_payload(request.data.get('selected_options'))
-        answer.subjective_answer = request.data.get('subjective_answer') or ''
-        answer.code_answer = request.data.get('code_answer') or ''
-        answer.code_language = request.data.get('code_language') or ''
-        if request.FILES.get('uploaded_file'):
-            answer.uploaded_file = request.FILES['uploaded_file']
-        answer.save()
+        items = request.data.get('answers')
+        if not isinstance(items, list) or not items:
+            return Response({'answers': 'A non-empty list of answers is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if request.data.get('current_question_index') not in [None, '']:
+        payload_by_question = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return Response({'answers': 'Each answer must be an object.'}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                attempt.current_question_index = int(request.data.get('current_question_index'))
+                question_id = int(item.get('question'))
             except (TypeError, ValueError):
-                pass
-        attempt.last_activity_at = timezone.now()
-        attempt.save(update_fields=['current_question_index', 'last_activity_at', 'updated_at'])
+                return Response({'answers': 'Each answer requires a valid question.'}, status=status.HTTP_400_BAD_REQUEST)
+            sequence = _parse_save_sequence(item.get('sequence'))
+            current = payload_by_question.get(question_id)
+            # Like save_answer, an item without a sequence is never treated as stale.
+            if current is None or None in (sequence, current['sequence']) or sequence >= current['sequence']:
+                payload_by_question[question_id] = {**item, 'sequence': sequence}
+
+        question_ids = set(
+            TestQuestion.objects.filter(test_id=attempt.test_id, id__in=payload_by_question).values_list('id', flat=True)
+        )
+        unknown_ids = sorted(set(payload_by_question) - question_ids)
+        if unknown_ids:
+            return Response({'answers': f'Questions do not belong to this test: {unknown_ids}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = TestAnswerSerializer(answer, context={'request': request})
-        return Response(serializer.data)
+        now = timezone.now()
+        saved = []
+        stale = []
+        with transaction.atomic():
+            locked_attempt = TestAttempt.objects.select_for_update().only('id', 'status').get(pk=attempt.pk)
+            if locked_attempt.status in ['not_started', 'locked', 'submitted']:
+                return Response(
+                    {'detail': f'Cannot save answer while attempt is {locked_attempt.status}.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            existing_answers = {
+                answer.question_id: answer
+                for answer in TestAnswer.objects.filter(attempt=attempt, question_id__in=question_ids)
+            }
+            answers_to_create = []
+            answers_to_update = []
+            for question_id, item in payload_by_question.items():
+                sequence = item['sequence']
+                answer = existing_answers.get(question_id)
+                if sequence is not None and answer and answer.save_sequence and sequence <= answer.save_sequence:
+                    stale.append({'question': question_id, 'sequence': answer.save_sequence})
+                    continue
+
+                if answer is None:
+                    answer = TestAnswer(attempt=attempt, question_id=question_id, created_at=now)
+                    answers_to_create.append(answer)
+                else:
+                    answers_to_update.append(answer)
+                answer.selected_options = _parse_list_payload(item.get('selected_options'))
+                answer.subjective_answer = item.get('subjective_answer') or ''
+                answer.code_answer = item.get('code_answer') or ''
+                answer.code_language = item.get('code_language') or ''
+                if sequence is not None:
+                    answer.save_sequence = sequence
+                answer.updated_at = now
+                saved.append({'question': question_id, 'sequence': sequence})
+
+            if answers_to_create:
+                # Grading or an upload may have inserted one of these rows meanwhile; those
+                # inserts are skipped here and the rows are written over by bulk_update.
+                TestAnswer.objects.bulk_create(answers_to_create, ignore_conflicts=True)
+                stored_ids = dict(
+                    TestAnswer.objects.filter(
+                        attempt=attempt,
+                        question_id__in=[answer.question_id for answer in answers_to_create],
+                    ).values_list('question_id', 'id')
+                )
+                for answer in answers_to_create:
+                    answer.pk = stored_ids[answer.question_id]
+                answers_to_update.extend(answers_to_create)
+            if answers_to_update:
+                TestAnswer.objects.bulk_update(answers_to_update, [
+                    'selected_options',
+                    'subjective_answer',
+                    'code_answer',
+                    'code_language',
+                    'save_sequence',
+                    'updated_at',
+                ])
+
+            question_index = _parse_question_index(request.data.get('current_question_index'))
+            if question_index is not None:
+                TestAttempt.objects.filter(pk=attempt.pk).update(current_question_index=question_index, updated_at=now)
+        record_attempt_activity(attempt.id, request.user.id, now)
+
+        return Response({
+            'attempt': attempt.id,
+            'saved': saved,
+            'stale': stale,
+            'last_activity_at': now,
+        })
 
     @action(detail=True, methods=['post'])
     def run_code(self, request, pk=None):
@@ -423,19 +881,36 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             source_code = answer.code_answer or ''
             code_language = answer.code_language or question.coding_language or ''
 
+        judge_mode = request.data.get('mode') == 'judge'
+        test_cases = [
+            case for case in (question.test_cases or [])
+            if is_reviewer or not case.get('is_hidden', True)
+        ]
+        if judge_mode and not test_cases:
+            return Response({'detail': 'This question has no test cases to judge against.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if judge_mode:
+            def execute():
+                return _public_judge_result(
+                    judge_code(code_language, source_code, test_cases),
+                    test_cases,
+                    include_hidden_output=is_reviewer,
+                )
+        else:
+            program_input = request.data.get('stdin') or ''
+
+            def execute():
+                return run_code(code_language, source_code, program_input)
+
         try:
-            result = run_code(
-                code_language,
-                source_code,
-                request.data.get('stdin') or '',
-            )
-        except CodeRunnerValidationError as exc:
-            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            job = get_execution_service().submit(user.id, execute)
+        except ExecutionQueueFull as exc:
+            return _queue_full_response(exc)
 
         if is_student_attempt:
-            attempt.last_activity_at = timezone.now()
-            attempt.save(update_fields=['last_activity_at', 'updated_at'])
-        return Response(result)
+            record_attempt_activity(attempt.id, user.id)
+        wait_seconds = 0 if str(request.data.get('async', '')).lower() in ['1', 'true'] else settings.CODE_EXECUTION_SYNC_WAIT_SECONDS
+        return _code_execution_response(job, wait_seconds)
 
     @action(detail=True, methods=['post'])
     def lock(self, request, pk=None):
@@ -444,6 +919,8 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             return Response({'detail': 'You can only lock your own attempt.'}, status=status.HTTP_403_FORBIDDEN)
         if attempt.status == 'submitted':
             return Response({'detail': 'Submitted attempts cannot be locked.'}, status=status.HTTP_400_BAD_REQUEST)
+        if attempt.status == 'not_started':
+            return Response({'detail': 'Attempt has not been started.'}, status=status.HTTP_400_BAD_REQUEST)
         if attempt.status == 'locked':
             if _normalize_legacy_attempt_timer(attempt, timezone.now()):
                 attempt.save(update_fields=['time_spent_seconds', 'last_resumed_at', 'updated_at'])
@@ -468,6 +945,7 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             'time_spent_seconds',
             'updated_at',
         ])
+        forget_attempt_activity(attempt.id)
 
         serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
         return Response(serializer.data)
@@ -482,7 +960,7 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             return Response({'detail': 'Only the teacher who created this test can unlock it.'}, status=status.HTTP_403_FORBIDDEN)
         if attempt.status == 'submitted':
             return Response({'detail': 'Submitted attempts cannot be unlocked.'}, status=status.HTTP_400_BAD_REQUEST)
-        if attempt.status == 'in_progress':
+        if attempt.status in ['not_started', 'in_progress']:
             serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
             return Response(serializer.data)
 
@@ -502,6 +980,7 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             'time_spent_seconds',
             'updated_at',
         ])
+        forget_attempt_activity(attempt.id)
 
         serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
         return Response(serializer.data)
@@ -516,6 +995,8 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             return Response(serializer.data)
         if attempt.status == 'locked':
             return Response({'detail': 'Locked attempts must be unlocked before submission.'}, status=status.HTTP_400_BAD_REQUEST)
+        if attempt.status == 'not_started':
+            return Response({'detail': 'Attempt has not been started.'}, status=status.HTTP_400_BAD_REQUEST)
 
         now = timezone.now()
         _capture_active_attempt_time(attempt, now)
@@ -531,6 +1012,9 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
             'time_spent_seconds',
             'updated_at',
         ])
+        forget_attempt_activity(attempt.id)
+        refresh_gradebook_entry(attempt)
+        _queue_auto_grading(attempt, request.user)
 
         serializer = TestAttemptDetailSerializer(attempt, context={'request': request})
         return Response(serializer.data)
@@ -564,5 +1048,110 @@ class TestAttemptViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, views
         answer.save(update_fields=['awarded_marks', 'review_comment', 'reviewed_at', 'reviewed_by', 'updated_at'])
 
         _recalculate_attempt_review(attempt)
+        refresh_gradebook_entry(attempt)
         serializer = TestAnswerSerializer(answer, context={'request': request})
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_grade(self, request):
+        user = request.user
+        if user.role not in ['admin', 'teacher']:
+            return Response({'detail': 'Only admin or the creating teacher can grade answers.'}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data.get('grades')
+        if not isinstance(items, list) or not items:
+            return Response({'grades': 'A non-empty list of grades is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_GRADES:
+            return Response({'grades': f'At most {MAX_BULK_GRADES} grades can be saved at once.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        grades = {}
+        errors = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[index] = 'Each grade must be an object.'
+                continue
+            try:
+                key = (int(item.get('attempt')), int(item.get('question')))
+            except (TypeError, ValueError):
+                errors[index] = 'Each grade requires a valid attempt and question.'
+                continue
+            awarded_marks = _parse_awarded_marks(item.get('awarded_marks'))
+            if awarded_marks is None:
+                errors[index] = 'A valid number is required for awarded_marks.'
+            elif awarded_marks < 0:
+                errors[index] = 'Marks cannot be negative.'
+            elif key in grades:
+                errors[index] = 'This answer is graded more than once in the request.'
+            else:
+                grades[key] = {'index': index, 'awarded_marks': awarded_marks, 'review_comment': item.get('review_comment') or ''}
+
+        attempt_ids = {attempt_id for attempt_id, _ in grades}
+        question_ids = {question_id for _, question_id in grades}
+        attempts = {
+            row['id']: row
+            for row in TestAttempt.objects.filter(id__in=attempt_ids).values('id', 'test_id', 'test__created_by_id')
+        }
+        questions = {
+            row['id']: row
+            for row in TestQuestion.objects.filter(id__in=question_ids).values('id', 'test_id', 'marks')
+        }
+        for (attempt_id, question_id), grade in grades.items():
+            attempt = attempts.get(attempt_id)
+            question = questions.get(question_id)
+            if attempt is None:
+                errors[grade['index']] = 'Attempt not found.'
+            elif user.role == 'teacher' and attempt['test__created_by_id'] != user.id:
+                errors[grade['index']] = 'Only the teacher who created this test can grade it.'
+            elif question is None or question['test_id'] != attempt['test_id']:
+                errors[grade['index']] = 'Question does not belong to this attempt\'s test.'
+            elif grade['awarded_marks'] > question['marks']:
+                errors[grade['index']] = f"Marks cannot exceed {question['marks']}."
+        if errors:
+            return Response({'grades': {str(index): message for index, message in sorted(errors.items())}}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing_answers = {
+                (answer.attempt_id, answer.question_id): answer
+                for answer in TestAnswer.objects.filter(attempt_id__in=attempt_ids, question_id__in=question_ids)
+            }
+            answers_to_create = []
+            answers_to_update = []
+            for key, grade in grades.items():
+                answer = existing_answers.get(key)
+                if answer is None:
+                    answer = TestAnswer(attempt_id=key[0], question_id=key[1], created_at=now)
+                    answers_to_create.append(answer)
+                else:
+                    answers_to_update.append(answer)
+                answer.awarded_marks = grade['awarded_marks']
+                answer.review_comment = grade['review_comment']
+                answer.reviewed_at = now
+                answer.reviewed_by = user
+                answer.updated_at = now
+
+            if answers_to_create:
+                TestAnswer.objects.bulk_create(answers_to_create)
+            if answers_to_update:
+                TestAnswer.objects.bulk_update(
+                    answers_to_update,
+                    ['awarded_marks', 'review_comment', 'reviewed_at', 'reviewed_by', 'updated_at'],
+                )
+            _recalculate_attempt_reviews(sorted(attempt_ids), now)
+            refresh_gradebook_entries(attempt_ids)
+
+        return Response({'graded': len(grades), 'attempts': sorted(attempt_ids)})
+
+
+class CodeExecutionJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        state = get_job_state(job_id)
+        if not state or state['user_id'] != request.user.id:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        payload = {key: value for key, value in state.items() if key != 'user_id'}
+        if state['status'] not in [JOB_STATUS_COMPLETED, JOB_STATUS_FAILED]:
+            return Response(payload, status=status.HTTP_202_ACCEPTED)
+        return Response(payload)
@@ -0,0 +1,216 @@
+import os
+
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from lms.chunked_uploads import ChunkedUploadError, assemble_upload, create_upload, finish_upload, write_chunk
+from lms.file_serving import signed_file_url
+from lms.models import ChunkedUpload, ChunkedUploadPart, Resource, TestAnswer, TestAttempt, TestQuestion
+from lms.resource_files import attach_resource_file
+from lms.resource_previews import queue_resource_previews
+from lms.resource_search import queue_resource_indexing
+from lms.serializers import ChunkedUploadSerializer
+from lms.views.test_views import _teacher_can_manage_test
+from notes.models import Note, NoteAttachment
+
+
+MAX_NOTE_ATTACHMENTS = 5
+# Same cap as NoteAttachmentSerializer.validate_file.
+MAX_NOTE_ATTACHMENT_BYTES = 100 * 1024 * 1024
+NOTE_ATTACHMENT_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def _parse_target_id(target, key):
+    value = target.get(key) if isinstance(target, dict) else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve_upload_target(user, purpose, target):
+    """
+    Look up and authorize the object a finished upload is attached to.
+    Returns (instance, field name, error message).
+    """
+    if purpose == 'test_answer':
+        attempt_id = _parse_target_id(target, 'attempt')
+        question_id = _parse_target_id(target, 'question')
+        attempt = TestAttempt.objects.select_related('test').filter(pk=attempt_id).first() if attempt_id else None
+        if user.role != 'student' or attempt is None or attempt.student_id != user.id:
+            return None, None, 'You can only upload files to your own attempts.'
+        if attempt.status in ['not_started', 'locked', 'submitted']:
+            return None, None, f'Cannot upload a file while attempt is {attempt.status}.'
+        question = TestQuestion.objects.filter(pk=question_id, test_id=attempt.test_id).first() if question_id else None
+        if question is None:
+            return None, None, 'Question does not belong to this test.'
+        return (attempt, question), 'uploaded_file', None
+
+    if purpose == 'test_question_attachment':
+        question_id = _parse_target_id(target, 'question')
+        question = TestQuestion.objects.select_related('test').filter(pk=question_id).first() if question_id else None
+        if question is None or user.role not in ['admin', 'teacher'] or not _teacher_can_manage_test(user, question.test):
+            return None, None, 'You can only upload attachments to your own tests.'
+        return question, 'attachment', None
+
+    if purpose == 'resource':
+        resource_id = _parse_target_id(target, 'resource')
+        resource = Resource.objects.filter(pk=resource_id).first() if resource_id else None
+        if user.role != 'admin' or resource is None:
+            return None, None, 'Only admin users can upload resource files.'
+        return resource, 'file', None
+
+    if purpose == 'note_attachment':
+        note_id = _parse_target_id(target, 'note')
+        note = Note.objects.select_related('product').filter(pk=note_id).first() if note_id else None
+        can_edit = note is not None and (
+            user.role == 'admin'
+            or note.creator_id == user.id
+            or (note.product_id and note.product.instructors.filter(id=user.id).exists())
+        )
+        if not can_edit:
+            return None, None, "You don't have permission to add attachments to this note."
+        if note.attachments.count() >= MAX_NOTE_ATTACHMENTS:
+            return None, None, f'Maximum {MAX_NOTE_ATTACHMENTS} attachments allowed per note.'
+        return note, 'file', None
+
+    return None, None, 'Unknown upload purpose.'
+
+
+def _note_attachment_file_type(filename):
+    """NoteAttachment.file_type for filename, or None when it is neither a PDF nor an image."""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == '.pdf':
+        return 'pdf'
+    if extension in NOTE_ATTACHMENT_IMAGE_EXTENSIONS:
+        return 'image'
+    return None
+
+
+def _validate_upload_file(purpose, filename, total_size):
+    """Per-purpose limits checked before any chunk is accepted. Returns an error message or None."""
+    if purpose == 'note_attachment':
+        if total_size > MAX_NOTE_ATTACHMENT_BYTES:
+            return f'File size too large. Maximum {MAX_NOTE_ATTACHMENT_BYTES // (1024 * 1024)}MB allowed.'
+        if _note_attachment_file_type(filename) is None:
+            return 'Note attachments must be PDF or image files.'
+    return None
+
+
+class ChunkedUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable uploads for large files. The client creates an upload, PUTs each
+    chunk as the raw request body with its SHA-256 in X-Chunk-SHA256, reads the
+    upload back to find the chunks still missing after an interruption, and
+    finally POSTs complete to attach the file to its target.
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('parts', queryset=ChunkedUploadPart.objects.only('id', 'upload_id', 'index'))
+        )
+
+    def create(self, request, *args, **kwargs):
+        purpose = request.data.get('purpose')
+        target = request.data.get('target') or {}
+        _, _, error = _resolve_upload_target(request.user, purpose, target)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            total_size = int(request.data.get('total_size'))
+        except (TypeError, ValueError):
+            return Response({'total_size': ['A valid number of bytes is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        filename = (request.data.get('filename') or '').strip()
+        if not filename:
+            return Response({'filename': ['Filename is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        error = _validate_upload_file(purpose, filename, total_size)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = create_upload(
+                request.user,
+                purpose,
+                target,
+                filename,
+                total_size,
+                content_type=request.data.get('content_type') or '',
+                sha256=(request.data.get('sha256') or '').strip(),
+            )
+        except ChunkedUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        if instance.status == 'uploading':
+            finish_upload(instance, status='aborted')
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        upload = self.get_object()
+        try:
+            size = write_chunk(upload, int(index), request.stream, request.headers.get('X-Chunk-SHA256'))
+        except ChunkedUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'index': int(index), 'size': size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        if upload.status != 'uploading':
+            return Response({'detail': f'Upload is {upload.status}.'}, status=status.HTTP_400_BAD_REQUEST)
+        target, field_name, error = _resolve_upload_target(request.user, upload.purpose, upload.target)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            assembled_file = assemble_upload(upload)
+        except ChunkedUploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with assembled_file, transaction.atomic():
+            if upload.purpose == 'test_answer':
+                attempt, question = target
+                # Same row lock as save_answer(s): the attempt may have been submitted while the file was assembled.
+                locked_attempt = TestAttempt.objects.select_for_update().only('id', 'status').get(pk=attempt.pk)
+                if locked_attempt.status in ['not_started', 'locked', 'submitted']:
+                    return Response(
+                        {'detail': f'Cannot upload a file while attempt is {locked_attempt.status}.'},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                target, _ = TestAnswer.objects.get_or_create(attempt=attempt, question=question)
+            if upload.purpose == 'note_attachment':
+                target = NoteAttachment(
+                    note=target,
+                    file_type=_note_attachment_file_type(upload.filename),
+                    file_name=upload.filename,
+                    file_size=upload.total_size,
+                )
+                target.file.save(upload.filename, assembled_file, save=False)
+                target.save()
+            elif upload.purpose == 'resource':
+                attach_resource_file(target, assembled_file, assembled_file.sha256, filename=upload.filename)
+                transaction.on_commit(lambda: queue_resource_indexing([target.id]))
+                transaction.on_commit(lambda: queue_resource_previews([target.id]))
+            else:
+                getattr(target, field_name).save(upload.filename, assembled_file, save=False)
+                target.save(update_fields=[field_name, 'updated_at'])
+        finish_upload(upload)
+
+        upload.refresh_from_db()
+        return Response({
+            **self.get_serializer(upload).data,
+            'file': signed_file_url(request, target, field_name),
+        })
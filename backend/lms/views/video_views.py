@@ -2,17 +2,102 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse
+from django.conf import settings
+from django.http import FileResponse, Http404
 import logging
-import tempfile
+import shutil
 import subprocess
 import os
 import json
+import uuid
 
+from lms.background_jobs import enqueue
+from lms.models import BackgroundJob
 from lms.permissions import IsAdmin
 
 logger = logging.getLogger(__name__)
 
+VIDEO_RENDER_TASK = 'video_render'
+
+
+def render_slides_video(work_dir, slide_count, audio_indexes):
+    """
+    Render image_<n>.png (+ optional audio_<n>.mp3) from work_dir into one
+    vertical MP4 and return its path. Inputs are removed once rendered.
+    """
+    slide_videos = []
+    for index in range(slide_count):
+        image_path = os.path.join(work_dir, f"image_{index}.png")
+        audio_path = os.path.join(work_dir, f"audio_{index}.mp3") if index in audio_indexes else None
+        slide_video = os.path.join(work_dir, f"slide_{index}.mp4")
+        slide_videos.append(slide_video)
+
+        # FFmpeg command (ONE SLIDE)
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-loop", "1",
+            "-i", image_path,
+        ]
+
+        if audio_path:
+            cmd += ["-i", audio_path]
+        else:
+            cmd += [
+                "-f", "lavfi",
+                "-i", "anullsrc=channel_layout=stereo:sample_rate=44100",
+            ]
+
+        cmd += [
+            "-t", "4",
+            "-vf",
+            "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920",
+            "-c:v", "libx264",
+            "-c:a", "aac",
+            "-pix_fmt", "yuv420p",
+            "-shortest",
+            "-movflags", "+faststart",
+            slide_video,
+        ]
+
+        subprocess.run(cmd, check=True)
+
+    concat_path = os.path.join(work_dir, "concat.txt")
+    with open(concat_path, "w") as concat_file:
+        for vid in slide_videos:
+            concat_file.write(f"file '{vid}'\n")
+
+    final_video = os.path.join(work_dir, "output.mp4")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", concat_path,
+            "-c", "copy",
+            final_video,
+        ],
+        check=True,
+    )
+
+    for name in os.listdir(work_dir):
+        if name != "output.mp4":
+            os.remove(os.path.join(work_dir, name))
+    return final_video
+
+
+def remove_render_files(job):
+    work_dir = (job.payload or {}).get("work_dir")
+    if work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _save_upload(upload, path):
+    with open(path, "wb") as destination:
+        for chunk in upload.chunks():
+            destination.write(chunk)
+
 
 class VideoViewSet(viewsets.ViewSet):
     """
@@ -23,8 +108,9 @@ class VideoViewSet(viewsets.ViewSet):
       - image_0, image_1, ...
       - audio_0, audio_1, ... (optional)
 
-    Output:
-      - Single MP4 (vertical)
+    The render runs on the background job worker: render returns the job,
+    which is polled at /background-jobs/<id>/, and the finished MP4
+    (vertical) is fetched from renders/<id>/.
     """
 
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -47,119 +133,49 @@ class VideoViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        logger.info("Multi-slide render started user=%s slides=%s", user.id, len(slides))
-
-        temp_files = []
-        slide_videos = []
-
-        try:
-            # 1️⃣ Generate video per slide
-            for index, slide in enumerate(slides):
-                image = request.FILES.get(f"image_{index}")
-                audio = request.FILES.get(f"audio_{index}")  # optional
-
-                if not image:
-                    return Response(
-                        {"error": f"image_{index} is required"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                # Save image
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as img:
-                    for chunk in image.chunks():
-                        img.write(chunk)
-                    image_path = img.name
-                temp_files.append(image_path)
-
-                # Save audio if exists
-                audio_path = None
-                if audio:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as aud:
-                        for chunk in audio.chunks():
-                            aud.write(chunk)
-                        audio_path = aud.name
-                    temp_files.append(audio_path)
-
-                # Output slide video
-                fd, slide_video = tempfile.mkstemp(suffix=".mp4")
-                os.close(fd)
-                slide_videos.append(slide_video)
-
-                # FFmpeg command (ONE SLIDE)
-                cmd = [
-                    "ffmpeg",
-                    "-y",
-                    "-loop", "1",
-                    "-i", image_path,
-                ]
-
-                if audio_path:
-                    cmd += ["-i", audio_path]
-                else:
-                    cmd += [
-                        "-f", "lavfi",
-                        "-i", "anullsrc=channel_layout=stereo:sample_rate=44100",
-                    ]
-
-                cmd += [
-                    "-t", "4",
-                    "-vf",
-                    "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920",
-                    "-c:v", "libx264",
-                    "-c:a", "aac",
-                    "-pix_fmt", "yuv420p",
-                    "-shortest",
-                    "-movflags", "+faststart",
-                    slide_video,
-                ]
-
-                subprocess.run(cmd, check=True)
-
-            # 2️⃣ Create concat file
-            concat_file = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt")
-            for vid in slide_videos:
-                concat_file.write(f"file '{vid}'\n")
-            concat_file.close()
-            temp_files.append(concat_file.name)
-
-            # 3️⃣ Final output
-            fd, final_video = tempfile.mkstemp(suffix=".mp4")
-            os.close(fd)
-
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-f", "concat",
-                    "-safe", "0",
-                    "-i", concat_file.name,
-                    "-c", "copy",
-                    final_video,
-                ],
-                check=True,
-            )
-
-            logger.info("Multi-slide video completed user=%s", user.id)
-
-            return FileResponse(
-                open(final_video, "rb"),
-                content_type="video/mp4",
-                as_attachment=True,
-                filename="tutorlix-micro-video.mp4",
-            )
-
-        except Exception:
-            logger.exception("Multi-slide render failed user=%s", user.id)
+        for index in range(len(slides)):
+            if not request.FILES.get(f"image_{index}"):
+                return Response(
+                    {"error": f"image_{index} is required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        work_dir = os.path.join(str(settings.VIDEO_RENDER_DIR), uuid.uuid4().hex)
+        os.makedirs(work_dir)
+        audio_indexes = []
+        for index in range(len(slides)):
+            _save_upload(request.FILES[f"image_{index}"], os.path.join(work_dir, f"image_{index}.png"))
+            audio = request.FILES.get(f"audio_{index}")  # optional
+            if audio:
+                _save_upload(audio, os.path.join(work_dir, f"audio_{index}.mp3"))
+                audio_indexes.append(index)
+
+        job = enqueue(
+            VIDEO_RENDER_TASK,
+            {"work_dir": work_dir, "slide_count": len(slides), "audio_indexes": audio_indexes},
+            max_attempts=1,
+            created_by=user,
+        )
+        logger.info("Multi-slide render queued user=%s slides=%s job=%s", user.id, len(slides), job.id)
+        return Response({"job": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["get"], url_path=r"renders/(?P<job_id>\d+)")
+    def download_render(self, request, job_id=None):
+        job = BackgroundJob.objects.filter(pk=job_id, task=VIDEO_RENDER_TASK, created_by=request.user).first()
+        if job is None:
+            raise Http404("Render not found.")
+        if job.status != "completed":
             return Response(
-                {"error": "Video rendering failed"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"status": job.status, "error": job.error},
+                status=status.HTTP_409_CONFLICT,
             )
 
-        finally:
-            # Cleanup temp files (except final video)
-            for path in temp_files:
-                try:
-                    if path and os.path.exists(path):
-                        os.remove(path)
-                except Exception:
-                    pass
+        output = (job.result or {}).get("output")
+        if not output or not os.path.exists(output):
+            raise Http404("Rendered video is no longer available.")
+        return FileResponse(
+            open(output, "rb"),
+            content_type="video/mp4",
+            as_attachment=True,
+            filename="tutorlix-micro-video.mp4",
+        )
@@ -0,0 +1,166 @@
+import atexit
+import json
+import subprocess
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+# Each bootstrap blocks on a single JSON header line read byte-by-byte from fd 0,
+# so everything after the header is left untouched for the student program.
+PYTHON_BOOTSTRAP = r'''
+import os, sys
+header = b''
+while not header.endswith(b'\n'):
+    chunk = os.read(0, 1)
+    if not chunk:
+        sys.exit(0)
+    header += chunk
+import json
+job = json.loads(header)
+del header, chunk
+os.chdir(job['cwd'])
+os.environ.update(job['env'])
+sys.argv = [job['path']]
+namespace = {'__name__': '__main__', '__file__': job['path'], '__builtins__': __builtins__}
+try:
+    with open(job['path'], encoding='utf-8') as source_file:
+        code = compile(source_file.read(), job['path'], 'exec')
+    del job, source_file, json
+    exec(code, namespace)
+except SystemExit:
+    raise
+except BaseException as exc:
+    exc = exc.with_traceback(exc.__traceback__.tb_next)
+    sys.excepthook(type(exc), exc, exc.__traceback__)
+    sys.exit(1)
+'''
+
+NODE_BOOTSTRAP = r'''
+const fs = require('fs');
+const headerBytes = [];
+const byte = Buffer.alloc(1);
+for (;;) {
+  if (fs.readSync(0, byte, 0, 1, null) === 0) process.exit(0);
+  if (byte[0] === 10) break;
+  headerBytes.push(byte[0]);
+}
+const job = JSON.parse(Buffer.from(headerBytes).toString('utf8'));
+process.chdir(job.cwd);
+Object.assign(process.env, job.env);
+process.argv[1] = job.path;
+require('module').runMain();
+'''
+
+WARM_LANGUAGES = ('python', 'javascript')
+
+
+def _bootstrap_command(language, interpreter_command):
+    if language == 'python':
+        return [*interpreter_command, '-c', PYTHON_BOOTSTRAP]
+    return [*interpreter_command, '-e', NODE_BOOTSTRAP]
+
+
+def job_header(source_path, temp_dir, env):
+    return json.dumps({'path': source_path, 'cwd': temp_dir, 'env': env}) + '\n'
+
+
+class WarmProcessPool:
+    """
+    Interpreters that have already started and are blocked reading a job header,
+    so a run only pays for writing the header instead of interpreter startup.
+    Every process runs exactly one program and exits; nothing is shared between
+    students. Idle processes older than max_age_seconds are replaced so runtime
+    upgrades are picked up.
+    """
+
+    def __init__(self, language, interpreter_command, size, max_age_seconds, popen_kwargs):
+        self.language = language
+        self.command = _bootstrap_command(language, interpreter_command)
+        self.size = size
+        self.max_age_seconds = max_age_seconds
+        self.popen_kwargs = popen_kwargs
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        process = subprocess.Popen(self.command, **self.popen_kwargs)
+        return time.monotonic(), process
+
+    def _is_usable(self, spawned_at, process):
+        return process.poll() is None and time.monotonic() - spawned_at < self.max_age_seconds
+
+    def acquire(self):
+        with self._lock:
+            while self._idle:
+                spawned_at, process = self._idle.pop(0)
+                if self._is_usable(spawned_at, process):
+                    return process
+                _discard(process)
+        return self._spawn()[1]
+
+    def refill(self):
+        with self._lock:
+            missing = self.size - len(self._idle)
+        spawned = [self._spawn() for _ in range(max(0, missing))]
+        with self._lock:
+            self._idle.extend(spawned)
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, process in idle:
+            _discard(process)
+
+
+def _discard(process):
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+    for stream in (process.stdin, process.stdout, process.stderr):
+        if stream:
+            stream.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def warm_pool_size():
+    return int(getattr(settings, 'CODE_RUNNER_WARM_POOL_SIZE', 0))
+
+
+def get_warm_pool(language, popen_kwargs, interpreter_command):
+    if language not in WARM_LANGUAGES or warm_pool_size() <= 0:
+        return None
+    with _pools_lock:
+        pool = _pools.get(language)
+        if pool is None:
+            pool = WarmProcessPool(
+                language,
+                interpreter_command,
+                size=warm_pool_size(),
+                max_age_seconds=int(getattr(settings, 'CODE_RUNNER_WARM_MAX_AGE_SECONDS', 300)),
+                popen_kwargs={**popen_kwargs, 'cwd': tempfile.gettempdir()},
+            )
+            _pools[language] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_warm_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+@receiver(setting_changed)
+def _reset_warm_pools(setting, **kwargs):
+    if setting.startswith('CODE_RUNNER_WARM_'):
+        shutdown_warm_pools()
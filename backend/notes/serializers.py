@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import Note, NoteAttachment, NotePurchase, NoteAccess, NoteAISubscription, NoteAIDoubt
+from lms.file_serving import signed_file_url
 from lms.models import Product
 from accounts.serializers import PublicUserSerializer
 
@@ -40,12 +41,7 @@ class NoteAttachmentSerializer(serializers.ModelSerializer):
         return data
     
     def get_file_url(self, obj):
-        request = self.context.get('request')
-        if obj.file and hasattr(obj.file, 'url'):
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return signed_file_url(self.context.get('request'), obj, 'file', filename=obj.file_name or None)
     
     def get_file_size_display(self, obj):
         if obj.file_size:
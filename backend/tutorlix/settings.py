@@ -14,6 +14,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(Path(__file__).resolve().parent.parent, '.env'))
@@ -137,6 +138,25 @@ DATABASES = {
 }
 
 
+# Cache
+# A shared backend (Redis) is required in production so that every gunicorn
+# worker sees the same test attempt activity and LiveKit removal flags.
+REDIS_URL = os.getenv('REDIS_URL', '').strip()
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -178,6 +198,18 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/api/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Private file downloads (resources, test attachments, note attachments).
+# 'django' streams them from the app with Range support. 'x-accel-redirect'
+# (nginx) and 'x-sendfile' (Apache/lighttpd) hand the transfer to the front
+# proxy once access has been checked. For nginx, map only the two file roots,
+# never the app directory (it holds the database and .env):
+#   location /protected-files/media/ { internal; alias /app/media/; }
+#   location /protected-files/protected/ { internal; alias /app/protected_resources/; }
+FILE_SERVING_BACKEND = os.getenv('FILE_SERVING_BACKEND', 'django').strip().lower()
+FILE_SERVING_ACCEL_PREFIX = os.getenv('FILE_SERVING_ACCEL_PREFIX', '/protected-files/')
+# Lifetime of signed attachment links handed to the browser.
+FILE_SERVING_SIGNED_URL_MAX_AGE = int(os.getenv('FILE_SERVING_SIGNED_URL_MAX_AGE', 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -333,3 +365,70 @@ LIVEKIT_MEETING_BASE_URL = os.getenv('LIVEKIT_MEETING_BASE_URL', '').strip().rst
 LIVEKIT_MIN_CONCURRENT_CLASSES = int(os.getenv('LIVEKIT_MIN_CONCURRENT_CLASSES', 10))
 LIVEKIT_AI_AGENT_NAME = os.getenv('LIVEKIT_AI_AGENT_NAME', 'tutorlix-ai-tutor').strip()
 LIVEKIT_AI_AGENT_DISPATCH_MODE = os.getenv('LIVEKIT_AI_AGENT_DISPATCH_MODE', 'token').strip().lower()
+
+# Test attempt activity is kept in the cache and flushed to the database by
+# `manage.py flush_test_attempt_activity`. That only works when every process
+# shares the cache (Redis), so without REDIS_URL each heartbeat is written
+# straight to the database instead.
+TEST_ATTEMPT_ACTIVITY_CACHE_SHARED = os.getenv(
+    'TEST_ATTEMPT_ACTIVITY_CACHE_SHARED', 'True' if REDIS_URL else 'False'
+).lower() in ['true', '1', 'yes']
+TEST_ATTEMPT_ACTIVITY_TTL_SECONDS = int(os.getenv('TEST_ATTEMPT_ACTIVITY_TTL_SECONDS', 6 * 60 * 60))
+TEST_ATTEMPT_ACTIVITY_FLUSH_SECONDS = int(os.getenv('TEST_ATTEMPT_ACTIVITY_FLUSH_SECONDS', 30))
+
+# Code runner compile cache (C, C++ and Java artifacts). Set the size to 0 to disable.
+CODE_RUNNER_COMPILE_CACHE_DIR = os.getenv(
+    'CODE_RUNNER_COMPILE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'tutorlix-compile-cache'),
+)
+CODE_RUNNER_COMPILE_CACHE_MAX_BYTES = int(os.getenv('CODE_RUNNER_COMPILE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Python/Node interpreters kept started per language and API process (0 disables),
+# replaced after sitting idle for CODE_RUNNER_WARM_MAX_AGE_SECONDS.
+CODE_RUNNER_WARM_POOL_SIZE = int(os.getenv('CODE_RUNNER_WARM_POOL_SIZE', 2))
+CODE_RUNNER_WARM_MAX_AGE_SECONDS = int(os.getenv('CODE_RUNNER_WARM_MAX_AGE_SECONDS', 300))
+# Sandbox limits for student programs. RLIMIT_NPROC counts every process and
+# thread of the server's OS user, so it stays off (0) unless the runner has its own user.
+CODE_RUNNER_MEMORY_LIMIT_MB = int(os.getenv('CODE_RUNNER_MEMORY_LIMIT_MB', 256))
+CODE_RUNNER_MAX_PROCESSES = int(os.getenv('CODE_RUNNER_MAX_PROCESSES', 0))
+# Run one-off Java programs with `java Main.java` (JDK 11+) instead of javac + java.
+CODE_RUNNER_JAVA_SOURCE_LAUNCH = os.getenv('CODE_RUNNER_JAVA_SOURCE_LAUNCH', 'False').lower() in ['true', '1', 'yes']
+
+# Code execution pool: concurrent compiler/program processes per API process,
+# queued jobs before requests get 429, and outstanding jobs allowed per user.
+CODE_EXECUTION_WORKERS = int(os.getenv('CODE_EXECUTION_WORKERS', 2))
+CODE_EXECUTION_QUEUE_SIZE = int(os.getenv('CODE_EXECUTION_QUEUE_SIZE', 32))
+CODE_EXECUTION_MAX_JOBS_PER_USER = int(os.getenv('CODE_EXECUTION_MAX_JOBS_PER_USER', 2))
+# Requests without `async` hold a server worker this long before falling back to 202.
+CODE_EXECUTION_SYNC_WAIT_SECONDS = int(os.getenv('CODE_EXECUTION_SYNC_WAIT_SECONDS', 5))
+CODE_EXECUTION_JOB_TTL_SECONDS = int(os.getenv('CODE_EXECUTION_JOB_TTL_SECONDS', 600))
+
+# Resumable chunked uploads: chunks are staged on local disk until the upload
+# completes, and unfinished uploads are purged after the expiry.
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR') or str(BASE_DIR / 'chunked_uploads')
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+CHUNKED_UPLOAD_EXPIRY_SECONDS = int(os.getenv('CHUNKED_UPLOAD_EXPIRY_SECONDS', 24 * 60 * 60))
+
+# Resource imports: parallel PDF downloads per job, and per source host.
+RESOURCE_IMPORT_WORKERS = int(os.getenv('RESOURCE_IMPORT_WORKERS', 4))
+RESOURCE_IMPORT_MAX_PER_HOST = int(os.getenv('RESOURCE_IMPORT_MAX_PER_HOST', 2))
+# Minimum gap between folder page requests to the same host while crawling.
+RESOURCE_CRAWL_MIN_DELAY_SECONDS = float(os.getenv('RESOURCE_CRAWL_MIN_DELAY_SECONDS', 0.25))
+# Resource search: characters of PDF text indexed per resource, and how many
+# ranked matches a content search considers.
+RESOURCE_TEXT_MAX_CHARS = int(os.getenv('RESOURCE_TEXT_MAX_CHARS', 500000))
+RESOURCE_SEARCH_MAX_RESULTS = int(os.getenv('RESOURCE_SEARCH_MAX_RESULTS', 1000))
+# Longest side, in pixels, of resource preview images. PDF pages are rendered
+# with poppler's pdftoppm when it is installed.
+RESOURCE_PREVIEW_MAX_SIZE = int(os.getenv('RESOURCE_PREVIEW_MAX_SIZE', 480))
+
+# Background jobs (resource imports, video renders, plagiarism checks) run in
+# `manage.py run_background_jobs` worker processes. A worker renews its lease
+# every third of BACKGROUND_JOBS_LEASE_SECONDS; jobs whose lease lapses are retried.
+# Workers also queue the periodic tasks in lms/tasks.py (register_task(every=...)).
+# BACKGROUND_JOBS_EAGER runs jobs inside the enqueuing request (development only).
+BACKGROUND_JOBS_LEASE_SECONDS = int(os.getenv('BACKGROUND_JOBS_LEASE_SECONDS', 60))
+BACKGROUND_JOBS_POLL_SECONDS = float(os.getenv('BACKGROUND_JOBS_POLL_SECONDS', 2))
+BACKGROUND_JOBS_RETENTION_DAYS = int(os.getenv('BACKGROUND_JOBS_RETENTION_DAYS', 14))
+BACKGROUND_JOBS_EAGER = os.getenv('BACKGROUND_JOBS_EAGER', 'False').lower() in ['true', '1', 'yes']
+VIDEO_RENDER_DIR = os.getenv('VIDEO_RENDER_DIR') or str(BASE_DIR / 'video_renders')
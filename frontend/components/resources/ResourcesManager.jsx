@@ -67,6 +67,8 @@ const VISIBILITY_OPTIONS = [
   { value: 'admin', label: 'Admin Only' },
 ];
 
+const MAX_IMPORT_LOG_LINES = 1000;
+
 const getFilenameFromDisposition = (contentDisposition, fallback = 'resource') => {
   if (!contentDisposition) return fallback;
   const match = contentDisposition.match(/filename="?([^"]+)"?/i);
@@ -91,6 +93,8 @@ export default function ResourcesManager({ role }) {
   const [importUrl, setImportUrl] = useState('');
   const [importing, setImporting] = useState(false);
   const [activeImportJob, setActiveImportJob] = useState(null);
+  const [importLogLines, setImportLogLines] = useState([]);
+  const importLogCursorRef = useRef({ jobId: null, lastId: null });
   const [showLogsDialog, setShowLogsDialog] = useState(false);
   const [message, setMessage] = useState({ type: '', text: '' });
   const importCompletionHandledRef = useRef(null);
@@ -101,6 +105,8 @@ export default function ResourcesManager({ role }) {
   const [gradeFilter, setGradeFilter] = useState('all');
   const [topicFilter, setTopicFilter] = useState('all');
   const [typeFilter, setTypeFilter] = useState('all');
+  const [contentQuery, setContentQuery] = useState('');
+  const contentQueryRef = useRef('');
 
   useEffect(() => {
     if (!user || user.role !== role) {
@@ -114,6 +120,15 @@ export default function ResourcesManager({ role }) {
     }
   }, [user, role, router]);
 
+  useEffect(() => {
+    if (contentQueryRef.current === contentQuery) return undefined;
+    const timeoutId = setTimeout(() => {
+      contentQueryRef.current = contentQuery;
+      fetchResources();
+    }, 300);
+    return () => clearTimeout(timeoutId);
+  }, [contentQuery]);
+
   useEffect(() => {
     if (!isAdmin || !activeImportJob?.id || activeImportJob?.is_finished) {
       return undefined;
@@ -123,6 +138,7 @@ export default function ResourcesManager({ role }) {
       try {
         const job = await resourceImportJobAPI.getById(activeImportJob.id);
         setActiveImportJob(job);
+        fetchImportLogs(job.id);
         fetchResources();
       } catch (error) {
         console.error('Failed to poll import job:', error);
@@ -166,7 +182,8 @@ export default function ResourcesManager({ role }) {
   const fetchResources = async () => {
     try {
       setLoading(true);
-      const data = await resourceAPI.getAll();
+      const query = contentQueryRef.current.trim();
+      const data = await resourceAPI.getAll(query ? { q: query } : {});
       setResources(Array.isArray(data) ? data : []);
     } catch (error) {
       console.error('Failed to fetch resources:', error);
@@ -186,6 +203,35 @@ export default function ResourcesManager({ role }) {
     }
   };
 
+  // Only lines after the last one seen are requested, so polling stays cheap on long imports.
+  const fetchImportLogs = async (jobId) => {
+    try {
+      const cursor = importLogCursorRef.current;
+      const isSameJob = cursor.jobId === jobId;
+      const data = await resourceImportJobAPI.getLogs(jobId, isSameJob && cursor.lastId ? { after: cursor.lastId } : {});
+      const latest = importLogCursorRef.current;
+      const lastId = latest.jobId === jobId ? Math.max(latest.lastId || 0, data.last_id || 0) : data.last_id;
+      importLogCursorRef.current = { jobId, lastId: lastId || null };
+      setImportLogLines((lines) => {
+        const previous = latest.jobId === jobId ? lines : [];
+        const seenIds = new Set(previous.map((entry) => entry.id));
+        const added = data.results.filter((entry) => !seenIds.has(entry.id));
+        return [...previous, ...added].slice(-MAX_IMPORT_LOG_LINES);
+      });
+    } catch (error) {
+      console.error('Failed to fetch import logs:', error);
+    }
+  };
+
+  useEffect(() => {
+    if (!activeImportJob?.id) {
+      importLogCursorRef.current = { jobId: null, lastId: null };
+      setImportLogLines([]);
+      return;
+    }
+    fetchImportLogs(activeImportJob.id);
+  }, [activeImportJob?.id, activeImportJob?.is_finished]);
+
   const fetchLatestImportJob = async () => {
     try {
       const data = await resourceImportJobAPI.getAll({ ordering: '-created_at' });
@@ -419,9 +465,26 @@ export default function ResourcesManager({ role }) {
       accessorKey: 'title',
       header: 'Resource',
       cell: ({ row }) => (
-        <div>
-          <div className="font-medium">{row.original.title}</div>
-          <div className="text-sm text-gray-600">{row.original.description || 'No description'}</div>
+        <div className="flex items-start gap-3">
+          {row.original.preview_url && (
+            <img
+              src={row.original.preview_url}
+              alt=""
+              loading="lazy"
+              className="h-16 w-12 flex-shrink-0 rounded border object-cover object-top"
+            />
+          )}
+          <div>
+            <div className="font-medium">{row.original.title}</div>
+            <div className="text-sm text-gray-600">{row.original.description || 'No description'}</div>
+            {row.original.search_snippet && (
+              // The API escapes the snippet and only adds <mark> around matched terms.
+              <div
+                className="mt-1 text-xs text-gray-500 [&_mark]:bg-yellow-100"
+                dangerouslySetInnerHTML={{ __html: row.original.search_snippet }}
+              />
+            )}
+          </div>
         </div>
       ),
     },
@@ -671,7 +734,12 @@ export default function ResourcesManager({ role }) {
         </Card>
       )}
 
-      <Card className="p-4">
+      <Card className="space-y-4 p-4">
+        <Input
+          value={contentQuery}
+          onChange={(e) => setContentQuery(e.target.value)}
+          placeholder="Search inside resources (titles, descriptions, tags and PDF text)..."
+        />
         <div className="grid gap-4 md:grid-cols-2 xl:grid-cols-5">
           <Select value={subjectFilter} onValueChange={setSubjectFilter}>
             <SelectTrigger><SelectValue placeholder="Filter by subject" /></SelectTrigger>
@@ -712,7 +780,9 @@ export default function ResourcesManager({ role }) {
       </Card>
 
       {!loading && resources.length === 0 ? (
-        <Card className="p-10 text-center text-gray-600">No resources added yet.</Card>
+        <Card className="p-10 text-center text-gray-600">
+          {contentQuery.trim() ? 'No resources match this search.' : 'No resources added yet.'}
+        </Card>
       ) : (
         <DataTable
           columns={columns}
@@ -857,10 +927,10 @@ export default function ResourcesManager({ role }) {
               )}
 
               <div className="max-h-[42vh] overflow-y-auto rounded-md border bg-black p-3 font-mono text-xs text-green-300">
-                {activeImportJob.log_lines?.length ? (
-                  activeImportJob.log_lines.map((line, index) => (
-                    <div key={`${index}-${line}`} className="whitespace-pre-wrap break-words">
-                      {line}
+                {importLogLines.length ? (
+                  importLogLines.map((entry) => (
+                    <div key={entry.id} className="whitespace-pre-wrap break-words">
+                      {entry.line}
                     </div>
                   ))
                 ) : (
@@ -329,6 +329,11 @@ export const resourceImportJobAPI = {
     const response = await axiosInstance.post(`/api/lms/resource-import-jobs/${id}/abort/`);
     return response.data;
   },
+
+  getLogs: async (id, params = {}) => {
+    const response = await axiosInstance.get(`/api/lms/resource-import-jobs/${id}/logs/`, { params });
+    return response.data;
+  },
 };
 
 export const forumAPI = {
@@ -653,11 +658,50 @@ export const testAttemptAPI = {
     return response.data;
   },
 
-  runCode: async (attemptId, data) => {
-    const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/run_code/`, data);
+  // answers: [{ question, selected_options, subjective_answer, code_answer, code_language, sequence }]
+  // `sequence` must increase per question; the server drops saves older than the stored one.
+  saveAnswers: async (attemptId, answers, currentQuestionIndex) => {
+    const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/save_answers/`, {
+      answers,
+      current_question_index: currentQuestionIndex,
+    });
+    return response.data;
+  },
+
+  heartbeat: async (attemptId) => {
+    const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/heartbeat/`);
     return response.data;
   },
 
+  runCode: async (attemptId, data) => {
+    const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/run_code/`, { async: true, ...data });
+    if (response.status !== 202) {
+      return response.data;
+    }
+    return testAttemptAPI.waitForCodeExecution(response.data.job_id);
+  },
+
+  getCodeExecution: async (jobId) => {
+    const response = await axiosInstance.get(`/api/lms/code-executions/${jobId}/`);
+    return response;
+  },
+
+  waitForCodeExecution: async (jobId, intervalMs = 1000) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+      const response = await testAttemptAPI.getCodeExecution(jobId);
+      if (response.status === 202) {
+        continue;
+      }
+      if (response.data.status === 'failed') {
+        const error = new Error(response.data.detail || 'Code execution failed.');
+        error.response = { status: 400, data: { detail: response.data.detail } };
+        throw error;
+      }
+      return response.data.result;
+    }
+  },
+
   lock: async (attemptId, reason) => {
     const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/lock/`, { reason });
     return response.data;
@@ -673,12 +717,78 @@ export const testAttemptAPI = {
     return response.data;
   },
 
+  bulkGrade: async (grades) => {
+    const response = await axiosInstance.post('/api/lms/test-attempts/bulk_grade/', { grades });
+    return response.data;
+  },
+
   submit: async (attemptId) => {
     const response = await axiosInstance.post(`/api/lms/test-attempts/${attemptId}/submit/`);
     return response.data;
   },
 };
 
+// ============= Chunked Upload APIs =============
+
+const sha256Hex = async (blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map((byte) => byte.toString(16).padStart(2, '0')).join('');
+};
+
+export const chunkedUploadAPI = {
+  create: async (data) => {
+    const response = await axiosInstance.post('/api/lms/uploads/', data);
+    return response.data;
+  },
+
+  get: async (uploadId) => {
+    const response = await axiosInstance.get(`/api/lms/uploads/${uploadId}/`);
+    return response.data;
+  },
+
+  abort: async (uploadId) => {
+    await axiosInstance.delete(`/api/lms/uploads/${uploadId}/`);
+  },
+
+  putChunk: async (uploadId, index, blob) => {
+    const response = await axiosInstance.put(`/api/lms/uploads/${uploadId}/chunks/${index}/`, blob, {
+      headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': await sha256Hex(blob) },
+    });
+    return response.data;
+  },
+
+  complete: async (uploadId) => {
+    const response = await axiosInstance.post(`/api/lms/uploads/${uploadId}/complete/`);
+    return response.data;
+  },
+
+  // Uploads only the chunks the server is missing, so passing the id of an
+  // interrupted upload resumes it.
+  uploadFile: async (file, { purpose, target, uploadId = null, onProgress = null }) => {
+    const upload = uploadId
+      ? await chunkedUploadAPI.get(uploadId)
+      : await chunkedUploadAPI.create({
+          purpose,
+          target,
+          filename: file.name,
+          content_type: file.type,
+          total_size: file.size,
+        });
+    const received = new Set(upload.received_chunks);
+    for (let index = 0; index < upload.total_chunks; index += 1) {
+      if (!received.has(index)) {
+        const start = index * upload.chunk_size;
+        await chunkedUploadAPI.putChunk(upload.id, index, file.slice(start, start + upload.chunk_size));
+        received.add(index);
+      }
+      if (onProgress) {
+        onProgress({ uploadId: upload.id, uploaded: received.size, total: upload.total_chunks });
+      }
+    }
+    return chunkedUploadAPI.complete(upload.id);
+  },
+};
+
 // ============= Expense APIs =============
 
 export const expenseAPI = {
@@ -1206,20 +1316,44 @@ export default exportVariable;
 ========================= */
 // lib/lmsService.js
 
+export const backgroundJobAPI = {
+  getById: async (id) => {
+    const response = await axiosInstance.get(`/api/lms/background-jobs/${id}/`);
+    return response.data;
+  },
+
+  waitUntilFinished: async (id, intervalMs = 2000) => {
+    while (true) {
+      const job = await backgroundJobAPI.getById(id);
+      if (job.status === 'completed') return job;
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Background job failed.');
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
+};
+
 export const videoAPI = {
+  // Renders run on the background worker: queue the job, wait for it, then
+  // download the MP4, so callers still receive a Blob.
   render: async (formData) => {
       const response = await axiosInstance.post(
           "/api/lms/videos/render/",
           formData,
           {
-              responseType: "blob", // ✅ THIS IS CRITICAL
               headers: {
                   "Content-Type": "multipart/form-data",
               },
           }
       );
+      await backgroundJobAPI.waitUntilFinished(response.data.job);
 
-      return response.data; // ✅ THIS WILL BE A BLOB
+      const download = await axiosInstance.get(
+          `/api/lms/videos/renders/${response.data.job}/`,
+          { responseType: "blob" }
+      );
+      return download.data;
   },
 };
 